@@ -0,0 +1,92 @@
+"""
+Embedding coalescing benchmark: N concurrent clients with and without EmbeddingBatcher.
+
+    python -m benchmarks.bench_batching --clients 32 --embed-latency-ms 80
+    python -m benchmarks.bench_batching --window-ms 2 --duplicates 0.3
+
+Each client thread embeds --queries-per-client queries back to back through
+a fake embedder that sleeps --embed-latency-ms per request (one HTTP round
+trip, however many inputs it carries) with at most --connections requests
+in flight, like a client connection pool or a provider's concurrency limit
+(without one, direct requests never queue). A --duplicates fraction of
+queries is drawn from a small shared pool, as popular queries would be.
+Reports total throughput, mean per-query latency and the number of embedding
+requests made.
+"""
+import random
+import threading
+import time
+
+import click
+
+from benchmarks.bench_search import FakeEmbedder
+from kb.batching import EmbeddingBatcher
+from kb.searcher import embed_query
+
+
+class CountingEmbedder(FakeEmbedder):
+    def __init__(self, dim: int, latency: float, connections: int):
+        super().__init__(dim, latency)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._connections = threading.Semaphore(connections)
+
+    def create(self, model, input):
+        with self._lock:
+            self.calls += 1
+        with self._connections:
+            return super().create(model, input)
+
+
+def workload(clients: int, per_client: int, duplicates: float) -> list[list[str]]:
+    rng = random.Random(0)
+    popular = [f"popular query {i}" for i in range(10)]
+    return [
+        [rng.choice(popular) if rng.random() < duplicates else f"client {c} query {i}" for i in range(per_client)]
+        for c in range(clients)
+    ]
+
+
+def run_clients(openai_client, queries: list[list[str]]) -> tuple[float, float]:
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(queries))
+
+    def client(own: list[str]) -> None:
+        barrier.wait()
+        for query in own:
+            start = time.perf_counter()
+            embed_query(query, openai_client)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(own,)) for own in queries]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, sum(latencies) / len(latencies) * 1000
+
+
+@click.command()
+@click.option("--clients", default=32, show_default=True, help="Concurrent client threads")
+@click.option("--queries-per-client", default=20, show_default=True, help="Queries each client embeds")
+@click.option("--embed-latency-ms", default=80.0, show_default=True, help="Simulated embedding round trip")
+@click.option("--connections", default=4, show_default=True, help="Embedding requests allowed in flight at once")
+@click.option("--window-ms", default=5.0, show_default=True, help="Batcher coalescing window")
+@click.option("--max-batch", default=64, show_default=True, help="Batcher maximum batch size")
+@click.option("--duplicates", default=0.2, show_default=True, help="Fraction of queries drawn from a shared popular pool")
+def main(clients, queries_per_client, embed_latency_ms, connections, window_ms, max_batch, duplicates):
+    queries = workload(clients, queries_per_client, duplicates)
+    click.echo(f"{'variant':<10} {'qps':>9} {'mean ms':>9} {'requests':>9}")
+    for name in ("direct", "batched"):
+        embedder = CountingEmbedder(dim=64, latency=embed_latency_ms / 1000, connections=connections)
+        client = embedder if name == "direct" else EmbeddingBatcher(embedder, window_ms / 1000, max_batch)
+        qps, mean_ms = run_clients(client, queries)
+        click.echo(f"{name:<10} {qps:>9.1f} {mean_ms:>9.2f} {embedder.calls:>9}")
+
+
+if __name__ == "__main__":
+    main()
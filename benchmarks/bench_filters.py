@@ -0,0 +1,88 @@
+"""
+Filtered-search benchmark: payload filters with and without payload indexes.
+
+    python -m benchmarks.bench_filters --qdrant-url http://localhost:6333 --points 100000
+
+Needs a Qdrant server: local mode (":memory:") ignores payload indexes.
+Seeds two identical synthetic collections, creates the kb.filters indexes on
+one of them with ensure_indexes(), and compares search latency for the
+channel / date-range / source filters run exposes.
+"""
+import random
+import statistics
+import time
+import uuid
+
+import click
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from kb.filters import PayloadFilter, ensure_indexes
+from kb.searcher import build_filter
+
+DIM = 256
+CHANNELS = [f"channel{i}" for i in range(200)]
+SOURCE_TYPES = ["youtube", "podcast", "docs"]
+TRANSCRIPT_SOURCES = ["caption", "whisper"]
+
+FILTERS = {
+    "one channel": (CHANNELS[7], None),
+    "any of 5 channels": (None, PayloadFilter(channels=tuple(CHANNELS[:5]))),
+    "date range (1 month)": (None, PayloadFilter(date_from=20230601, date_to=20230630)),
+    "source + transcript": (None, PayloadFilter(source_types=("podcast",), transcript_sources=("whisper",))),
+    "channel + date": (CHANNELS[3], PayloadFilter(date_from=20230101, date_to=20231231)),
+}
+
+
+def seed(client: QdrantClient, collection: str, points: int) -> None:
+    rng = random.Random(0)
+    client.create_collection(collection, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    for start in range(0, points, 1000):
+        client.upsert(collection, points=[
+            PointStruct(id=i, vector=[rng.gauss(0, 1) for _ in range(DIM)], payload={
+                "channel_slug": rng.choice(CHANNELS),
+                "upload_date": 20200101 + rng.randrange(5) * 10000 + rng.randrange(1, 13) * 100 + rng.randrange(1, 29),
+                "source_type": rng.choice(SOURCE_TYPES),
+                "transcript_source": rng.choice(TRANSCRIPT_SOURCES),
+            })
+            for i in range(start, min(start + 1000, points))
+        ], wait=True)
+
+
+def median_ms(client: QdrantClient, collection: str, query_filter, vectors) -> float:
+    latencies = []
+    for vector in vectors:
+        start = time.perf_counter()
+        client.search(collection, vector, limit=10, query_filter=query_filter, with_payload=False)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+@click.command()
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant server URL")
+@click.option("--points", default=100000, show_default=True, help="Number of points to seed")
+@click.option("--queries", default=50, show_default=True, help="Queries per filter")
+def main(qdrant_url, points, queries):
+    client = QdrantClient(url=qdrant_url, timeout=120)
+    plain = f"bench_filters_{uuid.uuid4().hex[:8]}"
+    indexed = f"{plain}_indexed"
+    rng = random.Random(1)
+    vectors = [[rng.gauss(0, 1) for _ in range(DIM)] for _ in range(queries)]
+    try:
+        for collection in (plain, indexed):
+            seed(client, collection, points)
+        ensure_indexes(client, indexed)
+
+        click.echo(f"{'filter':<22} {'no index ms':>12} {'indexed ms':>11}")
+        for name, (channel_slug, payload_filter) in FILTERS.items():
+            query_filter = build_filter(channel_slug, payload_filter)
+            without = median_ms(client, plain, query_filter, vectors)
+            with_index = median_ms(client, indexed, query_filter, vectors)
+            click.echo(f"{name:<22} {without:>12.2f} {with_index:>11.2f}")
+    finally:
+        for collection in (plain, indexed):
+            client.delete_collection(collection)
+
+
+if __name__ == "__main__":
+    main()
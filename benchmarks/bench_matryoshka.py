@@ -0,0 +1,104 @@
+"""
+Two-stage Matryoshka benchmark: full-vector search vs. short coarse search + rescore.
+
+    python -m benchmarks.bench_matryoshka --points 20000 --short-dim 256 --coarse-factor 4
+    python -m benchmarks.bench_matryoshka --qdrant-url http://localhost:6333
+
+Seeds a synthetic 1536-dim collection whose vectors concentrate their energy
+in the leading dimensions (as Matryoshka embeddings do; plain Gaussian
+vectors would understate the recall of truncation), backfills the short
+sidecar with kb.matryoshka and compares per-query latency, recall@k against
+exact full-vector search, and the size of the vectors each variant searches
+(the full vectors are still stored, but only fetched for the candidates, so
+they can live on disk).
+"""
+import math
+import random
+import statistics
+import time
+import uuid
+
+import click
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, SearchParams, VectorParams
+
+from benchmarks.bench_search import FakeEmbedder
+from kb.matryoshka import backfill_short_vectors, short_collection_name, two_stage_search
+from kb.searcher import search
+
+DIM = 1536
+
+
+class MatryoshkaEmbedder(FakeEmbedder):
+    """Deterministic fake embeddings with variance decaying over the dimensions."""
+
+    def vector(self, text: str) -> list[float]:
+        return decay(super().vector(text))
+
+
+def decay(vector: list[float]) -> list[float]:
+    return [x / math.sqrt(1 + i / 32) for i, x in enumerate(vector)]
+
+
+def seed(client: QdrantClient, collection: str, points: int) -> None:
+    rng = random.Random(0)
+    client.create_collection(collection, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    for start in range(0, points, 512):
+        client.upsert(collection, points=[
+            PointStruct(id=i, vector=decay([rng.gauss(0, 1) for _ in range(DIM)]),
+                        payload={"title": f"Video {i}", "text": "lorem ipsum " * 40})
+            for i in range(start, min(start + 512, points))
+        ])
+
+
+@click.command()
+@click.option("--qdrant-url", default=None, help="Benchmark against a Qdrant server instead of :memory:")
+@click.option("--points", default=20000, show_default=True, help="Number of points to seed")
+@click.option("--queries", default=50, show_default=True, help="Number of queries")
+@click.option("--top", default=10, show_default=True, help="k for recall@k")
+@click.option("--short-dim", default=256, show_default=True, help="Short vector dimensions")
+@click.option("--coarse-factor", default=4, show_default=True, help="Coarse candidates per result")
+def main(qdrant_url, points, queries, top, short_dim, coarse_factor):
+    client = QdrantClient(url=qdrant_url) if qdrant_url else QdrantClient(":memory:")
+    embedder = MatryoshkaEmbedder(DIM)
+    collection = f"bench_matryoshka_{uuid.uuid4().hex[:8]}"
+    seed(client, collection, points)
+    start = time.perf_counter()
+    backfill_short_vectors(client, collection, short_dim)
+    click.echo(f"backfill: {time.perf_counter() - start:.1f}s for {points} points\n")
+
+    texts = [f"query {i}" for i in range(queries)]
+    variants = (
+        ("full", lambda q: search(q, client, embedder, collection, top, with_payload=["title"])),
+        (f"two-stage {short_dim}", lambda q: two_stage_search(q, client, embedder, collection, top,
+                                                              with_payload=["title"], short_dim=short_dim,
+                                                              coarse_factor=coarse_factor)),
+    )
+    truths = [
+        {h.id for h in client.search(collection, embedder.vector(q), limit=top, search_params=SearchParams(exact=True))}
+        for q in texts
+    ]
+
+    click.echo(f"{'variant':<16} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7} {'searched MB':>11}")
+    try:
+        for name, run in variants:
+            latencies, recalls = [], []
+            for text, truth in zip(texts, truths):
+                t0 = time.perf_counter()
+                results = run(text)
+                latencies.append(time.perf_counter() - t0)
+                recalls.append(len({r["id"] for r in results} & truth) / len(truth))
+            latencies.sort()
+            dim = DIM if name == "full" else short_dim
+            click.echo(
+                f"{name:<16} {latencies[len(latencies) // 2] * 1000:>8.2f} "
+                f"{latencies[int(0.95 * (len(latencies) - 1))] * 1000:>8.2f} "
+                f"{statistics.fmean(recalls):>7.3f} {points * dim * 4 / 1e6:>11.1f}"
+            )
+    finally:
+        client.delete_collection(collection)
+        client.delete_collection(short_collection_name(collection))
+
+
+if __name__ == "__main__":
+    main()
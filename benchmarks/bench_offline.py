@@ -0,0 +1,94 @@
+"""
+Offline snapshot benchmark: Qdrant search vs. memory-mapped NumPy search.
+
+    python -m benchmarks.bench_offline --points 20000
+    python -m benchmarks.bench_offline --qdrant-url http://localhost:6333
+
+Seeds a synthetic collection, exports it with kb.offline.export_snapshot and
+compares per-query latency, Python heap allocated while searching, and
+whether the top-k ordering matches Qdrant's exact search.
+"""
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+import click
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, SearchParams, VectorParams
+
+from kb.offline import OfflineIndex, export_snapshot
+
+DIM = 1536
+
+
+def seed(client: QdrantClient, collection: str, points: int) -> None:
+    rng = random.Random(0)
+    client.create_collection(collection, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    for start in range(0, points, 512):
+        client.upsert(collection, points=[
+            PointStruct(
+                id=i,
+                vector=[rng.gauss(0, 1) for _ in range(DIM)],
+                payload={"title": f"Video {i}", "channel_slug": f"channel{i % 10}", "text": "lorem ipsum " * 80},
+            )
+            for i in range(start, min(start + 512, points))
+        ])
+
+
+def measure(search_fn, queries: list[list[float]]) -> tuple[dict, list]:
+    latencies, results = [], []
+    tracemalloc.start()
+    for vector in queries:
+        start = time.perf_counter()
+        results.append(search_fn(vector))
+        latencies.append(time.perf_counter() - start)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1] * 1000,
+        "peak_heap_mb": peak / 1e6,
+    }, results
+
+
+@click.command()
+@click.option("--qdrant-url", default=None, help="Benchmark against a Qdrant server instead of :memory:")
+@click.option("--points", default=20000, show_default=True, help="Number of points to seed")
+@click.option("--queries", default=50, show_default=True, help="Searches per variant")
+@click.option("--top", default=10, show_default=True, help="Results per search")
+def main(qdrant_url, points, queries, top):
+    client = QdrantClient(url=qdrant_url) if qdrant_url else QdrantClient(":memory:")
+    collection = f"bench_offline_{uuid.uuid4().hex[:8]}"
+    seed(client, collection, points)
+    rng = random.Random(1)
+    vectors = [[rng.gauss(0, 1) for _ in range(DIM)] for _ in range(queries)]
+
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            export_snapshot(client, collection, path)
+            server, server_results = measure(
+                lambda v: client.search(collection, query_vector=v, limit=top,
+                                        search_params=SearchParams(exact=True)),
+                vectors,
+            )
+        finally:
+            client.delete_collection(collection)
+        index = OfflineIndex(path)
+        offline, offline_results = measure(lambda v: index.search(v, top), vectors)
+        index.close()
+
+    matching = sum(
+        [h.payload["title"] for h in expected] == [r["payload"]["title"] for r in got]
+        for expected, got in zip(server_results, offline_results)
+    )
+    click.echo(f"{'variant':<8} {'p50 ms':>9} {'p95 ms':>9} {'peak heap MB':>13}")
+    for name, row in (("qdrant", server), ("offline", offline)):
+        click.echo(f"{name:<8} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['peak_heap_mb']:>13.1f}")
+    click.echo(f"\nidentical top-{top} ordering: {matching}/{queries} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Payload projection benchmark: full payload vs. the fields `kb-search run` renders.
+
+    python -m benchmarks.bench_payload --points 2000 --text-kb 32
+    python -m benchmarks.bench_payload --qdrant-url http://localhost:6333
+
+Without --qdrant-url an in-process QdrantClient(":memory:") is used.
+"""
+import json
+import random
+import statistics
+import time
+import uuid
+
+import click
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from kb.config import RUN_FIELDS
+from kb.searcher import parse_fields
+
+DIM = 1536
+
+
+def seed(client: QdrantClient, collection: str, points: int, text_kb: int) -> None:
+    rng = random.Random(0)
+    client.create_collection(collection, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    text = "lorem ipsum " * (text_kb * 1024 // 12)
+    for start in range(0, points, 256):
+        client.upsert(collection, points=[
+            PointStruct(
+                id=i,
+                vector=[rng.uniform(-1, 1) for _ in range(DIM)],
+                payload={
+                    "title": f"Video {i}",
+                    "transcript_source": "caption",
+                    "timestamp_url": f"https://youtube.com/watch?v={i}&t=0s",
+                    "text": text[:1000],
+                    "full_transcript": text,
+                    "segments": [{"start": s, "end": s + 5, "text": "lorem"} for s in range(0, 600, 5)],
+                },
+            )
+            for i in range(start, min(start + 256, points))
+        ])
+
+
+def measure(client: QdrantClient, collection: str, queries: list[list[float]], top_k: int, with_payload) -> dict:
+    latencies, sizes = [], []
+    for vector in queries:
+        start = time.perf_counter()
+        hits = client.search(collection, query_vector=vector, limit=top_k,
+                             with_payload=with_payload, with_vectors=False)
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(json.dumps([hit.payload for hit in hits])))
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "bytes_per_response": statistics.fmean(sizes),
+    }
+
+
+@click.command()
+@click.option("--qdrant-url", default=None, help="Benchmark against a Qdrant server instead of :memory:")
+@click.option("--points", default=2000, show_default=True, help="Number of points to seed")
+@click.option("--text-kb", default=32, show_default=True, help="Size of the large payload field per point, in KiB")
+@click.option("--queries", default=50, show_default=True, help="Searches per variant")
+@click.option("--top", default=10, show_default=True, help="Results per search")
+def main(qdrant_url, points, text_kb, queries, top):
+    client = QdrantClient(url=qdrant_url) if qdrant_url else QdrantClient(":memory:")
+    collection = f"bench_payload_{uuid.uuid4().hex[:8]}"
+    seed(client, collection, points, text_kb)
+    rng = random.Random(1)
+    vectors = [[rng.uniform(-1, 1) for _ in range(DIM)] for _ in range(queries)]
+    try:
+        full = measure(client, collection, vectors, top, True)
+        projected = measure(client, collection, vectors, top, parse_fields(RUN_FIELDS))
+    finally:
+        client.delete_collection(collection)
+
+    click.echo(f"{'variant':<10} {'p50 ms':>10} {'mean ms':>10} {'bytes/resp':>12}")
+    for name, row in (("full", full), ("projected", projected)):
+        click.echo(f"{name:<10} {row['p50_ms']:>10.2f} {row['mean_ms']:>10.2f} {row['bytes_per_response']:>12.0f}")
+    click.echo(f"\nbytes: {full['bytes_per_response'] / projected['bytes_per_response']:.1f}x smaller, "
+               f"p50: {full['p50_ms'] / projected['p50_ms']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
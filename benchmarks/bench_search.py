@@ -0,0 +1,212 @@
+"""
+Search pipeline benchmark suite: latency percentiles, QPS and peak RSS.
+
+    python -m benchmarks.bench_search --points 20000 --output results.json
+    python -m benchmarks.bench_search --embed-latency-ms 40 --concurrency 8
+    python -m benchmarks.bench_search --compare baseline.json --output current.json
+
+Seeds an in-process Qdrant (":memory:", or local path mode with --path) with a
+synthetic collection and runs kb.searcher against it with a deterministic
+fake embedder that sleeps --embed-latency-ms per request. Scenarios:
+
+    single    search() one query at a time
+    filtered  search() with a channel_slug filter
+    batch     search_many() over --batch-size queries per call
+
+Each scenario is run sequentially (latency percentiles) and from
+--concurrency threads (QPS). Peak RSS is the process high-water mark after
+the scenario, so it only grows from one scenario to the next. With
+--compare, p95 regressions above --tolerance percent exit non-zero.
+"""
+import hashlib
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import click
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from kb.searcher import search, search_many
+from kb.timings import percentile
+
+DIM = 1536
+CHANNELS = ["alpha", "beta", "gamma", "delta"]
+
+
+class FakeEmbedder:
+    """
+    OpenAI stand-in returning deterministic embeddings.
+
+    Each input's vector is seeded from its sha256, so a query always maps to
+    the same vector across runs; every create() call sleeps latency seconds
+    regardless of how many inputs it carries, like one HTTP round trip.
+    """
+
+    def __init__(self, dim: int = DIM, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.embeddings = SimpleNamespace(create=self.create)
+
+    def vector(self, text: str) -> list[float]:
+        rng = random.Random(hashlib.sha256(text.encode()).digest())
+        return [rng.gauss(0, 1) for _ in range(self.dim)]
+
+    def create(self, model, input):
+        if self.latency:
+            time.sleep(self.latency)
+        inputs = [input] if isinstance(input, str) else input
+        return SimpleNamespace(data=[SimpleNamespace(embedding=self.vector(text)) for text in inputs])
+
+
+def seed(client: QdrantClient, collection: str, points: int, dim: int = DIM) -> None:
+    rng = random.Random(0)
+    client.create_collection(collection, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+    for start in range(0, points, 512):
+        client.upsert(collection, points=[
+            PointStruct(
+                id=i,
+                vector=[rng.gauss(0, 1) for _ in range(dim)],
+                payload={
+                    "title": f"Video {i}",
+                    "text": "lorem ipsum " * 80,
+                    "channel_slug": CHANNELS[i % len(CHANNELS)],
+                    "timestamp_url": f"https://youtube.com/watch?v={i}",
+                    "transcript_source": "caption",
+                },
+            )
+            for i in range(start, min(start + 512, points))
+        ])
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(call, queries: list, concurrency: int, warmup: int = 3) -> dict:
+    """
+    Time call(query) for every query sequentially, then under concurrency threads.
+
+    A query may be a list (one search_many() call); QPS counts its members.
+    """
+    for query in queries[:warmup]:
+        call(query)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        call(query)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, queries))
+    elapsed = time.perf_counter() - start
+    searches = sum(len(q) if isinstance(q, list) else 1 for q in queries)
+
+    return {
+        "calls": len(queries),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "qps": round(searches / elapsed, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Return a description of every scenario whose p95 regressed by more than tolerance percent."""
+    regressions = []
+    if baseline.get("config") != current["config"]:
+        click.echo("warning: baseline was run with a different configuration", err=True)
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        click.echo(f"{name:<9} p95 {before['p95_ms']:>9.2f} -> {result['p95_ms']:>9.2f} ms ({change:+.1f}%)  "
+                   f"qps {before['qps']:>8.1f} -> {result['qps']:>8.1f}")
+        if change > tolerance:
+            regressions.append(f"{name}: p95 {change:+.1f}%")
+    return regressions
+
+
+@click.command()
+@click.option("--path", default=None, help="Qdrant local path mode directory instead of :memory:")
+@click.option("--points", default=20000, show_default=True, help="Number of points to seed")
+@click.option("--dim", default=DIM, show_default=True, help="Vector dimension")
+@click.option("--queries", default=200, show_default=True, help="Queries per scenario")
+@click.option("--top", default=5, show_default=True, help="Results per query")
+@click.option("--batch-size", default=32, show_default=True, help="Queries per search_many() call in the batch scenario")
+@click.option("--concurrency", default=4, show_default=True, help="Threads for the QPS measurement")
+@click.option("--embed-latency-ms", default=0.0, show_default=True, help="Simulated embedding request latency")
+@click.option("--scenarios", default="single,filtered,batch", show_default=True, help="Comma-separated scenarios to run")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write results as JSON to this file")
+@click.option("--compare", "baseline_file", type=click.File("r"), default=None, help="Compare against a previous --output file")
+@click.option("--tolerance", default=10.0, show_default=True, help="Allowed p95 regression in percent for --compare")
+def main(path, points, dim, queries, top, batch_size, concurrency, embed_latency_ms, scenarios, output,
+         baseline_file, tolerance):
+    client = QdrantClient(path=path) if path else QdrantClient(":memory:")
+    embedder = FakeEmbedder(dim, embed_latency_ms / 1000)
+    collection = f"bench_search_{uuid.uuid4().hex[:8]}"
+    seed(client, collection, points, dim)
+
+    texts = [f"query {i}" for i in range(queries)]
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    available = {
+        "single": (lambda q: search(q, client, embedder, collection, top), texts),
+        "filtered": (lambda q: search(q, client, embedder, collection, top, channel_slug="beta"), texts),
+        "batch": (lambda qs: list(search_many(qs, client, embedder, collection, top, batch_size=batch_size)),
+                  batches),
+    }
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {"points": points, "dim": dim, "queries": queries, "top": top, "batch_size": batch_size,
+                   "concurrency": concurrency, "embed_latency_ms": embed_latency_ms,
+                   "qdrant": "path" if path else "memory"},
+        "scenarios": {},
+    }
+    click.echo(f"{'scenario':<9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'qps':>9} {'peak RSS MB':>12}")
+    try:
+        for name in scenarios.split(","):
+            if name not in available:
+                raise click.BadParameter(f"Unknown scenario: {name}", param_hint="--scenarios")
+            call, inputs = available[name]
+            result = run_scenario(call, inputs, concurrency)
+            report["scenarios"][name] = result
+            click.echo(f"{name:<9} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                       f"{result['qps']:>9.1f} {result['peak_rss_mb']:>12.1f}")
+    finally:
+        client.delete_collection(collection)
+
+    if output:
+        with open(output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    if baseline_file is not None:
+        click.echo()
+        regressions = compare(json.load(baseline_file), report, tolerance)
+        if regressions:
+            raise click.ClickException("Regressions: " + ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
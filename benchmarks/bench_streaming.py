@@ -0,0 +1,84 @@
+"""
+Streaming benchmark: search() vs. iter_search() for growing --top.
+
+    python -m benchmarks.bench_streaming --points 10000 --tops 100,1000,5000
+    python -m benchmarks.bench_streaming --qdrant-url http://localhost:6333
+
+Reports time to first result and peak Python heap while consuming all
+results; for iter_search both should stay flat as top grows.
+"""
+import random
+import time
+import tracemalloc
+import uuid
+from types import SimpleNamespace
+
+import click
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from kb.searcher import iter_search, search
+
+DIM = 256
+
+
+class FakeOpenAI:
+    """Returns a fixed random embedding without any network call."""
+
+    def __init__(self):
+        rng = random.Random(1)
+        vector = [rng.gauss(0, 1) for _ in range(DIM)]
+        self.embeddings = SimpleNamespace(
+            create=lambda model, input: SimpleNamespace(data=[SimpleNamespace(embedding=vector)])
+        )
+
+
+def seed(client: QdrantClient, collection: str, points: int) -> None:
+    rng = random.Random(0)
+    client.create_collection(collection, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    for start in range(0, points, 1000):
+        client.upsert(collection, points=[
+            PointStruct(id=i, vector=[rng.gauss(0, 1) for _ in range(DIM)],
+                        payload={"title": f"Video {i}", "text": "lorem ipsum " * 150})
+            for i in range(start, min(start + 1000, points))
+        ])
+
+
+def measure(run) -> tuple[float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    for _ in run():
+        if first is None:
+            first = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (first or 0.0) * 1000, peak / 1e6
+
+
+@click.command()
+@click.option("--qdrant-url", default=None, help="Benchmark against a Qdrant server instead of :memory:")
+@click.option("--points", default=10000, show_default=True, help="Number of points to seed")
+@click.option("--tops", default="100,1000,5000", show_default=True, help="Comma-separated --top values")
+@click.option("--page-size", default=100, show_default=True, help="iter_search page size")
+def main(qdrant_url, points, tops, page_size):
+    client = QdrantClient(url=qdrant_url) if qdrant_url else QdrantClient(":memory:")
+    openai_client = FakeOpenAI()
+    collection = f"bench_streaming_{uuid.uuid4().hex[:8]}"
+    seed(client, collection, points)
+    click.echo(f"{'top':>6} {'variant':<12} {'first ms':>9} {'peak heap MB':>13}")
+    try:
+        for top in (int(t) for t in tops.split(",")):
+            variants = (
+                ("search", lambda: search("q", client, openai_client, collection, top)),
+                ("iter_search", lambda: iter_search("q", client, openai_client, collection, top, page_size=page_size)),
+            )
+            for name, run in variants:
+                first_ms, peak_mb = measure(run)
+                click.echo(f"{top:>6} {name:<12} {first_ms:>9.2f} {peak_mb:>13.1f}")
+    finally:
+        client.delete_collection(collection)
+
+
+if __name__ == "__main__":
+    main()
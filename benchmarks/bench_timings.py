@@ -0,0 +1,82 @@
+"""
+Instrumentation overhead benchmark: search() with and without Timings.
+
+    python -m benchmarks.bench_timings --calls 20000
+
+Runs search() against stub OpenAI/Qdrant clients that answer instantly, so
+the per-call time is almost entirely kb.searcher's own work and any cost of
+the timing instrumentation shows up directly. Reports the mean per-call time
+with timings disabled (the default), enabled, and enabled with a span hook,
+plus the cost of the no-op stage/count calls a disabled search() makes.
+"""
+import time
+from types import SimpleNamespace
+
+import click
+
+from kb.searcher import search
+from kb.timings import NULL_TIMINGS, Timings
+
+HITS = [SimpleNamespace(id=i, score=1.0 - i / 10, payload={"title": f"Video {i}", "text": "lorem ipsum " * 20})
+        for i in range(5)]
+
+
+def stub_clients():
+    openai_client = SimpleNamespace(embeddings=SimpleNamespace(
+        create=lambda model, input: SimpleNamespace(data=[SimpleNamespace(embedding=[0.1] * 8)])
+    ))
+    qdrant_client = SimpleNamespace(search=lambda **kwargs: HITS)
+    return openai_client, qdrant_client
+
+
+def per_call_us(calls: int, make_timings) -> float:
+    openai_client, qdrant_client = stub_clients()
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(calls):
+            search("q", qdrant_client, openai_client, "kb", 5, timings=make_timings())
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e6
+
+
+def null_overhead_us(calls: int) -> float:
+    """Time the NULL_TIMINGS calls search() makes per uncached query, on their own."""
+    timings = NULL_TIMINGS
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(calls):
+            with timings.stage("embed"):
+                pass
+            with timings.stage("filter"):
+                pass
+            with timings.stage("qdrant"):
+                pass
+            timings.count("hits", 5)
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e6
+
+
+@click.command()
+@click.option("--calls", default=20000, show_default=True, help="search() calls per repetition (best of 5)")
+def main(calls):
+    spans = []
+    variants = (
+        ("disabled", lambda: None),
+        ("enabled", Timings),
+        ("enabled+hook", lambda: Timings(hooks=[lambda name, start, seconds: spans.append(seconds)])),
+    )
+    baseline = None
+    click.echo(f"{'variant':<13} {'us/call':>9} {'overhead':>9}")
+    for name, make_timings in variants:
+        us = per_call_us(calls, make_timings)
+        baseline = baseline or us
+        click.echo(f"{name:<13} {us:>9.2f} {us - baseline:>+8.2f}us")
+        spans.clear()
+    null_us = null_overhead_us(calls)
+    click.echo(f"\nno-op instrumentation when disabled: {null_us:.3f} us/call ({null_us / baseline:.1%} of search())")
+
+
+if __name__ == "__main__":
+    main()
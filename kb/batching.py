@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+from openai import AsyncOpenAI, OpenAI
+
+DEFAULT_WINDOW = 0.005
+DEFAULT_MAX_BATCH = 64
+
+
+class _Batch:
+    """Texts waiting for one embeddings.create call, each with the future its callers wait on."""
+
+    def __init__(self, model: str, full):
+        self.model = model
+        self.futures: dict = {}
+        self.full = full
+
+
+def _resolve(batch: _Batch, vectors: list[list[float]]) -> None:
+    """Hand each caller its vector; texts a short response left out fail instead of hanging."""
+    for future, vector in zip(batch.futures.values(), vectors):
+        future.set_result(vector)
+    error = RuntimeError(f"Embedding response had {len(vectors)} vector(s) for {len(batch.futures)} input(s)")
+    for future in batch.futures.values():
+        if not future.done():
+            future.set_exception(error)
+
+
+def _remaining(deadline: float | None) -> float | None:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def _response(vectors: list[list[float]]) -> SimpleNamespace:
+    return SimpleNamespace(data=[SimpleNamespace(embedding=vector) for vector in vectors])
+
+
+class EmbeddingBatcher:
+    """
+    Coalesce concurrent embedding requests from threads into multi-input calls.
+
+    Stands in for the OpenAI client wherever search() expects one: its
+    embeddings.create(model=..., input=...) blocks the calling thread, and
+    the first caller of a batch waits up to window seconds (or until
+    max_batch distinct texts have joined), then sends them all in one request.
+    Identical texts in a window share one input. Errors reach every caller
+    of the batch; a per-call timeout bounds how long a caller waits for it,
+    including the embedding request it sends as the leader of a batch.
+    """
+
+    def __init__(self, openai_client: OpenAI, window: float = DEFAULT_WINDOW, max_batch: int = DEFAULT_MAX_BATCH):
+        self.openai_client = openai_client
+        self.window = window
+        self.max_batch = max_batch
+        self.embeddings = SimpleNamespace(create=self.create)
+        self._open: dict[str, _Batch] = {}
+        self._lock = threading.Lock()
+        self._requests = self._inputs = self._calls = 0
+
+    def create(self, model: str, input: str | list[str], timeout: float | None = None) -> SimpleNamespace:
+        texts = [input] if isinstance(input, str) else list(input)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        led, futures = self._join(model, texts)
+        for batch in led:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(model) is batch:
+                    del self._open[model]
+            self._flush(batch, _remaining(deadline))
+        return _response([future.result(_remaining(deadline)) for future in futures])
+
+    def _join(self, model: str, texts: list[str]) -> tuple[list[_Batch], list[Future]]:
+        """Add texts to the open batch for model; returns the batches this caller opened and must flush."""
+        led = []
+        futures = []
+        with self._lock:
+            self._requests += 1
+            for text in texts:
+                batch = self._open.get(model)
+                if batch is None:
+                    batch = self._open[model] = _Batch(model, threading.Event())
+                    led.append(batch)
+                if text not in batch.futures:
+                    batch.futures[text] = Future()
+                futures.append(batch.futures[text])
+                if len(batch.futures) >= self.max_batch:
+                    del self._open[model]
+                    batch.full.set()
+        return led, futures
+
+    def _flush(self, batch: _Batch, timeout: float | None = None) -> None:
+        texts = list(batch.futures)
+        with self._lock:
+            self._inputs += len(texts)
+            self._calls += 1
+        options = {"timeout": timeout} if timeout is not None else {}
+        try:
+            response = self.openai_client.embeddings.create(model=batch.model, input=texts, **options)
+            vectors = [item.embedding for item in response.data]
+        except Exception as e:
+            for future in batch.futures.values():
+                future.set_exception(e)
+            return
+        _resolve(batch, vectors)
+
+    def stats(self) -> dict:
+        """Requests received, distinct texts embedded and embedding calls made."""
+        with self._lock:
+            return {"requests": self._requests, "inputs": self._inputs, "calls": self._calls}
+
+
+class AsyncEmbeddingBatcher:
+    """
+    asyncio counterpart of EmbeddingBatcher, standing in for AsyncOpenAI.
+
+    Must be used from a single event loop; embeddings.create is a coroutine.
+    """
+
+    def __init__(self, openai_client: AsyncOpenAI, window: float = DEFAULT_WINDOW, max_batch: int = DEFAULT_MAX_BATCH):
+        self.openai_client = openai_client
+        self.window = window
+        self.max_batch = max_batch
+        self.embeddings = SimpleNamespace(create=self.create)
+        self._open: dict[str, _Batch] = {}
+        self._requests = self._inputs = self._calls = 0
+
+    async def create(self, model: str, input: str | list[str]) -> SimpleNamespace:
+        texts = [input] if isinstance(input, str) else list(input)
+        loop = asyncio.get_running_loop()
+        led = []
+        futures = []
+        self._requests += 1
+        for text in texts:
+            batch = self._open.get(model)
+            if batch is None:
+                batch = self._open[model] = _Batch(model, asyncio.Event())
+                led.append(batch)
+            if text not in batch.futures:
+                batch.futures[text] = loop.create_future()
+            futures.append(batch.futures[text])
+            if len(batch.futures) >= self.max_batch:
+                del self._open[model]
+                batch.full.set()
+        for batch in led:
+            try:
+                await asyncio.wait_for(batch.full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            if self._open.get(model) is batch:
+                del self._open[model]
+            await self._flush(batch)
+        return _response([await future for future in futures])
+
+    async def _flush(self, batch: _Batch) -> None:
+        texts = list(batch.futures)
+        self._inputs += len(texts)
+        self._calls += 1
+        try:
+            response = await self.openai_client.embeddings.create(model=batch.model, input=texts)
+            vectors = [item.embedding for item in response.data]
+        except Exception as e:
+            for future in batch.futures.values():
+                future.set_exception(e)
+            return
+        _resolve(batch, vectors)
+
+    def stats(self) -> dict:
+        """Requests received, distinct texts embedded and embedding calls made."""
+        return {"requests": self._requests, "inputs": self._inputs, "calls": self._calls}
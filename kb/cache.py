@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+from kb.config import DEFAULT_CACHE_PATH, DEFAULT_VERSION_DIR
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for use as a cache key (NFC, collapsed whitespace)."""
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+def encode_vector(vector: list[float]) -> bytes:
+    """Pack a vector as a compact float32 blob."""
+    return array("f", vector).tobytes()
+
+
+def decode_vector(blob: bytes) -> list[float]:
+    """Unpack a float32 blob produced by encode_vector."""
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class MemoryCache:
+    """In-process LRU store of bytes values with size- and age-based eviction."""
+
+    def __init__(self, max_entries: int = 1024, max_age: float | None = None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if self.max_age is not None and time.time() - created_at > self.max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    SQLite-backed store of bytes values, evicting least recently used and expired entries.
+
+    A hit refreshes the entry's access time only when it is older than
+    touch_interval seconds, so most reads do not write to the database;
+    LRU order is kept at that granularity.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        table: str = "embeddings",
+        max_entries: int = 100_000,
+        max_age: float | None = 30 * 24 * 3600,
+        touch_interval: float = 3600,
+    ):
+        self.path = os.path.expanduser(path)
+        self.table = table
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.touch_interval = touch_interval
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> bytes | None:
+        row = self._conn.execute(
+            f"SELECT value, created_at, accessed_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at, accessed_at = row
+        now = time.time()
+        if self.max_age is not None and now - created_at > self.max_age:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        if now - accessed_at >= self.touch_interval:
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        if self.max_age is not None:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.max_age,)
+            )
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return count
+
+
+class TieredCache:
+    """Chain of stores checked in order; hits in a slower tier are copied into faster ones."""
+
+    def __init__(self, *tiers):
+        self.tiers = tiers
+
+    def get(self, key: str) -> bytes | None:
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:i]:
+                    faster.put(key, value)
+                return value
+        return None
+
+    def put(self, key: str, value: bytes) -> None:
+        for tier in self.tiers:
+            tier.put(key, value)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+
+class EmbeddingCache:
+    """
+    Query-embedding cache keyed by (model, normalized query).
+
+    Wraps any store with get/put/clear (MemoryCache, DiskCache, TieredCache)
+    and keeps hit/miss counters for reporting.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, query: str) -> str:
+        return f"{model}\x00{normalize_query(query)}"
+
+    def get(self, model: str, query: str) -> list[float] | None:
+        blob = self.store.get(self.key(model, query))
+        if blob is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return decode_vector(blob)
+
+    def put(self, model: str, query: str, vector: list[float]) -> None:
+        self.store.put(self.key(model, query), encode_vector(vector))
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def read_version_marker(collection: str, version_dir: str = DEFAULT_VERSION_DIR) -> str | None:
+    """Return the version an indexer wrote to <version_dir>/<collection>, if any."""
+    try:
+        with open(os.path.join(os.path.expanduser(version_dir), collection)) as fh:
+            return fh.read().strip() or None
+    except OSError:
+        return None
+
+
+class ResultCache:
+    """
+    Search-result cache with TTL, LRU eviction and collection-version invalidation.
+
+    Entries are keyed by a hash of (model, normalized query, collection,
+    channel filter, top_k, payload selector, search options) -- the query
+    embedding is a pure function of (model, query), so a hit skips both the
+    embedding and the Qdrant call. Each entry records the collection version it was computed
+    against and is ignored once that version changes. The version is the
+    indexer-written marker when present, otherwise the collection's point
+    count, re-read from Qdrant at most every version_check_interval seconds.
+    TTL and size limits are enforced by the underlying store.
+    """
+
+    def __init__(self, store, version_check_interval: float = 10.0, version_dir: str = DEFAULT_VERSION_DIR):
+        self.store = store
+        self.version_check_interval = version_check_interval
+        self.version_dir = version_dir
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, query: str, collection: str, channel_slug, top_k: int, with_payload, *options) -> str:
+        parts = [model, normalize_query(query), collection, channel_slug, top_k, str(with_payload), *map(str, options)]
+        return "result:" + hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+    def collection_version(self, qdrant_client, collection: str) -> str:
+        marker = read_version_marker(collection, self.version_dir)
+        if marker is not None:
+            return f"marker:{marker}"
+        version_key = f"version:{collection}"
+        observed = self.store.get(version_key)
+        if observed is not None:
+            checked_at, version = json.loads(observed)
+            if time.time() - checked_at < self.version_check_interval:
+                return version
+        version = f"points:{qdrant_client.get_collection(collection).points_count}"
+        self.store.put(version_key, json.dumps([time.time(), version]).encode())
+        return version
+
+    def get(self, key: str, version: str) -> list[dict] | None:
+        blob = self.store.get(key)
+        if blob is not None:
+            entry = json.loads(blob)
+            if entry["version"] == version:
+                self.hits += 1
+                return entry["results"]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, version: str, results: list[dict]) -> None:
+        self.store.put(key, json.dumps({"version": version, "results": results}, ensure_ascii=False).encode())
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def make_embedding_cache(kind: str, path: str = DEFAULT_CACHE_PATH) -> EmbeddingCache | None:
+    """Build an embedding cache for kind "memory", "disk" (memory in front of SQLite) or "off"."""
+    if kind == "off":
+        return None
+    if kind == "memory":
+        return EmbeddingCache(MemoryCache())
+    if kind == "disk":
+        return EmbeddingCache(TieredCache(MemoryCache(), DiskCache(path)))
+    raise ValueError(f"Unknown cache kind: {kind}")
+
+
+def make_result_cache(kind: str, path: str = DEFAULT_CACHE_PATH, ttl: float = 300) -> ResultCache | None:
+    """Build a result cache for kind "memory", "disk" or "off", expiring entries after ttl seconds."""
+    if kind == "off":
+        return None
+    if kind == "memory":
+        return ResultCache(MemoryCache(max_age=ttl))
+    if kind == "disk":
+        return ResultCache(TieredCache(MemoryCache(max_age=ttl), DiskCache(path, table="results", max_entries=10_000, max_age=ttl)))
+    raise ValueError(f"Unknown cache kind: {kind}")
@@ -0,0 +1,22 @@
+"""
+Defaults shared by the CLI and the kb modules.
+
+Kept free of third-party imports so the CLI can build its options without
+loading openai / qdrant_client.
+"""
+import os
+
+DEFAULT_CACHE_PATH = os.path.join("~", ".config", "knowledge-vault", "cache.sqlite")
+DEFAULT_DAEMON_URL = "http://127.0.0.1:8765"
+# Indexers may write the current collection version to <dir>/<collection>
+DEFAULT_VERSION_DIR = os.path.join("~", ".config", "knowledge-vault", "versions")
+DEFAULT_LEXICAL_DIR = os.path.join("~", ".config", "knowledge-vault", "lexical")
+DEFAULT_SEMANTIC_CACHE_PATH = os.path.join("~", ".config", "knowledge-vault", "semantic-cache.npz")
+
+SNIPPET_LENGTH = 200
+
+# Client-side timeout (seconds) for OpenAI and Qdrant requests
+DEFAULT_TIMEOUT = 30.0
+
+# Payload fields rendered by `kb-search run`; everything else is left on the server
+RUN_FIELDS = "title,transcript_source,text,timestamp_url"
@@ -0,0 +1,154 @@
+import time
+from concurrent.futures import wait
+from typing import Callable
+
+from openai import OpenAI
+from qdrant_client import QdrantClient
+from qdrant_client.models import CollectionStatus
+
+from kb.filters import FILTER_INDEXES
+from kb.resilience import DeadlineExceeded, submit_daemon
+from kb.timings import percentile
+
+PROBE_TEXT = "kb-search check"
+
+
+def measure(fn: Callable[[float | None], object], samples: int, expires_at: float | None = None) -> dict:
+    """
+    Call fn(timeout) up to samples times; return round-trip latency percentiles in ms.
+
+    With expires_at (time.monotonic()), each call gets the time left as its
+    timeout and sampling stops once it has passed, so "samples" may be lower
+    than asked. Raises fn's first error, or DeadlineExceeded if no call fit.
+    """
+    latencies = []
+    for _ in range(samples):
+        timeout = expires_at - time.monotonic() if expires_at is not None else None
+        if timeout is not None and timeout <= 0:
+            break
+        start = time.perf_counter()
+        fn(timeout)
+        latencies.append((time.perf_counter() - start) * 1000)
+    if not latencies:
+        raise DeadlineExceeded("no call finished before the deadline")
+    return {
+        "samples": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "max_ms": round(max(latencies), 3),
+    }
+
+
+def _dump(model) -> dict | None:
+    return model.model_dump(mode="json", exclude_none=True) if model is not None else None
+
+
+def collection_health(qdrant_client: QdrantClient, collection: str) -> dict:
+    """Point / indexed-vector / segment counts, status, quantization and payload indexes of a collection."""
+    info = qdrant_client.get_collection(collection)
+    params = info.config.params
+    vectors = params.vectors if hasattr(params.vectors, "size") else None
+    optimizer = info.optimizer_status
+    schema = info.payload_schema or {}
+    return {
+        "status": getattr(info.status, "value", str(info.status)),
+        "optimizer_status": getattr(optimizer, "value", None) or f"error: {getattr(optimizer, 'error', optimizer)}",
+        "points_count": info.points_count,
+        "indexed_vectors_count": info.indexed_vectors_count,
+        "segments_count": info.segments_count,
+        "vector_size": vectors.size if vectors is not None else None,
+        "quantization": _dump(
+            (vectors.quantization_config if vectors is not None else None) or info.config.quantization_config
+        ),
+        "payload_indexes": {field: getattr(index.data_type, "value", str(index.data_type))
+                            for field, index in schema.items()},
+        "missing_filter_indexes": [
+            field for field, kind in FILTER_INDEXES.items() if field not in schema or schema[field].data_type != kind
+        ],
+    }
+
+
+def _remaining(expires_at: float | None) -> float | None:
+    return max(expires_at - time.monotonic(), 0.001) if expires_at is not None else None
+
+
+def _check_openai(make_client: Callable[[], OpenAI], model: str, samples: int, expires_at: float | None) -> dict:
+    try:
+        client = make_client()
+        client.models.list(timeout=_remaining(expires_at))
+    except Exception as e:
+        return {"name": "openai", "ok": False, "message": f"OpenAI API key is invalid: {e}"}
+    try:
+        latency = measure(lambda timeout: client.embeddings.create(model=model, input=PROBE_TEXT, timeout=timeout),
+                          samples, expires_at)
+    except Exception as e:
+        return {"name": "openai", "ok": False, "message": f"OpenAI embeddings failed: {e}"}
+    return {"name": "openai", "ok": True, "message": "OpenAI API key is valid", "latency": latency}
+
+
+def _check_qdrant(qdrant_client: QdrantClient, samples: int, expires_at: float | None) -> dict:
+    try:
+        # get_collections takes no per-call timeout; the caller builds the client with the deadline
+        latency = measure(lambda timeout: qdrant_client.get_collections(), samples, expires_at)
+    except Exception as e:
+        return {"name": "qdrant", "ok": False, "message": f"Qdrant is not reachable: {e}"}
+    return {"name": "qdrant", "ok": True, "message": "Qdrant is reachable", "latency": latency}
+
+
+def _check_collection(qdrant_client: QdrantClient, collection: str, require_indexes: bool) -> dict:
+    try:
+        health = collection_health(qdrant_client, collection)
+    except Exception as e:
+        # Only --indexes makes the collection a requirement; otherwise check stays a connectivity check
+        return {"name": "collection", "ok": not require_indexes, "warning": not require_indexes,
+                "message": f"Failed to read collection {collection}: {e}"}
+    result = {"name": "collection", "ok": health["status"] != CollectionStatus.RED.value, "health": health,
+              "message": f"{collection} is {health['status']}"}
+    if require_indexes and health["missing_filter_indexes"]:
+        result["ok"] = False
+        result["message"] = (f"{collection} lacks payload indexes on {', '.join(health['missing_filter_indexes'])} "
+                             f"(run `kb-search ensure-indexes`)")
+    return result
+
+
+def run_checks(
+    openai_api_key: str,
+    make_openai_client: Callable[[], OpenAI],
+    qdrant_client: QdrantClient,
+    collection: str,
+    model: str = "text-embedding-3-small",
+    samples: int = 5,
+    deadline: float = 10.0,
+    require_indexes: bool = False,
+) -> list[dict]:
+    """
+    Run the OpenAI, Qdrant and collection probes concurrently under one deadline.
+
+    make_openai_client is called inside the OpenAI probe, so a rejected key
+    is reported like any other failure. Returns one {"name", "ok", "message"}
+    dict per check in a fixed order (an unreadable collection is ok with
+    "warning" set unless require_indexes), with "latency" (see measure) on the
+    OpenAI / Qdrant probes and "health" (see collection_health) on the
+    collection probe. Each call gets the time left before the deadline and
+    probes still running at it are reported as failed; they run on daemon
+    threads, so they do not delay exit either.
+    """
+    checks = [{
+        "name": "openai_key",
+        "ok": bool(openai_api_key),
+        "message": "OPENAI_API_KEY is set" if openai_api_key else "OPENAI_API_KEY is not set",
+    }]
+    expires_at = time.monotonic() + deadline
+    probes = {
+        "openai": (_check_openai, make_openai_client, model, samples, expires_at),
+        "qdrant": (_check_qdrant, qdrant_client, samples, expires_at),
+        "collection": (_check_collection, qdrant_client, collection, require_indexes),
+    }
+    futures = {name: submit_daemon(*probe) for name, probe in probes.items()}
+    wait(futures.values(), timeout=deadline)
+    for name, future in futures.items():
+        if future.done():
+            checks.append(future.result())
+        else:
+            checks.append({"name": name, "ok": False, "message": f"{name} probe timed out after {deadline:g}s"})
+    return checks
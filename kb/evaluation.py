@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import SearchParams
+
+from kb.searcher import build_filter
+from kb.timings import percentile
+
+
+def evaluate_presets(
+    qdrant_client: QdrantClient,
+    collection: str,
+    query_vectors: list[list[float]],
+    top_k: int,
+    presets: dict[str, SearchParams | None],
+    channel_slug: str | None = None,
+) -> list[dict]:
+    """
+    Measure recall@top_k and latency of each search-params preset.
+
+    Ground truth for every query is an exact (brute-force) search; recall is
+    the fraction of those ids a preset also returns. Returns one row per
+    preset with mean recall and p50/p95 latency in milliseconds.
+    """
+    query_filter = build_filter(channel_slug)
+
+    def run(vector, params):
+        start = time.perf_counter()
+        try:
+            hits = qdrant_client.search(
+                collection_name=collection,
+                query_vector=vector,
+                limit=top_k,
+                query_filter=query_filter,
+                search_params=params,
+                with_payload=False,
+                with_vectors=False,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to search Qdrant: {e}") from e
+        return {hit.id for hit in hits}, time.perf_counter() - start
+
+    truths = [run(vector, SearchParams(exact=True))[0] for vector in query_vectors]
+
+    rows = []
+    for name, params in presets.items():
+        recalls, latencies = [], []
+        for vector, truth in zip(query_vectors, truths):
+            ids, elapsed = run(vector, params)
+            recalls.append(len(ids & truth) / len(truth) if truth else 1.0)
+            latencies.append(elapsed)
+        rows.append({
+            "preset": name,
+            "recall": statistics.fmean(recalls),
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+        })
+    return rows
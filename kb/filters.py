@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+from datetime import date
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    FieldCondition,
+    MatchAny,
+    MatchValue,
+    PayloadSchemaType,
+    Range,
+)
+
+# Payload fields search filters on, with the index type each one needs
+FILTER_INDEXES = {
+    "channel_slug": PayloadSchemaType.KEYWORD,
+    "source_type": PayloadSchemaType.KEYWORD,
+    "transcript_source": PayloadSchemaType.KEYWORD,
+    "upload_date": PayloadSchemaType.INTEGER,
+}
+
+
+def parse_date(value: str) -> int:
+    """Parse YYYYMMDD or YYYY-MM-DD into the integer YYYYMMDD used for upload_date ranges."""
+    digits = value.replace("-", "")
+    try:
+        if len(digits) != 8:
+            raise ValueError
+        date(int(digits[:4]), int(digits[4:6]), int(digits[6:]))
+    except ValueError:
+        raise ValueError(f"Invalid date: {value} (expected YYYY-MM-DD)") from None
+    return int(digits)
+
+
+def match(key: str, values) -> FieldCondition:
+    """MatchValue for one value, MatchAny for several."""
+    values = list(values)
+    if len(values) == 1:
+        return FieldCondition(key=key, match=MatchValue(value=values[0]))
+    return FieldCondition(key=key, match=MatchAny(any=values))
+
+
+@dataclass(frozen=True, slots=True)
+class PayloadFilter:
+    """
+    Payload conditions beyond a single channel, ANDed together.
+
+    Each tuple field matches any of its values; empty tuples and None bounds
+    do not filter. upload_date bounds are inclusive YYYYMMDD integers, which
+    requires upload_date to be stored as an integer (see convert_upload_dates).
+    """
+
+    channels: tuple[str, ...] = ()
+    source_types: tuple[str, ...] = ()
+    transcript_sources: tuple[str, ...] = ()
+    date_from: int | None = None
+    date_to: int | None = None
+
+    def conditions(self) -> list[FieldCondition]:
+        conditions = []
+        for key, values in (
+            ("channel_slug", self.channels),
+            ("source_type", self.source_types),
+            ("transcript_source", self.transcript_sources),
+        ):
+            if values:
+                conditions.append(match(key, values))
+        if self.date_from is not None or self.date_to is not None:
+            conditions.append(FieldCondition(key="upload_date", range=Range(gte=self.date_from, lte=self.date_to)))
+        return conditions
+
+    def as_dict(self) -> dict:
+        """JSON-serializable form, read back by from_dict()."""
+        return {
+            "channels": list(self.channels),
+            "source_types": list(self.source_types),
+            "transcript_sources": list(self.transcript_sources),
+            "date_from": self.date_from,
+            "date_to": self.date_to,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PayloadFilter":
+        return cls(
+            channels=tuple(data.get("channels") or ()),
+            source_types=tuple(data.get("source_types") or ()),
+            transcript_sources=tuple(data.get("transcript_sources") or ()),
+            date_from=data.get("date_from"),
+            date_to=data.get("date_to"),
+        )
+
+
+def missing_indexes(qdrant_client: QdrantClient, collection: str) -> dict[str, PayloadSchemaType]:
+    """Return the FILTER_INDEXES entries collection has no (or a differently typed) payload index for."""
+    try:
+        schema = qdrant_client.get_collection(collection).payload_schema or {}
+    except Exception as e:
+        raise RuntimeError(f"Failed to read collection {collection}: {e}") from e
+    return {
+        field: kind
+        for field, kind in FILTER_INDEXES.items()
+        if field not in schema or schema[field].data_type != kind
+    }
+
+
+def ensure_indexes(qdrant_client: QdrantClient, collection: str) -> list[str]:
+    """Create the payload indexes filtered searches need; returns the fields indexed now."""
+    missing = missing_indexes(qdrant_client, collection)
+    for field, kind in missing.items():
+        try:
+            qdrant_client.create_payload_index(collection, field_name=field, field_schema=kind, wait=True)
+        except Exception as e:
+            raise RuntimeError(f"Failed to index {field}: {e}") from e
+    return list(missing)
+
+
+def convert_upload_dates(qdrant_client: QdrantClient, collection: str, batch_size: int = 256) -> int:
+    """
+    Rewrite string upload_date payloads ("20240101") as integers, in streaming batches.
+
+    Points sharing a date are updated with one set_payload call per batch.
+    Returns the number of points converted.
+    """
+    converted = 0
+    offset = None
+    while True:
+        try:
+            records, offset = qdrant_client.scroll(
+                collection_name=collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["upload_date"],
+                with_vectors=False,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to scroll Qdrant: {e}") from e
+        by_date: dict[int, list] = {}
+        for record in records:
+            value = (record.payload or {}).get("upload_date")
+            if isinstance(value, str) and value.isdigit() and len(value) == 8:
+                by_date.setdefault(int(value), []).append(record.id)
+        for value, ids in by_date.items():
+            try:
+                qdrant_client.set_payload(collection, payload={"upload_date": value}, points=ids)
+            except Exception as e:
+                raise RuntimeError(f"Failed to update upload_date: {e}") from e
+            converted += len(ids)
+        if offset is None:
+            return converted
@@ -0,0 +1,161 @@
+import math
+
+from openai import OpenAI
+from qdrant_client import QdrantClient
+from qdrant_client.models import FieldCondition, Filter, MatchValue, Range, SearchParams
+
+from kb.cache import EmbeddingCache
+from kb.filters import PayloadFilter
+from kb.resilience import Resilience
+from kb.searcher import PayloadSelector, build_filter, embed_query
+from kb.timings import NULL_TIMINGS, Timings
+
+# Payload fields context expansion needs from every hit
+CONTEXT_FIELDS = ["video_id", "chunk_index"]
+
+
+def with_context_fields(spec: str | None) -> str | None:
+    """Extend a --fields spec (see parse_fields) so it fetches CONTEXT_FIELDS."""
+    if spec is None or spec == "all":
+        return spec
+    if spec == "none":
+        return ",".join(CONTEXT_FIELDS)
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    if any(name.startswith("-") for name in names):
+        return ",".join(name for name in names if name[1:] not in CONTEXT_FIELDS)
+    return ",".join(names + [field for field in CONTEXT_FIELDS if field not in names])
+
+
+def search_grouped(
+    query: str,
+    qdrant_client: QdrantClient,
+    openai_client: OpenAI,
+    collection: str,
+    top_k: int,
+    group_by: str = "video_id",
+    group_size: int = 1,
+    channel_slug: str | None = None,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+    with_payload: PayloadSelector = True,
+    search_params: SearchParams | None = None,
+    score_threshold: float | None = None,
+    payload_filter: PayloadFilter | None = None,
+    timings: Timings | None = None,
+    resilience: Resilience | None = None,
+) -> list[dict]:
+    """
+    Search top_k groups of points sharing a group_by payload value (one video each).
+
+    Uses Qdrant's server-side group search. Each result is the group's best
+    hit in the usual {"id", "score", "payload"} shape, plus "group" (the
+    group_by value) and "more": its next group_size - 1 hits, best first.
+    With resilience, the embedding and the group search share one deadline
+    and are retried as in search().
+    """
+    if timings is None:
+        timings = NULL_TIMINGS
+    budget = resilience.start() if resilience is not None else None
+
+    with timings.stage("embed"):
+        query_vector = embed_query(query, openai_client, model, embedding_cache, budget)
+    with timings.stage("filter"):
+        query_filter = build_filter(channel_slug, payload_filter)
+
+    def qdrant_search(timeout: float | None):
+        options = {"timeout": max(1, math.ceil(timeout))} if timeout is not None else {}
+        return qdrant_client.search_groups(
+            collection_name=collection,
+            query_vector=query_vector,
+            group_by=group_by,
+            query_filter=query_filter,
+            search_params=search_params,
+            limit=top_k,
+            group_size=group_size,
+            with_payload=with_payload,
+            with_vectors=False,
+            score_threshold=score_threshold,
+            **options,
+        )
+
+    with timings.stage("qdrant"):
+        try:
+            response = budget.call("qdrant", qdrant_search) if budget is not None else qdrant_search(None)
+        except Exception as e:
+            raise RuntimeError(f"Failed to search Qdrant: {e}") from e
+
+    results = []
+    for group in response.groups:
+        best, *more = [{"id": hit.id, "score": hit.score, "payload": hit.payload or {}} for hit in group.hits]
+        results.append({**best, "group": group.id, "more": more})
+    timings.count("hits", len(results))
+    return results
+
+
+def expand_context(
+    qdrant_client: QdrantClient,
+    collection: str,
+    results: list[dict],
+    window: int,
+    timings: Timings | None = None,
+) -> list[dict]:
+    """
+    Add "context" to each result: its text stitched with chunk_index +/- window of the same video.
+
+    All neighbours are fetched with one scroll over a single filter that ORs a
+    (video_id, chunk_index range) clause per hit. Results need video_id and
+    chunk_index in their payload; others are returned unchanged.
+    """
+    if timings is None:
+        timings = NULL_TIMINGS
+
+    wanted = {}
+    for result in results:
+        payload = result["payload"]
+        if "video_id" in payload and "chunk_index" in payload:
+            wanted[(payload["video_id"], payload["chunk_index"])] = None
+    if not wanted or window <= 0:
+        return results
+
+    clauses = [
+        Filter(must=[
+            FieldCondition(key="video_id", match=MatchValue(value=video_id)),
+            FieldCondition(key="chunk_index", range=Range(gte=index - window, lte=index + window)),
+        ])
+        for video_id, index in wanted
+    ]
+    with timings.stage("context"):
+        chunks: dict[tuple, str] = {}
+        limit = len(wanted) * (2 * window + 1)
+        offset = None
+        while True:
+            try:
+                records, offset = qdrant_client.scroll(
+                    collection_name=collection,
+                    scroll_filter=Filter(should=clauses),
+                    limit=limit,
+                    offset=offset,
+                    with_payload=["video_id", "chunk_index", "text"],
+                    with_vectors=False,
+                )
+            except Exception as e:
+                raise RuntimeError(f"Failed to fetch context chunks: {e}") from e
+            for record in records:
+                payload = record.payload or {}
+                chunks[(payload.get("video_id"), payload.get("chunk_index"))] = payload.get("text", "")
+            if offset is None:
+                break
+    timings.count("context_chunks", len(chunks))
+
+    expanded = []
+    for result in results:
+        payload = result["payload"]
+        if (payload.get("video_id"), payload.get("chunk_index")) not in wanted:
+            expanded.append(result)
+            continue
+        video_id, index = payload["video_id"], payload["chunk_index"]
+        parts = [
+            chunks[(video_id, i)] for i in range(index - window, index + window + 1) if (video_id, i) in chunks
+        ]
+        expanded.append({**result, "context": " ".join(part.strip() for part in parts)})
+    return expanded
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import unicodedata
+from collections import Counter
+
+from qdrant_client import QdrantClient
+
+from kb.config import DEFAULT_LEXICAL_DIR
+from kb.searcher import select_payload
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+INDEXED_FIELDS = ("title", "text")
+
+_TOKEN_RE = re.compile(r"\w+")
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics, so "Trénink" matches "trenink"."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(fold(text))
+
+
+def default_index_path(collection: str) -> str:
+    return os.path.join(os.path.expanduser(DEFAULT_LEXICAL_DIR), f"{collection}.sqlite")
+
+
+def reciprocal_rank_fusion(result_lists: list[list[dict]], top_k: int, k: int = RRF_K) -> list[dict]:
+    """
+    Merge ranked result lists (dicts with "id") by reciprocal rank fusion.
+
+    Each result's score becomes sum(1 / (k + rank)) over the lists it appears
+    in; the payload is taken from its first occurrence.
+    """
+    fused: dict = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            entry = fused.setdefault(result["id"], {**result, "score": 0.0})
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda r: r["score"], reverse=True)[:top_k]
+
+
+class LexicalIndex:
+    """
+    On-disk BM25 inverted index over the title/text payloads of a collection.
+
+    Stored in SQLite: one row per document (length, fingerprint, channel,
+    payload) and one posting per (term, document). refresh() streams the
+    collection and only rewrites documents whose indexed fields changed.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " id TEXT PRIMARY KEY, length INTEGER NOT NULL, fingerprint TEXT NOT NULL,"
+            " channel_slug TEXT, payload TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL, doc TEXT NOT NULL, tf INTEGER NOT NULL,"
+            " PRIMARY KEY (term, doc)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()
+        return count
+
+    def refresh(self, qdrant_client: QdrantClient, collection: str, batch_size: int = 256) -> dict:
+        """
+        Bring the index in line with collection in one streaming scroll.
+
+        Returns counts of added, updated, unchanged and removed documents.
+        """
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        conn = self._conn
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM seen")
+        offset = None
+        while True:
+            try:
+                records, offset = qdrant_client.scroll(
+                    collection_name=collection,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False,
+                )
+            except Exception as e:
+                raise RuntimeError(f"Failed to scroll Qdrant: {e}") from e
+            for record in records:
+                self._upsert(json.dumps(record.id), record.payload or {}, counts)
+            conn.commit()
+            if offset is None:
+                break
+
+        stale = [row[0] for row in conn.execute("SELECT id FROM docs WHERE id NOT IN (SELECT id FROM seen)")]
+        for doc_id in stale:
+            conn.execute("DELETE FROM postings WHERE doc = ?", (doc_id,))
+            conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+        counts["removed"] = len(stale)
+        conn.commit()
+        return counts
+
+    def _upsert(self, doc_id: str, payload: dict, counts: dict) -> None:
+        conn = self._conn
+        conn.execute("INSERT OR IGNORE INTO seen (id) VALUES (?)", (doc_id,))
+        indexed = " ".join(str(payload.get(field, "")) for field in INDEXED_FIELDS)
+        fingerprint = hashlib.sha1(
+            f"{indexed}\x00{payload.get('channel_slug')}".encode()
+        ).hexdigest()
+        row = conn.execute("SELECT fingerprint FROM docs WHERE id = ?", (doc_id,)).fetchone()
+        if row is not None and row[0] == fingerprint:
+            counts["unchanged"] += 1
+            return
+        if row is not None:
+            conn.execute("DELETE FROM postings WHERE doc = ?", (doc_id,))
+            counts["updated"] += 1
+        else:
+            counts["added"] += 1
+
+        tokens = tokenize(indexed)
+        conn.execute(
+            "INSERT OR REPLACE INTO docs (id, length, fingerprint, channel_slug, payload) VALUES (?, ?, ?, ?, ?)",
+            (doc_id, len(tokens), fingerprint, payload.get("channel_slug"), json.dumps(payload, ensure_ascii=False)),
+        )
+        conn.executemany(
+            "INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+            [(term, doc_id, tf) for term, tf in Counter(tokens).items()],
+        )
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        channel_slug: str | None = None,
+        with_payload=True,
+    ) -> list[dict]:
+        """
+        BM25 top-k for query, in the same result shape as kb.searcher.search.
+
+        Quoted parts of the query ("...") must appear verbatim (after folding)
+        in the title or text of a result.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        n_docs, total_length = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+        if n_docs == 0:
+            return []
+        avg_length = total_length / n_docs
+
+        channel_clause = " AND d.channel_slug = ?" if channel_slug is not None else ""
+        scores: dict[str, float] = {}
+        for term in terms:
+            (df,) = self._conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()
+            if df == 0:
+                continue
+            idf = math.log((n_docs - df + 0.5) / (df + 0.5) + 1)
+            params = (term, channel_slug) if channel_slug is not None else (term,)
+            for doc_id, tf, length in self._conn.execute(
+                "SELECT p.doc, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc "
+                f"WHERE p.term = ?{channel_clause}",
+                params,
+            ):
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+        phrases = [" ".join(tokenize(p)) for p in _PHRASE_RE.findall(query)]
+        results = []
+        for doc_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            (payload_json,) = self._conn.execute("SELECT payload FROM docs WHERE id = ?", (doc_id,)).fetchone()
+            payload = json.loads(payload_json)
+            if phrases:
+                haystack = " ".join(tokenize(" ".join(str(payload.get(f, "")) for f in INDEXED_FIELDS)))
+                if not all(f" {phrase} " in f" {haystack} " for phrase in phrases):
+                    continue
+            results.append({
+                "id": json.loads(doc_id),
+                "score": score,
+                "payload": select_payload(payload, with_payload),
+            })
+            if len(results) == top_k:
+                break
+        return results
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,207 @@
+import math
+
+from openai import OpenAI
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance,
+    Filter,
+    HasIdCondition,
+    PointIdsList,
+    PointStruct,
+    SearchParams,
+    VectorParams,
+)
+
+from kb.cache import EmbeddingCache
+from kb.filters import FILTER_INDEXES, PayloadFilter, ensure_indexes
+from kb.resilience import Resilience
+from kb.searcher import PayloadSelector, build_filter, embed_query
+from kb.timings import NULL_TIMINGS, Timings
+
+DEFAULT_SHORT_DIM = 256
+DEFAULT_COARSE_FACTOR = 4
+
+# Payload fields copied to the short-vector collection so the coarse stage
+# can apply the same filters as a normal search.
+SHORT_PAYLOAD_FIELDS = list(FILTER_INDEXES)
+
+
+def shorten(vector: list[float], dim: int) -> list[float]:
+    """Truncate a Matryoshka embedding to its first dim values and L2-renormalize."""
+    head = vector[:dim]
+    norm = math.sqrt(sum(x * x for x in head))
+    return [x / norm for x in head] if norm else list(head)
+
+
+def short_collection_name(collection: str) -> str:
+    return f"{collection}_short"
+
+
+def backfill_short_vectors(
+    qdrant_client: QdrantClient,
+    collection: str,
+    dim: int = DEFAULT_SHORT_DIM,
+    batch_size: int = 256,
+    target: str | None = None,
+) -> int:
+    """
+    Write dim-truncated copies of every vector in collection to a sidecar collection.
+
+    The sidecar (default "<collection>_short") holds the same point ids with
+    the shortened vector and the filterable payload fields only, indexed like
+    the main collection. It is created on first use; points are upserted and
+    points no longer in collection are deleted, so re-running refreshes it.
+    Streams batch_size points at a time. Returns the number of points written.
+    """
+    target = target or short_collection_name(collection)
+    try:
+        existing_size = None
+        if qdrant_client.collection_exists(target):
+            existing_size = qdrant_client.get_collection(target).config.params.vectors.size
+        else:
+            qdrant_client.create_collection(target, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+    except Exception as e:
+        raise RuntimeError(f"Failed to prepare {target}: {e}") from e
+    if existing_size is not None and existing_size != dim:
+        raise ValueError(f"{target} already holds {existing_size}-dim vectors, not {dim}")
+    # Coarse-stage filters run on the sidecar, so it needs the same payload indexes
+    ensure_indexes(qdrant_client, target)
+
+    count = 0
+    offset = None
+    while True:
+        try:
+            records, offset = qdrant_client.scroll(
+                collection_name=collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=SHORT_PAYLOAD_FIELDS,
+                with_vectors=True,
+            )
+            if records:
+                qdrant_client.upsert(target, points=[
+                    PointStruct(id=r.id, vector=shorten(r.vector, dim), payload=r.payload or {})
+                    for r in records
+                ])
+        except Exception as e:
+            raise RuntimeError(f"Failed to backfill {target}: {e}") from e
+        count += len(records)
+        if offset is None:
+            break
+    prune_short_vectors(qdrant_client, collection, target, batch_size)
+    return count
+
+
+def prune_short_vectors(qdrant_client: QdrantClient, collection: str, target: str, batch_size: int = 256) -> int:
+    """Delete points from the sidecar target whose id is gone from collection; returns how many."""
+    pruned = 0
+    offset = None
+    while True:
+        try:
+            records, offset = qdrant_client.scroll(
+                collection_name=target,
+                limit=batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            ids = [r.id for r in records]
+            kept = {
+                r.id for r in qdrant_client.retrieve(collection, ids=ids, with_payload=False, with_vectors=False)
+            } if ids else set()
+            stale = [i for i in ids if i not in kept]
+            if stale:
+                qdrant_client.delete(target, points_selector=PointIdsList(points=stale))
+        except Exception as e:
+            raise RuntimeError(f"Failed to prune {target}: {e}") from e
+        pruned += len(stale)
+        if offset is None:
+            return pruned
+
+
+def two_stage_search(
+    query: str,
+    qdrant_client: QdrantClient,
+    openai_client: OpenAI,
+    collection: str,
+    top_k: int,
+    channel_slug: str | None = None,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+    with_payload: PayloadSelector = True,
+    short_dim: int = DEFAULT_SHORT_DIM,
+    coarse_factor: int = DEFAULT_COARSE_FACTOR,
+    short_collection: str | None = None,
+    payload_filter: PayloadFilter | None = None,
+    timings: Timings | None = None,
+    search_params: SearchParams | None = None,
+    score_threshold: float | None = None,
+    resilience: Resilience | None = None,
+) -> list[dict]:
+    """
+    Coarse search on shortened vectors, then rescore candidates with full vectors on the server.
+
+    1. Embeds query once at full size; the coarse query is its first
+       short_dim values, renormalized
+    2. Searches the short-vector collection for top_k * coarse_factor ids,
+       with search_params (hnsw_ef / exact / quantization rescoring)
+    3. Runs an exact search of collection with the full query vector,
+       restricted to those ids, so only top_k payloads come back
+    4. Returns top_k results in the same shape as search(), dropping those
+       whose full-vector score is below score_threshold
+
+    With resilience, the embedding and both searches share one deadline and
+    are retried as in search().
+    """
+    if timings is None:
+        timings = NULL_TIMINGS
+    budget = resilience.start() if resilience is not None else None
+
+    with timings.stage("embed"):
+        query_vector = embed_query(query, openai_client, model, embedding_cache, budget)
+
+    def coarse_search(timeout: float | None):
+        options = {"timeout": max(1, math.ceil(timeout))} if timeout is not None else {}
+        return qdrant_client.search(
+            collection_name=short_collection or short_collection_name(collection),
+            query_vector=shorten(query_vector, short_dim),
+            limit=top_k * coarse_factor,
+            query_filter=build_filter(channel_slug, payload_filter),
+            search_params=search_params,
+            with_payload=False,
+            with_vectors=False,
+            **options,
+        )
+
+    with timings.stage("coarse"):
+        try:
+            candidates = budget.call("qdrant", coarse_search) if budget is not None else coarse_search(None)
+        except Exception as e:
+            raise RuntimeError(f"Failed to search Qdrant: {e}") from e
+    timings.count("candidates", len(candidates))
+    if not candidates:
+        return []
+
+    def rescore_search(timeout: float | None):
+        options = {"timeout": max(1, math.ceil(timeout))} if timeout is not None else {}
+        return qdrant_client.search(
+            collection_name=collection,
+            query_vector=query_vector,
+            limit=top_k,
+            query_filter=Filter(must=[HasIdCondition(has_id=[c.id for c in candidates])]),
+            search_params=SearchParams(exact=True),
+            with_payload=with_payload,
+            with_vectors=False,
+            # Short-vector scores are not comparable, so the threshold applies to the rescored ones
+            score_threshold=score_threshold,
+            **options,
+        )
+
+    with timings.stage("rescore"):
+        try:
+            hits = budget.call("qdrant", rescore_search) if budget is not None else rescore_search(None)
+        except Exception as e:
+            raise RuntimeError(f"Failed to rescore candidates: {e}") from e
+    results = [{"id": h.id, "score": h.score, "payload": h.payload or {}} for h in hits]
+    timings.count("hits", len(results))
+    return results
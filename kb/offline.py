@@ -0,0 +1,166 @@
+import json
+import os
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance
+
+from kb.searcher import select_payload
+
+# Snapshot layout (one directory per exported collection):
+#   meta.json     collection name, dim, count, distance, channel list
+#   vectors.f32   float32 matrix, count x dim, row-major
+#   payloads.bin  concatenated UTF-8 JSON payloads
+#   offsets.u64   count + 1 byte offsets into payloads.bin
+#   channels.i32  per-point index into meta["channels"] (-1 = no channel_slug)
+#   ids.json      point ids in row order
+SUPPORTED_DISTANCES = (Distance.COSINE, Distance.DOT)
+
+
+def export_snapshot(
+    qdrant_client: QdrantClient,
+    collection: str,
+    path: str,
+    batch_size: int = 256,
+) -> int:
+    """
+    Scroll collection into an offline snapshot directory at path.
+
+    Streams points batch by batch so only one batch of vectors/payloads is
+    held in memory. Returns the number of exported points.
+    """
+    try:
+        params = qdrant_client.get_collection(collection).config.params.vectors
+    except Exception as e:
+        raise RuntimeError(f"Failed to read collection {collection}: {e}") from e
+    if isinstance(params, dict):
+        raise ValueError("Collections with named vectors are not supported")
+    if params.distance not in SUPPORTED_DISTANCES:
+        raise ValueError(f"Unsupported distance for offline search: {params.distance}")
+
+    os.makedirs(path, exist_ok=True)
+    channels: dict[str, int] = {}
+    ids = []
+    offsets = [0]
+    count = 0
+    with open(os.path.join(path, "vectors.f32"), "wb") as vectors_fh, \
+         open(os.path.join(path, "payloads.bin"), "wb") as payloads_fh, \
+         open(os.path.join(path, "channels.i32"), "wb") as channels_fh:
+        offset = None
+        while True:
+            try:
+                records, offset = qdrant_client.scroll(
+                    collection_name=collection,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+            except Exception as e:
+                raise RuntimeError(f"Failed to scroll Qdrant: {e}") from e
+            if records:
+                np.asarray([r.vector for r in records], dtype=np.float32).tofile(vectors_fh)
+                codes = []
+                for record in records:
+                    payload = record.payload or {}
+                    data = json.dumps(payload, ensure_ascii=False).encode()
+                    payloads_fh.write(data)
+                    offsets.append(offsets[-1] + len(data))
+                    slug = payload.get("channel_slug")
+                    codes.append(-1 if slug is None else channels.setdefault(slug, len(channels)))
+                    ids.append(record.id)
+                np.asarray(codes, dtype=np.int32).tofile(channels_fh)
+                count += len(records)
+            if offset is None:
+                break
+
+    np.asarray(offsets, dtype=np.uint64).tofile(os.path.join(path, "offsets.u64"))
+    with open(os.path.join(path, "ids.json"), "w") as fh:
+        json.dump(ids, fh)
+    meta = {
+        "collection": collection,
+        "dim": params.size,
+        "count": count,
+        "distance": params.distance.value,
+        "channels": list(channels),
+    }
+    with open(os.path.join(path, "meta.json"), "w") as fh:
+        json.dump(meta, fh)
+    return count
+
+
+class OfflineIndex:
+    """Memory-mapped snapshot answering exact top-k searches with NumPy."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as fh:
+            self.meta = json.load(fh)
+        self.count = self.meta["count"]
+        self.distance = Distance(self.meta["distance"])
+        self.channels = {slug: code for code, slug in enumerate(self.meta["channels"])}
+        self._path = path
+        if self.count:
+            self.vectors = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r",
+                                     shape=(self.count, self.meta["dim"]))
+            self.channel_codes = np.memmap(os.path.join(path, "channels.i32"), dtype=np.int32, mode="r")
+        else:
+            self.vectors = np.zeros((0, self.meta["dim"]), dtype=np.float32)
+            self.channel_codes = np.zeros(0, dtype=np.int32)
+        self.offsets = np.fromfile(os.path.join(path, "offsets.u64"), dtype=np.uint64)
+        self._ids = None
+        self._payloads = open(os.path.join(path, "payloads.bin"), "rb")
+
+    @property
+    def ids(self) -> list:
+        if self._ids is None:
+            with open(os.path.join(self._path, "ids.json")) as fh:
+                self._ids = json.load(fh)
+        return self._ids
+
+    def payload(self, row: int) -> dict:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        self._payloads.seek(start)
+        return json.loads(self._payloads.read(end - start))
+
+    def search(
+        self,
+        query_vector: list[float],
+        top_k: int,
+        channel_slug: str | None = None,
+        with_payload=True,
+    ) -> list[dict]:
+        """Exact top-k search; same result shape and filtering as kb.searcher.search."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        if self.distance == Distance.COSINE:
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+
+        if channel_slug is None:
+            rows = None
+            scores = self.vectors @ query
+        else:
+            code = self.channels.get(channel_slug)
+            if code is None:
+                return []
+            rows = np.flatnonzero(self.channel_codes == code)
+            scores = self.vectors[rows] @ query
+
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = []
+        for i in top:
+            row = int(i) if rows is None else int(rows[i])
+            results.append({
+                "id": self.ids[row],
+                "score": float(scores[i]),
+                "payload": select_payload(self.payload(row), with_payload) if with_payload is not False else {},
+            })
+        return results
+
+    def close(self) -> None:
+        self._payloads.close()
@@ -0,0 +1,272 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, TypeVar
+
+import openai
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from kb.timings import percentile
+
+T = TypeVar("T")
+
+# Share of a search's deadline each stage may use per attempt; qdrant gets
+# whatever embedding leaves over.
+STAGE_SHARES = {"openai": 0.4, "qdrant": 1.0}
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The search's time budget ran out before a stage finished."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Calls to a service are short-circuited after repeated failures."""
+
+
+def submit_daemon(fn: Callable[..., T], *args) -> "Future[T]":
+    """
+    Run fn(*args) on a new daemon thread.
+
+    Unlike executor workers, which the interpreter joins at exit, a call
+    abandoned at its deadline cannot keep the process alive.
+    """
+    future: Future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="kb-resilience", daemon=True).start()
+    return future
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection errors, 429s and 5xx from OpenAI or Qdrant; not client errors."""
+    if isinstance(error, (TimeoutError, ConnectionError, openai.APITimeoutError, openai.APIConnectionError,
+                          ResponseHandlingException)):
+        return True
+    if isinstance(error, (openai.APIStatusError, UnexpectedResponse)):
+        return error.status_code in RETRYABLE_STATUS
+    return False
+
+
+class CircuitBreaker:
+    """
+    Fail fast after failure_threshold consecutive failures.
+
+    Once open, calls are rejected for reset_timeout seconds; then one trial
+    call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half_open" if self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.opened_at is None:
+                return
+            wait_s = self.reset_timeout - (self.clock() - self.opened_at)
+            if wait_s > 0 or self._trial:
+                raise CircuitOpenError(f"{self.name} circuit open; retry in {max(wait_s, 0):.1f}s")
+            self._trial = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class Hedger:
+    """
+    Decide when to send a duplicate request: after the percentile latency of recent successful calls.
+
+    Until min_samples latencies are known, initial_delay (None: never) is used.
+    """
+
+    def __init__(self, percentile: float = 95.0, min_samples: int = 20, window: int = 500,
+                 initial_delay: float | None = None):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.hedges = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float | None:
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            latencies = list(self._latencies)
+        return percentile(latencies, self.percentile / 100)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+
+class Budget:
+    """Time left for one search, measured from its start; its requests go through call()."""
+
+    def __init__(self, resilience: "Resilience", deadline: float | None):
+        self.resilience = resilience
+        self.total = deadline
+        self.clock = resilience.clock
+        self.expires_at = self.clock() + deadline if deadline is not None else None
+
+    def call(self, service: str, fn: Callable[[float | None], T], hedge: bool = False) -> T:
+        return self.resilience.call(service, fn, self, hedge)
+
+    def remaining(self) -> float | None:
+        return None if self.expires_at is None else self.expires_at - self.clock()
+
+    def attempt_timeout(self, share: float) -> float | None:
+        """Time one attempt of a stage may take: share of the whole deadline, capped by what is left."""
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        if remaining <= 0:
+            raise DeadlineExceeded(f"deadline of {self.total:.2f}s exceeded")
+        return min(remaining, self.total * share)
+
+
+class Resilience:
+    """
+    Deadline, retry, hedging and circuit-breaker policy shared by searches.
+
+    search() starts a Budget per call and runs its OpenAI and Qdrant requests
+    through it. Every request gets a per-attempt timeout derived from the
+    deadline (STAGE_SHARES); retryable errors are retried up to retries times
+    with full-jitter exponential backoff while the budget allows; each service
+    has its own CircuitBreaker; Qdrant searches are hedged when hedge is set.
+    Attempts under a timeout run on daemon threads, so one left behind at the
+    deadline does not delay exit. clock, sleep and rng are injectable for tests.
+    """
+
+    def __init__(
+        self,
+        deadline: float | None = None,
+        retries: int = 2,
+        backoff_base: float = 0.1,
+        backoff_max: float = 2.0,
+        hedge: Hedger | None = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: random.Random | None = None,
+    ):
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.breakers = {
+            service: CircuitBreaker(service, failure_threshold, reset_timeout, clock) for service in STAGE_SHARES
+        }
+        self.retried = 0
+
+    def start(self, deadline: float | None = None) -> Budget:
+        return Budget(self, deadline if deadline is not None else self.deadline)
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(backoff_max, backoff_base * 2**attempt)]."""
+        return self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, service: str, fn: Callable[[float | None], T], budget: Budget, hedge: bool = False) -> T:
+        """Run fn(timeout) under the budget with retries, breaker and optional hedging."""
+        breaker = self.breakers[service]
+        attempt = 0
+        while True:
+            timeout = budget.attempt_timeout(STAGE_SHARES[service])
+            breaker.before_call()
+            try:
+                result = self._attempt(fn, timeout, hedge and self.hedge is not None)
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if not retryable or attempt >= self.retries:
+                    raise
+                delay = self.backoff(attempt)
+                remaining = budget.remaining()
+                if remaining is not None and delay >= remaining:
+                    raise
+                self.retried += 1
+                self.sleep(delay)
+                attempt += 1
+                continue
+            breaker.record_success()
+            return result
+
+    def _attempt(self, fn: Callable[[float | None], T], timeout: float | None, hedge: bool) -> T:
+        if timeout is None and not hedge:
+            return fn(None)
+        start = self.clock()
+        futures = {submit_daemon(fn, timeout)}
+        delay = self.hedge.delay() if hedge else None
+        if delay is not None and (timeout is None or delay < timeout):
+            done, _ = wait(futures, timeout=delay)
+            if not done:
+                self.hedge.hedges += 1
+                futures.add(submit_daemon(fn, None if timeout is None else timeout - delay))
+        error: BaseException | None = None
+        pending = futures
+        while pending:
+            left = None if timeout is None else timeout - (self.clock() - start)
+            if left is not None and left <= 0:
+                break
+            done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if self.hedge is not None:
+                        self.hedge.record(self.clock() - start)
+                    return future.result()
+                error = future.exception()
+            if not done:
+                break
+        if error is not None and not pending:
+            raise error
+        raise DeadlineExceeded(f"no response within {timeout:.2f}s")
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retried,
+            "hedges": self.hedge.hedges if self.hedge is not None else 0,
+            "breakers": {name: breaker.state for name, breaker in self.breakers.items()},
+        }
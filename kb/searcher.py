@@ -1,8 +1,177 @@
-from openai import OpenAI
-from qdrant_client import QdrantClient
-from qdrant_client.models import FieldCondition, Filter, MatchValue
+import asyncio
+import fnmatch
+import heapq
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, islice
+from typing import Iterable, Iterator
 
-SNIPPET_LENGTH = 200
+from openai import AsyncOpenAI, OpenAI
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PayloadSelectorExclude,
+    QuantizationSearchParams,
+    RecommendStrategy,
+    SearchParams,
+    SearchRequest,
+)
+
+from kb.cache import EmbeddingCache, ResultCache
+from kb.config import SNIPPET_LENGTH  # noqa: F401  (re-exported)
+from kb.filters import PayloadFilter
+from kb.resilience import Budget, Resilience
+from kb.semantic_cache import SemanticCache
+from kb.timings import NULL_TIMINGS, Timings
+
+PayloadSelector = bool | list[str] | PayloadSelectorExclude
+
+# Recall/latency trade-offs for --preset; raw --hnsw-ef/--exact/--oversampling
+# override individual values. Oversampling only takes effect on quantized
+# collections, where it also enables rescoring with the original vectors.
+PRESETS = {
+    "fast": {"hnsw_ef": 32},
+    "balanced": {"hnsw_ef": 128},
+    "accurate": {"hnsw_ef": 512, "oversampling": 2.0},
+}
+
+
+def embed_query(
+    query: str,
+    openai_client: OpenAI,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+    budget: Budget | None = None,
+) -> list[float]:
+    """Embed query, consulting embedding_cache first when one is given.
+
+    With budget, the request gets a deadline-derived timeout, retries and
+    the OpenAI circuit breaker (see kb.resilience).
+    """
+    if embedding_cache is not None:
+        cached = embedding_cache.get(model, query)
+        if cached is not None:
+            return cached
+
+    def create(timeout: float | None):
+        options = {"timeout": timeout} if timeout is not None else {}
+        return openai_client.embeddings.create(model=model, input=query, **options)
+
+    try:
+        response = budget.call("openai", create) if budget is not None else create(None)
+        query_vector = response.data[0].embedding
+    except Exception as e:
+        raise RuntimeError(f"Failed to get embedding: {e}") from e
+
+    if embedding_cache is not None:
+        embedding_cache.put(model, query, query_vector)
+    return query_vector
+
+
+def embed_queries(
+    queries: list[str],
+    openai_client: OpenAI,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+) -> list[list[float]]:
+    """Embed several queries with a single multi-input request, skipping cached and duplicate ones."""
+    vectors: dict[str, list[float]] = {}
+    if embedding_cache is not None:
+        for query in queries:
+            if query not in vectors:
+                cached = embedding_cache.get(model, query)
+                if cached is not None:
+                    vectors[query] = cached
+
+    missing = list(dict.fromkeys(q for q in queries if q not in vectors))
+    if missing:
+        try:
+            response = openai_client.embeddings.create(
+                model=model,
+                input=missing,
+            )
+            embedded = [item.embedding for item in response.data]
+        except Exception as e:
+            raise RuntimeError(f"Failed to get embedding: {e}") from e
+        for query, vector in zip(missing, embedded):
+            vectors[query] = vector
+            if embedding_cache is not None:
+                embedding_cache.put(model, query, vector)
+
+    return [vectors[q] for q in queries]
+
+
+def parse_fields(spec: str | None) -> PayloadSelector:
+    """
+    Parse a --fields spec into a Qdrant with_payload selector.
+
+    None or "all" -> full payload, "none" -> no payload,
+    "a,b" -> include only a and b, "-a,-b" -> everything except a and b.
+    """
+    if spec is None or spec == "all":
+        return True
+    if spec == "none":
+        return False
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    excluded = [name[1:] for name in names if name.startswith("-")]
+    if excluded:
+        if len(excluded) != len(names):
+            raise ValueError(f"Cannot mix included and excluded fields: {spec}")
+        return PayloadSelectorExclude(exclude=excluded)
+    return names
+
+
+def select_payload(payload: dict, with_payload: PayloadSelector) -> dict:
+    """Apply a with_payload selector to a payload dict (for results not served by Qdrant)."""
+    if with_payload is True:
+        return payload
+    if with_payload is False:
+        return {}
+    if isinstance(with_payload, PayloadSelectorExclude):
+        return {k: v for k, v in payload.items() if k not in with_payload.exclude}
+    return {k: payload[k] for k in with_payload if k in payload}
+
+
+def build_search_params(
+    preset: str | None = None,
+    hnsw_ef: int | None = None,
+    exact: bool | None = None,
+    oversampling: float | None = None,
+) -> SearchParams | None:
+    """Build Qdrant SearchParams from a preset and/or raw overrides (None = server defaults)."""
+    if preset is not None and preset not in PRESETS:
+        raise ValueError(f"Unknown preset: {preset}")
+    options = dict(PRESETS[preset]) if preset is not None else {}
+    for name, value in (("hnsw_ef", hnsw_ef), ("exact", exact), ("oversampling", oversampling)):
+        if value is not None:
+            options[name] = value
+    if not options:
+        return None
+    quantization = None
+    if options.get("oversampling") is not None:
+        quantization = QuantizationSearchParams(rescore=True, oversampling=options["oversampling"])
+    return SearchParams(hnsw_ef=options.get("hnsw_ef"), exact=options.get("exact", False), quantization=quantization)
+
+
+def build_filter(channel_slug: str | None = None, payload_filter: PayloadFilter | None = None) -> Filter | None:
+    """Build the Qdrant filter for an optional channel_slug and further payload conditions."""
+    conditions = []
+    if channel_slug is not None:
+        conditions.append(
+            FieldCondition(
+                key="channel_slug",
+                match=MatchValue(value=channel_slug),
+            )
+        )
+    if payload_filter is not None:
+        conditions.extend(payload_filter.conditions())
+    if not conditions:
+        return None
+    return Filter(must=conditions)
 
 
 def search(
@@ -13,16 +182,413 @@ def search(
     top_k: int,
     channel_slug: str | None = None,
     model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+    with_payload: PayloadSelector = True,
+    result_cache: ResultCache | None = None,
+    search_params: SearchParams | None = None,
+    score_threshold: float | None = None,
+    payload_filter: PayloadFilter | None = None,
+    timings: Timings | None = None,
+    resilience: Resilience | None = None,
+    semantic_cache: SemanticCache | None = None,
 ) -> list[dict]:
     """
     Search for relevant chunks.
 
-    1. Embeds query with text-embedding-3-small
-    2. Searches Qdrant with optional channel_slug filter
-    3. Returns list of {"score": float, "payload": dict}
+    1. Returns cached results (marked "cached": True) when result_cache has
+       an entry for this query against the current collection version
+    2. Embeds query with text-embedding-3-small (or reuses a cached embedding)
+    3. Returns the results of a near-duplicate earlier query from
+       semantic_cache (marked "cached": True, with its "cached_query")
+    4. Searches Qdrant with optional channel_slug / payload_filter, search_params
+       (hnsw_ef / exact / quantization rescoring) and score_threshold,
+       transferring only the payload fields selected by with_payload and
+       never the vectors
+    5. Returns list of {"id": point id, "score": float, "payload": dict}
+
+    With timings, the result_cache / embed / semantic_cache / filter / qdrant stages are
+    timed and hit, cache and payload-size counters recorded. With resilience,
+    the embedding and Qdrant requests share its deadline, are retried on
+    transient errors and the Qdrant search may be hedged.
     """
+    if timings is None:
+        timings = NULL_TIMINGS
+    budget = resilience.start() if resilience is not None else None
+
+    def read_version(cache) -> str:
+        # A get_collection call on a cold cache; it counts against the deadline like any Qdrant request
+        if budget is None:
+            return cache.collection_version(qdrant_client, collection)
+        return budget.call("qdrant", lambda timeout: cache.collection_version(qdrant_client, collection))
+
+    if result_cache is not None:
+        with timings.stage("result_cache"):
+            cache_key = result_cache.key(
+                model, query, collection, channel_slug, top_k, with_payload, search_params, score_threshold,
+                payload_filter,
+            )
+            try:
+                version = read_version(result_cache)
+            except Exception as e:
+                raise RuntimeError(f"Failed to read collection version: {e}") from e
+            cached = result_cache.get(cache_key, version)
+        if cached is not None:
+            timings.count("result_cache_hits")
+            timings.count("hits", len(cached))
+            return [{**result, "cached": True} for result in cached]
+
+    with timings.stage("embed"):
+        hits_before = embedding_cache.hits if embedding_cache is not None and timings.enabled else 0
+        query_vector = embed_query(query, openai_client, model, embedding_cache, budget)
+        if embedding_cache is not None and timings.enabled:
+            timings.count("embedding_cache_hits", embedding_cache.hits - hits_before)
+
+    if semantic_cache is not None:
+        with timings.stage("semantic_cache"):
+            semantic_key = semantic_cache.key(
+                model, collection, channel_slug, top_k, with_payload, search_params, score_threshold, payload_filter,
+            )
+            try:
+                semantic_version = read_version(semantic_cache)
+            except Exception as e:
+                raise RuntimeError(f"Failed to read collection version: {e}") from e
+            match = semantic_cache.get(query_vector, semantic_key, semantic_version)
+        if match is not None:
+            timings.count("semantic_cache_hits")
+            timings.count("hits", len(match["results"]))
+            return [{**result, "cached": True, "cached_query": match["query"]} for result in match["results"]]
+
+    with timings.stage("filter"):
+        query_filter = build_filter(channel_slug, payload_filter)
+
+    def qdrant_search(timeout: float | None):
+        # Qdrant's timeout is whole seconds, applied server-side
+        options = {"timeout": max(1, math.ceil(timeout))} if timeout is not None else {}
+        return qdrant_client.search(
+            collection_name=collection,
+            query_vector=query_vector,
+            limit=top_k,
+            query_filter=query_filter,
+            search_params=search_params,
+            score_threshold=score_threshold,
+            with_payload=with_payload,
+            with_vectors=False,
+            **options,
+        )
+
+    with timings.stage("qdrant"):
+        try:
+            hits = budget.call("qdrant", qdrant_search, hedge=True) if budget is not None else qdrant_search(None)
+        except Exception as e:
+            raise RuntimeError(f"Failed to search Qdrant: {e}") from e
+
+    results = [{"id": hit.id, "score": hit.score, "payload": hit.payload or {}} for hit in hits]
+    timings.count("hits", len(results))
+    if timings.enabled:
+        timings.count("payload_bytes", sum(len(json.dumps(r["payload"], ensure_ascii=False).encode()) for r in results))
+    if result_cache is not None:
+        with timings.stage("result_cache"):
+            result_cache.put(cache_key, version, results)
+    if semantic_cache is not None:
+        with timings.stage("semantic_cache"):
+            semantic_cache.put(query_vector, semantic_key, semantic_version, query, results)
+    return results
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """Compact search result yielded by iter_search()."""
+
+    id: int | str
+    score: float
+    payload: dict
+
+
+def iter_search(
+    query: str,
+    qdrant_client: QdrantClient,
+    openai_client: OpenAI,
+    collection: str,
+    top_k: int,
+    channel_slug: str | None = None,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+    with_payload: PayloadSelector = True,
+    offset: int = 0,
+    page_size: int = 100,
+    search_params: SearchParams | None = None,
+    score_threshold: float | None = None,
+    payload_filter: PayloadFilter | None = None,
+    resilience: Resilience | None = None,
+) -> Iterator[SearchHit]:
+    """
+    Yield up to top_k results starting at rank offset, one page at a time.
+
+    The query is embedded once; each page is a separate Qdrant search with
+    offset/limit, so only one page of hits is held in memory and the first
+    result is available as soon as the first page arrives. With resilience,
+    the embedding and all pages share one deadline and are retried as in search().
+    """
+    budget = resilience.start() if resilience is not None else None
+    query_vector = embed_query(query, openai_client, model, embedding_cache, budget)
+    query_filter = build_filter(channel_slug, payload_filter)
+
+    fetched = 0
+    while fetched < top_k:
+        limit = min(page_size, top_k - fetched)
+
+        def qdrant_search(timeout: float | None):
+            options = {"timeout": max(1, math.ceil(timeout))} if timeout is not None else {}
+            return qdrant_client.search(
+                collection_name=collection,
+                query_vector=query_vector,
+                limit=limit,
+                offset=offset + fetched,
+                query_filter=query_filter,
+                search_params=search_params,
+                score_threshold=score_threshold,
+                with_payload=with_payload,
+                with_vectors=False,
+                **options,
+            )
+
+        try:
+            hits = budget.call("qdrant", qdrant_search) if budget is not None else qdrant_search(None)
+        except Exception as e:
+            raise RuntimeError(f"Failed to search Qdrant: {e}") from e
+        for hit in hits:
+            yield SearchHit(hit.id, hit.score, hit.payload or {})
+        fetched += len(hits)
+        if len(hits) < limit:
+            return
+
+
+def search_many(
+    queries: Iterable[str | dict],
+    qdrant_client: QdrantClient,
+    openai_client: OpenAI,
+    collection: str,
+    top_k: int,
+    channel_slug: str | None = None,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+    batch_size: int = 64,
+    with_payload: PayloadSelector = True,
+    search_params: SearchParams | None = None,
+    score_threshold: float | None = None,
+    payload_filter: PayloadFilter | None = None,
+) -> Iterator[list[dict]]:
+    """
+    Search for many queries, yielding one result list per query in input order.
+
+    Each query is either a string or a dict with "query" and optional
+    "channel_slug" / "top_k" overriding the defaults. Queries are consumed in
+    chunks of batch_size: each chunk is embedded with one multi-input request
+    and looked up with one Qdrant search_batch call.
+    """
+    items = iter(queries)
+    while chunk := list(islice(items, batch_size)):
+        specs = [{"query": q} if isinstance(q, str) else q for q in chunk]
+        vectors = embed_queries([s["query"] for s in specs], openai_client, model, embedding_cache)
+        requests = [
+            SearchRequest(
+                vector=vector,
+                filter=build_filter(spec.get("channel_slug", channel_slug), payload_filter),
+                limit=spec.get("top_k", top_k),
+                params=search_params,
+                score_threshold=score_threshold,
+                with_payload=with_payload,
+                with_vector=False,
+            )
+            for spec, vector in zip(specs, vectors)
+        ]
+        try:
+            batches = qdrant_client.search_batch(collection_name=collection, requests=requests)
+        except Exception as e:
+            raise RuntimeError(f"Failed to search Qdrant: {e}") from e
+        for hits in batches:
+            yield [{"id": hit.id, "score": hit.score, "payload": hit.payload or {}} for hit in hits]
+
+
+def resolve_collections(qdrant_client: QdrantClient, patterns: Iterable[str]) -> list[str]:
+    """
+    Expand glob patterns (e.g. "kb_*") against the collections in Qdrant.
+
+    Plain names are kept as given; the result is de-duplicated, in order.
+    """
+    patterns = list(patterns)
+    existing = None
+    names: dict[str, None] = {}
+    for pattern in patterns:
+        if not any(c in pattern for c in "*?["):
+            names[pattern] = None
+            continue
+        if existing is None:
+            try:
+                existing = sorted(c.name for c in qdrant_client.get_collections().collections)
+            except Exception as e:
+                raise RuntimeError(f"Failed to list collections: {e}") from e
+        matched = fnmatch.filter(existing, pattern)
+        if not matched:
+            raise ValueError(f"No collection matches {pattern}")
+        names.update(dict.fromkeys(matched))
+    return list(names)
+
+
+def search_collections(
+    query: str,
+    qdrant_client: QdrantClient,
+    openai_client: OpenAI,
+    collections: list[str],
+    top_k: int,
+    channel_slug: str | None = None,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+    with_payload: PayloadSelector = True,
+    search_params: SearchParams | None = None,
+    score_threshold: float | None = None,
+    payload_filter: PayloadFilter | None = None,
+    timings: Timings | None = None,
+    resilience: Resilience | None = None,
+) -> list[dict]:
+    """
+    Search several collections with one embedding and merge a global top_k.
+
+    The collections are queried concurrently from a thread pool over the
+    shared qdrant_client, so latency tracks the slowest collection rather
+    than their sum. Scores are merged with a heap as-is, which assumes all
+    collections use the same embedding model and distance. Each result
+    carries its source as "collection". With resilience, the embedding and
+    every collection's search share one deadline and are retried as in search().
+    """
+    if timings is None:
+        timings = NULL_TIMINGS
+    budget = resilience.start() if resilience is not None else None
+
+    with timings.stage("embed"):
+        query_vector = embed_query(query, openai_client, model, embedding_cache, budget)
+    with timings.stage("filter"):
+        query_filter = build_filter(channel_slug, payload_filter)
+
+    def search_one(collection: str) -> list[dict]:
+        def qdrant_search(timeout: float | None):
+            options = {"timeout": max(1, math.ceil(timeout))} if timeout is not None else {}
+            return qdrant_client.search(
+                collection_name=collection,
+                query_vector=query_vector,
+                limit=top_k,
+                query_filter=query_filter,
+                search_params=search_params,
+                score_threshold=score_threshold,
+                with_payload=with_payload,
+                with_vectors=False,
+                **options,
+            )
+
+        try:
+            hits = budget.call("qdrant", qdrant_search) if budget is not None else qdrant_search(None)
+        except Exception as e:
+            raise RuntimeError(f"Failed to search Qdrant collection {collection}: {e}") from e
+        return [
+            {"id": hit.id, "score": hit.score, "payload": hit.payload or {}, "collection": collection}
+            for hit in hits
+        ]
+
+    with timings.stage("qdrant"):
+        with ThreadPoolExecutor(max_workers=max(1, len(collections))) as pool:
+            per_collection = list(pool.map(search_one, collections))
+
+    with timings.stage("merge"):
+        results = heapq.nlargest(top_k, chain.from_iterable(per_collection), key=lambda r: r["score"])
+    timings.count("hits", len(results))
+    return results
+
+
+def find_point_id(qdrant_client: QdrantClient, collection: str, video_id: str, chunk_index: int) -> int | str:
+    """Return the id of the point holding chunk_index of video_id."""
     try:
-        response = openai_client.embeddings.create(
+        records, _ = qdrant_client.scroll(
+            collection_name=collection,
+            scroll_filter=Filter(must=[
+                FieldCondition(key="video_id", match=MatchValue(value=video_id)),
+                FieldCondition(key="chunk_index", match=MatchValue(value=chunk_index)),
+            ]),
+            limit=1,
+            with_payload=False,
+            with_vectors=False,
+        )
+    except Exception as e:
+        raise RuntimeError(f"Failed to look up point: {e}") from e
+    if not records:
+        raise ValueError(f"No point with video_id={video_id} and chunk_index={chunk_index} in {collection}")
+    return records[0].id
+
+
+def search_by_point(
+    qdrant_client: QdrantClient,
+    collection: str,
+    positive: list[int | str],
+    top_k: int,
+    negative: list[int | str] | None = None,
+    channel_slug: str | None = None,
+    with_payload: PayloadSelector = True,
+    search_params: SearchParams | None = None,
+    score_threshold: float | None = None,
+    payload_filter: PayloadFilter | None = None,
+    strategy: str | None = None,
+    timings: Timings | None = None,
+) -> list[dict]:
+    """
+    Find chunks similar to existing points, reusing their stored vectors.
+
+    Uses Qdrant's recommend API, so no embedding is requested: results are
+    close to the positive point ids and away from the negative ones. The
+    example points themselves are never returned. strategy is
+    "average_vector" (Qdrant's default) or "best_score". Filters and the
+    result shape are the same as in search().
+    """
+    if timings is None:
+        timings = NULL_TIMINGS
+
+    with timings.stage("filter"):
+        query_filter = build_filter(channel_slug, payload_filter)
+
+    with timings.stage("qdrant"):
+        try:
+            hits = qdrant_client.recommend(
+                collection_name=collection,
+                positive=positive,
+                negative=negative or None,
+                query_filter=query_filter,
+                search_params=search_params,
+                limit=top_k,
+                with_payload=with_payload,
+                with_vectors=False,
+                score_threshold=score_threshold,
+                strategy=RecommendStrategy(strategy) if strategy else None,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to search Qdrant: {e}") from e
+
+    results = [{"id": hit.id, "score": hit.score, "payload": hit.payload or {}} for hit in hits]
+    timings.count("hits", len(results))
+    return results
+
+
+async def aembed_query(
+    query: str,
+    openai_client: AsyncOpenAI,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+) -> list[float]:
+    """Async counterpart of embed_query."""
+    if embedding_cache is not None:
+        cached = embedding_cache.get(model, query)
+        if cached is not None:
+            return cached
+
+    try:
+        response = await openai_client.embeddings.create(
             model=model,
             input=query,
         )
@@ -30,25 +596,85 @@ def search(
     except Exception as e:
         raise RuntimeError(f"Failed to get embedding: {e}") from e
 
-    query_filter = None
-    if channel_slug is not None:
-        query_filter = Filter(
-            must=[
-                FieldCondition(
-                    key="channel_slug",
-                    match=MatchValue(value=channel_slug),
-                )
-            ]
-        )
+    if embedding_cache is not None:
+        embedding_cache.put(model, query, query_vector)
+    return query_vector
+
+
+async def asearch(
+    query: str,
+    qdrant_client: AsyncQdrantClient,
+    openai_client: AsyncOpenAI,
+    collection: str,
+    top_k: int,
+    channel_slug: str | None = None,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+    with_payload: PayloadSelector = True,
+    search_params: SearchParams | None = None,
+    score_threshold: float | None = None,
+    payload_filter: PayloadFilter | None = None,
+) -> list[dict]:
+    """Async counterpart of search(), backed by AsyncQdrantClient and AsyncOpenAI."""
+    query_vector = await aembed_query(query, openai_client, model, embedding_cache)
 
     try:
-        hits = qdrant_client.search(
+        hits = await qdrant_client.search(
             collection_name=collection,
             query_vector=query_vector,
             limit=top_k,
-            query_filter=query_filter,
+            query_filter=build_filter(channel_slug, payload_filter),
+            search_params=search_params,
+            score_threshold=score_threshold,
+            with_payload=with_payload,
+            with_vectors=False,
         )
     except Exception as e:
         raise RuntimeError(f"Failed to search Qdrant: {e}") from e
 
-    return [{"score": hit.score, "payload": hit.payload} for hit in hits]
+    return [{"id": hit.id, "score": hit.score, "payload": hit.payload or {}} for hit in hits]
+
+
+async def asearch_many(
+    queries: Iterable[str | dict],
+    qdrant_client: AsyncQdrantClient,
+    openai_client: AsyncOpenAI,
+    collection: str,
+    top_k: int,
+    channel_slug: str | None = None,
+    model: str = "text-embedding-3-small",
+    embedding_cache: EmbeddingCache | None = None,
+    concurrency: int = 8,
+    with_payload: PayloadSelector = True,
+    search_params: SearchParams | None = None,
+    score_threshold: float | None = None,
+    payload_filter: PayloadFilter | None = None,
+) -> list[list[dict]]:
+    """
+    Run asearch() for many queries at once over the shared clients.
+
+    Queries take the same forms as in search_many(). At most `concurrency`
+    searches are in flight at a time; results are returned in input order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(spec: str | dict) -> list[dict]:
+        if isinstance(spec, str):
+            spec = {"query": spec}
+        async with semaphore:
+            return await asearch(
+                spec["query"],
+                qdrant_client,
+                openai_client,
+                collection,
+                spec.get("top_k", top_k),
+                channel_slug=spec.get("channel_slug", channel_slug),
+                model=model,
+                embedding_cache=embedding_cache,
+                with_payload=with_payload,
+                search_params=search_params,
+                score_threshold=score_threshold,
+                payload_filter=payload_filter,
+            )
+
+    return await asyncio.gather(*(run_one(spec) for spec in queries))
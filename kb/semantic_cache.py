@@ -0,0 +1,244 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from kb.cache import read_version_marker
+from kb.config import DEFAULT_SEMANTIC_CACHE_PATH, DEFAULT_VERSION_DIR
+
+# Bumped when the on-disk layout changes; other versions are ignored on load
+FORMAT_VERSION = 1
+
+
+class SemanticCache:
+    """
+    Result cache for near-duplicate queries, matched by embedding similarity.
+
+    Query vectors are kept L2-normalized in one float32 matrix next to their
+    results. A lookup returns the results of the most similar cached query
+    whose cosine similarity is at least threshold and which was searched with
+    the same partition key (model, collection, filter, top_k, fields, search
+    parameters). Entries are evicted least recently used beyond max_entries,
+    expire after max_age seconds and are ignored once the collection version
+    (see ResultCache) changes; such matches are counted as stale.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        max_age: float | None = 3600,
+        path: str | None = None,
+        version_check_interval: float = 10.0,
+        version_dir: str = DEFAULT_VERSION_DIR,
+    ):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.path = os.path.expanduser(path) if path is not None else None
+        self.version_check_interval = version_check_interval
+        self.version_dir = version_dir
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.dirty = False
+        self._vectors: np.ndarray | None = None
+        # Per-row partition id (-1: free row), last use tick and metadata
+        self._partitions = np.full(max_entries, -1, dtype=np.int64)
+        self._used = np.zeros(max_entries, dtype=np.int64)
+        self._entries: list[dict | None] = [None] * max_entries
+        self._partition_ids: dict[str, int] = {}
+        self._versions: dict[str, tuple[float, str]] = {}
+        # Running totals for stats(): hits served by this process, their age and similarity
+        self._hit_count = 0
+        self._hit_age_sum = 0.0
+        self._hit_age_max = 0.0
+        self._hit_similarity_sum = 0.0
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, collection: str, channel_slug, top_k: int, with_payload, *options) -> str:
+        """Partition key: only queries searched with equal keys may share results."""
+        return json.dumps([model, collection, channel_slug, top_k, str(with_payload), *map(str, options)], default=str)
+
+    def collection_version(self, qdrant_client: QdrantClient, collection: str) -> str:
+        """Indexer-written version marker, else the point count re-read at most every version_check_interval s."""
+        marker = read_version_marker(collection, self.version_dir)
+        if marker is not None:
+            return f"marker:{marker}"
+        observed = self._versions.get(collection)
+        if observed is not None and time.time() - observed[0] < self.version_check_interval:
+            return observed[1]
+        version = f"points:{qdrant_client.get_collection(collection).points_count}"
+        with self._lock:
+            self._versions[collection] = (time.time(), version)
+            self.dirty = True
+        return version
+
+    def get(self, vector: list[float], key: str, version: str) -> dict | None:
+        """Return the closest matching entry ({"query", "similarity", "results", ...}) or None."""
+        query = self._normalize(vector)
+        with self._lock:
+            pid = self._partition_ids.get(key)
+            if pid is None or self._vectors is None or query is None or query.shape[0] != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+            rows = np.flatnonzero(self._partitions == pid)
+            similarities = self._vectors[rows] @ query
+            now = time.time()
+            for i in np.argsort(-similarities):
+                similarity = float(similarities[i])
+                if similarity < self.threshold:
+                    break
+                row = int(rows[i])
+                entry = self._entries[row]
+                if entry["version"] != version or (self.max_age is not None and now - entry["created_at"] > self.max_age):
+                    # Near-duplicate whose results are out of date
+                    self.stale += 1
+                    self._free(row)
+                    continue
+                self.hits += 1
+                self._tick += 1
+                self._used[row] = self._tick
+                # The hit counter and LRU order change, so the next save() must write them
+                self.dirty = True
+                age = now - entry["created_at"]
+                self._hit_count += 1
+                self._hit_age_sum += age
+                self._hit_age_max = max(self._hit_age_max, age)
+                self._hit_similarity_sum += similarity
+                return {**entry, "similarity": similarity}
+            self.misses += 1
+            return None
+
+    def put(self, vector: list[float], key: str, version: str, query: str, results: list[dict]) -> None:
+        entry = {"query": query, "version": version, "created_at": time.time(), "results": results}
+        with self._lock:
+            self._insert(vector, key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions[:] = -1
+            self._entries = [None] * self.max_entries
+            self._partition_ids.clear()
+            self._vectors = None
+            self.dirty = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            served = self._hit_count
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "entries": len(self),
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "mean_hit_age_s": round(self._hit_age_sum / served, 3) if served else None,
+                "max_hit_age_s": round(self._hit_age_max, 3) if served else None,
+                "mean_hit_similarity": round(self._hit_similarity_sum / served, 4) if served else None,
+            }
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._partitions >= 0))
+
+    def save(self, path: str | None = None) -> None:
+        """Write live entries, hit/miss counters and observed collection versions to path (default: self.path), atomically."""
+        path = os.path.expanduser(path) if path is not None else self.path
+        if path is None:
+            raise ValueError("No path to save the semantic cache to")
+        with self._lock:
+            rows = np.flatnonzero(self._partitions >= 0)
+            rows = rows[np.argsort(self._used[rows])]
+            keys = {pid: key for key, pid in self._partition_ids.items()}
+            meta = {
+                "format": FORMAT_VERSION,
+                "counters": {"hits": self.hits, "misses": self.misses, "stale": self.stale, "evictions": self.evictions},
+                "versions": {collection: list(observed) for collection, observed in self._versions.items()},
+                "entries": [{**self._entries[row], "key": keys[int(self._partitions[row])]} for row in rows],
+            }
+            vectors = self._vectors[rows] if self._vectors is not None else np.zeros((0, 0), dtype=np.float32)
+            directory = os.path.dirname(path) or "."
+            os.makedirs(directory, exist_ok=True)
+            # A temp file of its own per save, so concurrent runs cannot write into each other's
+            with tempfile.NamedTemporaryFile(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp",
+                                             delete=False) as fh:
+                try:
+                    np.savez(fh, vectors=vectors,
+                             meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode(), dtype=np.uint8))
+                except BaseException:
+                    fh.close()
+                    os.remove(fh.name)
+                    raise
+            os.replace(fh.name, path)
+            self.dirty = False
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_SEMANTIC_CACHE_PATH, **kwargs) -> "SemanticCache":
+        """Cache persisted at path by save(); starts empty when the file is missing or unreadable."""
+        cache = cls(path=path, **kwargs)
+        try:
+            with np.load(cache.path, allow_pickle=False) as data:
+                vectors = data["vectors"]
+                meta = json.loads(data["meta"].tobytes())
+        except (OSError, ValueError, KeyError):
+            return cache
+        if meta.get("format") != FORMAT_VERSION:
+            return cache
+        for name, value in meta["counters"].items():
+            setattr(cache, name, value)
+        # Point counts read by earlier runs stay valid for version_check_interval
+        cache._versions = {collection: (checked_at, version)
+                           for collection, (checked_at, version) in meta.get("versions", {}).items()}
+        # Entries are stored least recently used first; keep the newest max_entries
+        for vector, entry in list(zip(vectors, meta["entries"]))[-cache.max_entries:]:
+            cache._insert(vector, entry.pop("key"), entry)
+        cache.dirty = False
+        return cache
+
+    def _insert(self, vector, key: str, entry: dict) -> None:
+        normalized = self._normalize(vector)
+        if normalized is None:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, normalized.shape[0]), dtype=np.float32)
+        elif normalized.shape[0] != self._vectors.shape[1]:
+            # One matrix per cache; other dimensions (models) are not cached
+            return
+        row = self._free_row()
+        self._vectors[row] = normalized
+        self._partitions[row] = self._partition_ids.setdefault(key, len(self._partition_ids))
+        self._tick += 1
+        self._used[row] = self._tick
+        self._entries[row] = entry
+        self.dirty = True
+
+    def _normalize(self, vector) -> np.ndarray | None:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        return array / norm if norm > 0 else None
+
+    def _free(self, row: int) -> None:
+        self._partitions[row] = -1
+        self._entries[row] = None
+        self.dirty = True
+
+    def _free_row(self) -> int:
+        free = np.flatnonzero(self._partitions < 0)
+        if free.size:
+            return int(free[0])
+        row = int(np.argmin(self._used))
+        self.evictions += 1
+        self._free(row)
+        return row
@@ -0,0 +1,221 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_WINDOW = 1000
+
+
+class SearchService:
+    """
+    Warm search state shared by all daemon requests.
+
+    Holds one QdrantClient / OpenAI pair (and their connection pools) plus
+    optional embedding, result and semantic caches and a resilience policy
+    (deadline, retries, hedging, circuit breakers) for the daemon's whole
+    lifetime, and keeps request/latency counters.
+    """
+
+    def __init__(self, qdrant_client, openai_client, qdrant_url: str, embedding_cache=None, result_cache=None,
+                 resilience=None, semantic_cache=None):
+        self.qdrant_client = qdrant_client
+        self.openai_client = openai_client
+        self.qdrant_url = qdrant_url
+        self.embedding_cache = embedding_cache
+        self.result_cache = result_cache
+        self.resilience = resilience
+        self.semantic_cache = semantic_cache
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def search(self, request: dict) -> list[dict]:
+        from kb.filters import PayloadFilter
+        from kb.searcher import build_search_params, parse_fields, search
+
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return search(
+                query=request["query"],
+                qdrant_client=self.qdrant_client,
+                openai_client=self.openai_client,
+                collection=request["collection"],
+                top_k=int(request.get("top_k", 5)),
+                channel_slug=request.get("channel_slug"),
+                model=request.get("model", "text-embedding-3-small"),
+                embedding_cache=self.embedding_cache,
+                with_payload=parse_fields(request.get("fields")),
+                result_cache=self.result_cache,
+                search_params=build_search_params(
+                    preset=request.get("preset"),
+                    hnsw_ef=request.get("hnsw_ef"),
+                    exact=request.get("exact"),
+                    oversampling=request.get("oversampling"),
+                ),
+                score_threshold=request.get("score_threshold"),
+                payload_filter=PayloadFilter.from_dict(request["filter"]) if request.get("filter") else None,
+                resilience=self.resilience,
+                semantic_cache=self.semantic_cache,
+            )
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.requests += 1
+                self._latencies.append(elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            uptime = time.time() - self.started_at
+            stats = {
+                "uptime_s": round(uptime, 3),
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "qps": round(self.requests / uptime, 3) if uptime > 0 else 0.0,
+            }
+        for name, q in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            stats[name] = round(latencies[int(q * (len(latencies) - 1))] * 1000, 3) if latencies else None
+        from kb.batching import EmbeddingBatcher
+
+        if isinstance(self.openai_client, EmbeddingBatcher):
+            stats["embedding_batcher"] = self.openai_client.stats()
+        if self.resilience is not None:
+            stats["resilience"] = self.resilience.stats()
+        if self.embedding_cache is not None:
+            stats["embedding_cache"] = self.embedding_cache.stats()
+        if self.result_cache is not None:
+            stats["result_cache"] = self.result_cache.stats()
+        if self.semantic_cache is not None:
+            stats["semantic_cache"] = self.semantic_cache.stats()
+        return stats
+
+
+def validate_request(request) -> None:
+    """Raise ValueError unless request is a JSON object with well-typed search fields."""
+    if not isinstance(request, dict):
+        raise ValueError("body must be a JSON object")
+    if "query" not in request or "collection" not in request:
+        raise ValueError("query and collection are required")
+    for name in ("query", "collection"):
+        if not isinstance(request[name], str):
+            raise ValueError(f"{name} must be a string")
+    for name in ("channel_slug", "model", "fields", "preset"):
+        if request.get(name) is not None and not isinstance(request[name], str):
+            raise ValueError(f"{name} must be a string")
+    for name in ("top_k", "hnsw_ef"):
+        value = request.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+            raise ValueError(f"{name} must be a positive integer")
+    for name in ("score_threshold", "oversampling"):
+        value = request.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"{name} must be a number")
+    if request.get("exact") is not None and not isinstance(request["exact"], bool):
+        raise ValueError("exact must be a boolean")
+    if request.get("filter") is not None and not isinstance(request["filter"], dict):
+        raise ValueError("filter must be an object")
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /search, GET /health, GET /stats."""
+
+    server_version = "kb-search"
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "qdrant_url": service.qdrant_url})
+        elif self.path == "/stats":
+            self._send(200, service.stats())
+        else:
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path != "/search":
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            validate_request(request)
+        except ValueError as e:
+            self._send(400, {"error": f"Invalid request: {e}"})
+            return
+        if request.get("qdrant_url", service.qdrant_url) != service.qdrant_url:
+            self._send(409, {"error": f"Daemon serves {service.qdrant_url}"})
+            return
+        try:
+            results = service.search(request)
+        except Exception as e:
+            self._send(502, {"error": str(e)})
+            return
+        self._send(200, {"results": results})
+
+    def _send(self, status: int, body: dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(service: SearchService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Create a threaded HTTP server answering search requests with service."""
+    server = ThreadingHTTPServer((host, port), SearchRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def query_daemon(daemon_url: str, request: dict, timeout: float = 30) -> list[dict] | None:
+    """
+    Run a search on a kb-search daemon.
+
+    Returns None when no daemon is reachable at daemon_url (or it serves a
+    different Qdrant), so the caller can fall back to in-process search.
+    Raises RuntimeError when the daemon is reachable but the search fails,
+    and DeadlineExceeded when it accepts the request but does not answer
+    within timeout, since a fallback search would then overrun it.
+    """
+    body = json.dumps(request).encode()
+    http_request = urllib.request.Request(
+        f"{daemon_url.rstrip('/')}/search",
+        data=body,
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            return json.loads(response.read())["results"]
+    except urllib.error.HTTPError as e:
+        if e.code in (404, 409):
+            return None
+        try:
+            message = json.loads(e.read()).get("error", str(e))
+        except ValueError:
+            message = str(e)
+        raise RuntimeError(message) from e
+    except (urllib.error.URLError, ConnectionError):
+        return None
+    except TimeoutError as e:
+        from kb.resilience import DeadlineExceeded
+
+        raise DeadlineExceeded(f"Daemon did not answer within {timeout:g}s") from e
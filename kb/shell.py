@@ -0,0 +1,126 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Iterator
+
+from openai import OpenAI
+from qdrant_client import QdrantClient
+
+from kb.cache import EmbeddingCache
+from kb.searcher import PayloadSelector, SearchHit, iter_search
+
+# Deepest rank a shell session pages to
+MAX_RESULTS = 1000
+
+
+class ShellSession:
+    """
+    Search state of an interactive `kb-search shell`: warm clients, settings and paging.
+
+    search() embeds the query once and returns its first page; next_page()
+    continues the same ranking without repeating the search. While the user
+    reads a page, the following one is fetched in the background, so paging
+    usually costs no round trip. Changing the collection or channel ends
+    paging through the previous query.
+    """
+
+    def __init__(
+        self,
+        qdrant_client: QdrantClient,
+        openai_client: OpenAI,
+        collection: str,
+        top: int = 5,
+        channel_slug: str | None = None,
+        model: str = "text-embedding-3-small",
+        embedding_cache: EmbeddingCache | None = None,
+        with_payload: PayloadSelector = True,
+    ):
+        self.qdrant_client = qdrant_client
+        self.openai_client = openai_client
+        self.collection = collection
+        self.top = top
+        self.channel_slug = channel_slug
+        self.model = model
+        self.embedding_cache = embedding_cache
+        self.with_payload = with_payload
+        self.query: str | None = None
+        self.shown = 0
+        self._hits: Iterator[SearchHit] | None = None
+        self._prefetch: Future | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-shell-prefetch")
+
+    def search(self, query: str) -> list[dict]:
+        """Run query and return its first page of top results."""
+        self.reset()
+        self.query = query
+        self._hits = iter_search(
+            query=query,
+            qdrant_client=self.qdrant_client,
+            openai_client=self.openai_client,
+            collection=self.collection,
+            top_k=MAX_RESULTS,
+            channel_slug=self.channel_slug,
+            model=self.model,
+            embedding_cache=self.embedding_cache,
+            with_payload=self.with_payload,
+            # One Qdrant request per shell page, so each prefetch is one round trip
+            page_size=self.top,
+        )
+        return self._page(self._take(self.top), self.top)
+
+    def next_page(self) -> tuple[list[dict], bool]:
+        """Return the next top results of the last query and whether they were already prefetched."""
+        if self._hits is None:
+            raise ValueError("No previous query to page through")
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is not None:
+            ready = prefetch.done()
+            hits, size = prefetch.result()
+        else:
+            ready = False
+            size = self.top
+            hits = self._take(size)
+        return self._page(hits, size), ready
+
+    def set_top(self, top: int) -> None:
+        if top < 1:
+            raise ValueError("top must be at least 1")
+        # A prefetched page of the old size is still shown as is
+        self.top = top
+
+    def set_collection(self, collection: str) -> None:
+        self.collection = collection
+        self.reset()
+
+    def set_channel(self, channel_slug: str | None) -> None:
+        self.channel_slug = channel_slug
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the last query and drop its prefetched page."""
+        if self._prefetch is not None and not self._prefetch.cancel():
+            # Let a running fetch finish; the iterator is not thread-safe
+            wait([self._prefetch])
+        self.query = None
+        self.shown = 0
+        self._hits = None
+        self._prefetch = None
+
+    def close(self) -> None:
+        self.reset()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _take(self, n: int) -> list[SearchHit]:
+        return list(islice(self._hits, n))
+
+    def _take_sized(self, n: int) -> tuple[list[SearchHit], int]:
+        return self._take(n), n
+
+    def _page(self, hits: list[SearchHit], size: int) -> list[dict]:
+        results = [{"id": hit.id, "score": hit.score, "payload": hit.payload} for hit in hits]
+        self.shown += len(results)
+        if len(results) == size and self.shown < MAX_RESULTS:
+            self._prefetch = self._executor.submit(self._take_sized, self.top)
+        else:
+            # Ranking exhausted
+            self._hits = iter(())
+        return results
@@ -0,0 +1,62 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable
+
+# hook(stage, start, seconds): start is a time.perf_counter() reading
+SpanHook = Callable[[str, float, float], None]
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of values (q in 0..1)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Timings:
+    """
+    Per-stage wall-clock timings and counters for one search.
+
+    Stages accumulate if entered more than once. Every finished stage is also
+    passed to each hook, e.g. to export it as a tracing span.
+    """
+
+    enabled = True
+
+    def __init__(self, hooks: list[SpanHook] | None = None):
+        self.stages: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.hooks = list(hooks or [])
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            for hook in self.hooks:
+                hook(name, start, elapsed)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self) -> dict:
+        stages = {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+        return {"stages_ms": stages, "total_ms": round(sum(stages.values()), 3), "counters": dict(self.counters)}
+
+
+class _NullTimings:
+    """Stand-in used when no Timings is passed; records nothing."""
+
+    enabled = False
+    _null = nullcontext()
+
+    def stage(self, name: str):
+        return self._null
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+
+NULL_TIMINGS = _NullTimings()
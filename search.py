@@ -1,11 +1,92 @@
+import json
 import os
 import sys
+import time
+from collections import deque
+
 import click
-import openai
-from openai import OpenAI
-from qdrant_client import QdrantClient
 
-from kb.searcher import search, SNIPPET_LENGTH
+# openai, qdrant_client and the kb modules built on them are imported inside
+# the commands that use them, so --help, setup prompts and argument errors
+# start fast (see tests/test_startup.py).
+from kb.config import (DEFAULT_CACHE_PATH, DEFAULT_DAEMON_URL, DEFAULT_SEMANTIC_CACHE_PATH, DEFAULT_TIMEOUT, RUN_FIELDS,
+                       SNIPPET_LENGTH)
+
+
+def print_result(rank: int, score: float, payload: dict, collection: str | None = None,
+                 context: str | None = None, more: list[dict] | None = None) -> None:
+    """Render one search result in the human-readable run format.
+
+    context (stitched neighbouring chunks) replaces the snippet; more lists
+    further hits from the same group.
+    """
+    title = payload.get("title", "?")
+    source = payload.get("transcript_source", "?")
+    text = payload.get("text", "")
+    url = payload.get("timestamp_url", "")
+
+    # Truncate text for display
+    snippet = text[:SNIPPET_LENGTH].strip()
+    if len(text) > SNIPPET_LENGTH:
+        snippet += "..."
+
+    origin = f"  [{collection}]" if collection else ""
+    click.echo(f"#{rank} [{score:.2f}] \"{title}\"  ({source}){origin}")
+    click.echo(f"   {context if context is not None else snippet}")
+    click.echo(f"   {url}")
+    for hit in more or ():
+        click.echo(f"   + [{hit['score']:.2f}] {hit['payload'].get('timestamp_url', '')}")
+    click.echo()
+
+
+def print_results(results: list[dict], start: int = 1) -> None:
+    """Render search results in the human-readable run format."""
+    for rank, result in enumerate(results, start=start):
+        print_result(rank, result["score"], result["payload"], result.get("collection"),
+                     result.get("context"), result.get("more"))
+
+
+def print_ndjson(rank: int, id, score: float, payload: dict, collection: str | None = None, **extra) -> None:
+    """Write one search result as a JSON line (extra: group / more / context, when present)."""
+    record = {"rank": rank, "id": id, "score": score, "payload": payload}
+    if collection is not None:
+        record["collection"] = collection
+    record.update(extra)
+    click.echo(json.dumps(record, ensure_ascii=False))
+
+
+def print_timings(timings, fmt: str | None) -> None:
+    """Write the per-stage breakdown of a search to stderr as text or JSON."""
+    if fmt is None:
+        return
+    report = timings.as_dict()
+    if fmt == "json":
+        click.echo(json.dumps(report), err=True)
+        return
+    click.echo("časy:", err=True)
+    for name, ms in report["stages_ms"].items():
+        click.echo(f"  {name:<20} {ms:>9.2f} ms", err=True)
+    click.echo(f"  {'celkem':<20} {report['total_ms']:>9.2f} ms", err=True)
+    for name, value in report["counters"].items():
+        click.echo(f"  {name:<20} {value:>9}", err=True)
+
+
+def read_queries(lines):
+    """Parse batch input: plain query lines or JSONL objects with query/channel/top_k."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("{"):
+            yield {"query": line}
+            continue
+        record = json.loads(line)
+        spec = {"query": record["query"]}
+        if record.get("channel"):
+            spec["channel_slug"] = record["channel"].removeprefix("@")
+        if record.get("top_k") is not None:
+            spec["top_k"] = int(record["top_k"])
+        yield spec
 
 
 @click.group()
@@ -16,104 +97,962 @@ def cli():
 @cli.command()
 @click.argument("query")
 @click.option("--top", default=5, show_default=True, help="Number of results to return")
+@click.option("--collection", "collections", multiple=True, default=[os.environ.get("KB_SEARCH_COLLECTION", "kb")], show_default=True, help="Qdrant collection name or glob; repeat to search several at once (env: KB_SEARCH_COLLECTION)")
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
+@click.option("--channel", "channels", multiple=True, help="Filter by channel slug (e.g. @SteveMagness); repeat to match any of several")
+@click.option("--date-from", default=None, help="Only videos uploaded on or after this date (YYYY-MM-DD)")
+@click.option("--date-to", default=None, help="Only videos uploaded on or before this date (YYYY-MM-DD)")
+@click.option("--source-type", "source_types", multiple=True, help="Filter by source_type (e.g. youtube); repeatable")
+@click.option("--transcript-source", "transcript_sources", multiple=True, help="Filter by transcript_source (e.g. caption); repeatable")
+@click.option("--model", default="text-embedding-3-small", show_default=True, help="OpenAI embedding model")
+@click.option("--cache", "cache_kind", type=click.Choice(["disk", "memory", "off"]), default="disk", show_default=True, help="Query-embedding and result cache (off bypasses it)")
+@click.option("--cache-path", default=DEFAULT_CACHE_PATH, show_default=True, help="SQLite file for the disk cache")
+@click.option("--clear-cache", is_flag=True, help="Clear the embedding, result and semantic caches before searching (bypasses the daemon)")
+@click.option("--cache-stats", is_flag=True, help="Print cache hit/miss stats to stderr")
+@click.option("--result-ttl", default=300, show_default=True, help="Seconds a cached result list stays valid")
+@click.option("--semantic-threshold", type=float, default=None, help="Reuse the results of an earlier query whose embedding has at least this cosine similarity (e.g. 0.95); off by default")
+@click.option("--semantic-cache-path", default=DEFAULT_SEMANTIC_CACHE_PATH, show_default=True, help="File the semantic cache is kept in between runs")
+@click.option("--semantic-max-entries", default=1000, show_default=True, help="Most queries kept in the semantic cache (least recently used are evicted)")
+@click.option("--daemon-url", envvar="KB_SEARCH_DAEMON_URL", default=DEFAULT_DAEMON_URL, show_default=True, help="kb-search serve daemon to use when running (env: KB_SEARCH_DAEMON_URL)")
+@click.option("--no-daemon", is_flag=True, help="Always search in-process, even if a daemon is running")
+@click.option("--fields", default=RUN_FIELDS, show_default=True, help='Payload fields to fetch: "a,b", "-a,-b" (exclude), "all" or "none"')
+@click.option("--offline", "offline_path", type=click.Path(exists=True, file_okay=False), default=None, help="Search a snapshot written by `kb-search export` instead of Qdrant")
+@click.option("--mode", type=click.Choice(["vector", "lexical", "hybrid"]), default="vector", show_default=True, help="vector search, local BM25 (no OpenAI call) or both fused by reciprocal rank")
+@click.option("--lexical-index", default=None, help="BM25 index file (default: ~/.config/knowledge-vault/lexical/<collection>.sqlite)")
+@click.option("--offset", default=0, show_default=True, help="Skip this many top-ranked results")
+@click.option("--page-size", default=100, show_default=True, help="Results fetched per Qdrant request when streaming")
+@click.option("--format", "fmt", type=click.Choice(["text", "ndjson"]), default="text", show_default=True, help="Output format")
+@click.option("--preset", type=click.Choice(["fast", "balanced", "accurate"]), default=None, help="Recall/latency preset for the HNSW search (default: Qdrant's settings)")
+@click.option("--hnsw-ef", type=int, default=None, help="HNSW ef for this search (overrides --preset)")
+@click.option("--exact", is_flag=True, default=None, help="Exact (brute-force) search instead of HNSW")
+@click.option("--oversampling", type=float, default=None, help="Quantization oversampling factor, with rescoring (overrides --preset)")
+@click.option("--score-threshold", type=float, default=None, help="Drop results scoring below this")
+@click.option("--timings", "timings_fmt", type=click.Choice(["text", "json"]), default=None, help="Print a per-stage timing breakdown to stderr")
+@click.option("--two-stage", is_flag=True, help="Coarse search on short vectors (see backfill-short), then rescore with full vectors")
+@click.option("--short-dim", default=256, show_default=True, help="Dimensions of the short vectors for --two-stage")
+@click.option("--coarse-factor", default=4, show_default=True, help="Candidates fetched per result in the --two-stage coarse search")
+@click.option("--group-by", default=None, help="Return one result per value of this payload field (e.g. video_id)")
+@click.option("--group-size", default=1, show_default=True, help="Hits shown per group with --group-by")
+@click.option("--context", default=0, show_default=True, help="Show N neighbouring chunks of the same video around each hit")
+@click.option("--timeout", default=DEFAULT_TIMEOUT, show_default=True, help="Client timeout in seconds for each OpenAI / Qdrant request")
+@click.option("--deadline", type=float, default=None, help="Time budget in seconds for the whole search, split across embedding and Qdrant (in-process search, daemon wait included)")
+@click.option("--retries", default=2, show_default=True, help="Retries with jittered backoff on timeouts, 429s and 5xx (in-process search)")
+def run(query, top, collections, qdrant_url, channels, date_from, date_to, source_types, transcript_sources, model, cache_kind, cache_path, clear_cache, cache_stats, result_ttl,
+        semantic_threshold, semantic_cache_path, semantic_max_entries, daemon_url, no_daemon, fields, offline_path, mode, lexical_index, offset, page_size, fmt,
+        preset, hnsw_ef, exact, oversampling, score_threshold, timings_fmt, two_stage, short_dim, coarse_factor,
+        group_by, group_size, context, timeout, deadline, retries):
+    """Search the knowledge base for QUERY.
+
+    Uses a running `kb-search serve` daemon when available (cache options then
+    apply to the daemon's own cache) and falls back to in-process search.
+    With --offline, Qdrant and the daemon are not contacted at all.
+    Vector searches with --offset or --top above --page-size are streamed
+    page by page, printing results as they arrive (not with --semantic-threshold). Several --collection
+    values (or a glob) are searched concurrently and merged into one top-k.
+    """
+    # Normalize channel slugs; one channel keeps the plain channel_slug path
+    channel_slugs = [c.removeprefix("@") for c in channels]
+    channel_slug = channel_slugs[0] if len(channel_slugs) == 1 else None
+    payload_filter = None
+    if len(channel_slugs) > 1 or date_from or date_to or source_types or transcript_sources:
+        from kb.filters import PayloadFilter, parse_date
+
+        try:
+            payload_filter = PayloadFilter(
+                channels=tuple(channel_slugs) if len(channel_slugs) > 1 else (),
+                source_types=source_types,
+                transcript_sources=transcript_sources,
+                date_from=parse_date(date_from) if date_from else None,
+                date_to=parse_date(date_to) if date_to else None,
+            )
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        if mode != "vector" or offline_path is not None:
+            raise click.UsageError(
+                "Several channels, dates, --source-type and --transcript-source need --mode vector without --offline"
+            )
+    tuning = {"preset": preset, "hnsw_ef": hnsw_ef, "exact": exact, "oversampling": oversampling}
+    if deadline is not None:
+        # No single request may outlive the whole search's budget, whichever path serves it
+        timeout = min(timeout, deadline)
+
+    from kb.timings import NULL_TIMINGS, Timings
+
+    timings = Timings() if timings_fmt else NULL_TIMINGS
+
+    fan_out = len(collections) > 1 or any(c in collections[0] for c in "*?[")
+    if fan_out and (mode != "vector" or offline_path is not None or offset > 0 or semantic_threshold is not None):
+        raise click.UsageError(
+            "Multiple collections or a glob need --mode vector, without --offline, --offset or --semantic-threshold"
+        )
+    if two_stage and (fan_out or offline_path is not None or offset > 0):
+        raise click.UsageError("--two-stage needs a single collection, without --offline or --offset")
+    if group_by and (mode != "vector" or fan_out or two_stage or offline_path is not None or offset > 0):
+        raise click.UsageError("--group-by needs --mode vector and a single collection, without --two-stage, --offline or --offset")
+    if context and (fan_out or offline_path is not None or offset > 0):
+        raise click.UsageError("--context needs a single collection, without --offline or --offset")
+    if context:
+        from kb.grouping import with_context_fields
+
+        fields = with_context_fields(fields)
+    collection = collections[0]
+
+    if clear_cache:
+        # Before any search path runs, so every one of them starts cold
+        from kb.cache import make_embedding_cache, make_result_cache
+
+        make_embedding_cache("disk", cache_path).clear()
+        make_result_cache("disk", cache_path, result_ttl).clear()
+        if os.path.exists(os.path.expanduser(semantic_cache_path)):
+            os.remove(os.path.expanduser(semantic_cache_path))
+
+    if fmt == "text":
+        click.echo(f'Hledám: "{query}"\n')
+
+    if fan_out:
+        fan_out_results(query, top, collections, qdrant_url, channel_slug, model, cache_kind, cache_path,
+                        fields, fmt, tuning, score_threshold, timings, payload_filter, timeout, deadline, retries,
+                        cache_stats)
+        print_timings(timings, timings_fmt)
+        return
+
+    # The semantic cache stores whole result lists, so such searches are not streamed
+    if (mode == "vector" and offline_path is None and semantic_threshold is None and not (two_stage or group_by or context)
+            and (offset > 0 or top > page_size)):
+        stream_results(query, top, collection, qdrant_url, channel_slug, model, cache_kind, cache_path,
+                       fields, offset, page_size, fmt, tuning, score_threshold, timings, payload_filter, timeout,
+                       deadline, retries, cache_stats)
+        print_timings(timings, timings_fmt)
+        return
+
+    # Lexical, hybrid and offline results are ranked in one go; --offset is sliced off afterwards
+    depth = offset + top
+    # Hybrid mode fuses deeper candidate lists from both retrievers
+    candidates = depth if mode != "hybrid" else max(2 * depth, 20)
+
+    lexical_results = None
+    if mode != "vector":
+        from kb.lexical import LexicalIndex, default_index_path
+        from kb.searcher import parse_fields
+
+        index_path = lexical_index or default_index_path(collection)
+        if not os.path.exists(index_path):
+            raise click.ClickException(f"No lexical index at {index_path}; run `kb-search lexical-index` first")
+        with timings.stage("lexical"):
+            lexical_results = LexicalIndex(index_path).search(query, candidates, channel_slug, parse_fields(fields))
+
+    results = lexical_results if mode == "lexical" else None
+    # The daemon answers from its own caches, which --clear-cache does not reach
+    if results is None and mode == "vector" and not (no_daemon or clear_cache) and offline_path is None and not (two_stage or group_by or context):
+        from kb.server import query_daemon
+
+        daemon_started = time.monotonic()
+        try:
+            with timings.stage("daemon"):
+                results = query_daemon(daemon_url, {
+                    "query": query,
+                    "collection": collection,
+                    "top_k": top,
+                    "channel_slug": channel_slug,
+                    "model": model,
+                    "qdrant_url": qdrant_url,
+                    "fields": fields,
+                    **tuning,
+                    "score_threshold": score_threshold,
+                    "filter": payload_filter.as_dict() if payload_filter is not None else None,
+                }, timeout=deadline or timeout)
+        except (RuntimeError, TimeoutError) as e:
+            raise click.ClickException(str(e))
+        if results is None and deadline is not None:
+            # The in-process fallback only gets what the daemon attempt left of the deadline
+            deadline -= time.monotonic() - daemon_started
+            if deadline <= 0:
+                raise click.ClickException("Deadline exceeded before the in-process search could start")
+
+    embedding_cache = result_cache = semantic_cache = qdrant_client = None
+    if results is None:
+        openai_api_key = os.environ.get("OPENAI_API_KEY")
+        if not openai_api_key:
+            raise click.ClickException("OPENAI_API_KEY environment variable is required")
+
+        with timings.stage("setup"):
+            from openai import OpenAI
+
+            from kb.cache import make_embedding_cache, make_result_cache
+            from kb.searcher import build_search_params, embed_query, parse_fields, search
+
+            embedding_cache = make_embedding_cache(cache_kind, cache_path)
+            result_cache = make_result_cache(cache_kind, cache_path, result_ttl)
+            if semantic_threshold is not None and not (two_stage or group_by or offline_path):
+                from kb.semantic_cache import SemanticCache
+
+                semantic_cache = SemanticCache.load(
+                    semantic_cache_path, threshold=semantic_threshold, max_entries=semantic_max_entries,
+                    max_age=result_ttl,
+                )
+
+            openai_client = OpenAI(api_key=openai_api_key, timeout=timeout)
+
+        from kb.resilience import Resilience
+
+        # Every in-process path runs under the same deadline and retry policy
+        resilience = Resilience(deadline=deadline, retries=retries)
+        try:
+            if offline_path is not None:
+                from kb.offline import OfflineIndex
+
+                with timings.stage("embed"):
+                    query_vector = embed_query(query, openai_client, model, embedding_cache, resilience.start())
+                with timings.stage("offline"):
+                    results = OfflineIndex(offline_path).search(query_vector, candidates, channel_slug, parse_fields(fields))
+            else:
+                with timings.stage("setup"):
+                    from qdrant_client import QdrantClient
+
+                    qdrant_client = QdrantClient(url=qdrant_url, timeout=timeout)
+
+                if two_stage:
+                    from kb.matryoshka import two_stage_search
+
+                    results = two_stage_search(
+                        query=query,
+                        qdrant_client=qdrant_client,
+                        openai_client=openai_client,
+                        collection=collection,
+                        top_k=candidates,
+                        channel_slug=channel_slug,
+                        model=model,
+                        embedding_cache=embedding_cache,
+                        with_payload=parse_fields(fields),
+                        short_dim=short_dim,
+                        coarse_factor=coarse_factor,
+                        payload_filter=payload_filter,
+                        timings=timings,
+                        search_params=build_search_params(**tuning),
+                        score_threshold=score_threshold,
+                        resilience=resilience,
+                    )
+                elif group_by:
+                    from kb.grouping import search_grouped
+
+                    results = search_grouped(
+                        query=query,
+                        qdrant_client=qdrant_client,
+                        openai_client=openai_client,
+                        collection=collection,
+                        top_k=candidates,
+                        group_by=group_by,
+                        group_size=group_size,
+                        channel_slug=channel_slug,
+                        model=model,
+                        embedding_cache=embedding_cache,
+                        with_payload=parse_fields(fields),
+                        search_params=build_search_params(**tuning),
+                        score_threshold=score_threshold,
+                        payload_filter=payload_filter,
+                        timings=timings,
+                        resilience=resilience,
+                    )
+                else:
+                    results = search(
+                        query=query,
+                        qdrant_client=qdrant_client,
+                        openai_client=openai_client,
+                        collection=collection,
+                        top_k=candidates,
+                        channel_slug=channel_slug,
+                        model=model,
+                        embedding_cache=embedding_cache,
+                        with_payload=parse_fields(fields),
+                        result_cache=result_cache,
+                        search_params=build_search_params(**tuning),
+                        score_threshold=score_threshold,
+                        payload_filter=payload_filter,
+                        timings=timings,
+                        resilience=resilience,
+                        semantic_cache=semantic_cache,
+                    )
+                    if semantic_cache is not None and semantic_cache.dirty:
+                        with timings.stage("semantic_cache"):
+                            semantic_cache.save()
+        except Exception as e:
+            raise click.ClickException(str(e))
+        if resilience.retried:
+            timings.count("retries", resilience.retried)
+
+    if cache_stats:
+        print_cache_stats(embedding_cache, result_cache, semantic_cache)
+
+    if mode == "hybrid":
+        from kb.lexical import reciprocal_rank_fusion
+
+        with timings.stage("fusion"):
+            results = reciprocal_rank_fusion([results, lexical_results], depth)
+    results = results[offset:depth]
+
+    if context:
+        from qdrant_client import QdrantClient
+
+        from kb.grouping import expand_context
+
+        try:
+            results = expand_context(qdrant_client or QdrantClient(url=qdrant_url, timeout=timeout),
+                                     collection, results, context, timings)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+
+    with timings.stage("format"):
+        if fmt == "ndjson":
+            for rank, result in enumerate(results, start=offset + 1):
+                extra = {key: result[key] for key in ("group", "more", "context") if key in result}
+                print_ndjson(rank, result["id"], result["score"], result["payload"], **extra)
+        elif not results:
+            click.echo("Žádné výsledky.")
+        else:
+            if results[0].get("cached_query") and results[0]["cached_query"] != query:
+                click.echo(f'(výsledky z cache pro podobný dotaz "{results[0]["cached_query"]}")\n')
+            elif results[0].get("cached"):
+                click.echo("(výsledky z cache)\n")
+            print_results(results, start=offset + 1)
+    print_timings(timings, timings_fmt)
+
+
+def print_cache_stats(embedding_cache=None, result_cache=None, semantic_cache=None):
+    """Print the hit/miss counters of the caches a search used to stderr."""
+    for name, cache in (("cache", embedding_cache), ("result cache", result_cache)):
+        if cache is not None:
+            stats = cache.stats()
+            click.echo(f"{name}: {stats['hits']} hit(s), {stats['misses']} miss(es)", err=True)
+    if semantic_cache is not None:
+        stats = semantic_cache.stats()
+        click.echo(f"semantic cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['stale']} stale, "
+                   f"hit rate {stats['hit_rate']:.1%}, {stats['entries']} entries", err=True)
+
+
+def fan_out_results(query, top, collections, qdrant_url, channel_slug, model, cache_kind, cache_path,
+                    fields, fmt, tuning, score_threshold, timings, payload_filter, timeout, deadline=None, retries=2,
+                    cache_stats=False):
+    """Search all collections concurrently with search_collections() and print the merged top-k."""
+    openai_api_key = os.environ.get("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise click.ClickException("OPENAI_API_KEY environment variable is required")
+
+    with timings.stage("setup"):
+        from openai import OpenAI
+        from qdrant_client import QdrantClient
+
+        from kb.cache import make_embedding_cache
+        from kb.resilience import Resilience
+        from kb.searcher import build_search_params, parse_fields, resolve_collections, search_collections
+
+        qdrant_client = QdrantClient(url=qdrant_url, timeout=timeout)
+        embedding_cache = make_embedding_cache(cache_kind, cache_path)
+        resilience = Resilience(deadline=deadline, retries=retries)
+
+    try:
+        results = search_collections(
+            query=query,
+            qdrant_client=qdrant_client,
+            openai_client=OpenAI(api_key=openai_api_key, timeout=timeout),
+            collections=resolve_collections(qdrant_client, collections),
+            top_k=top,
+            channel_slug=channel_slug,
+            model=model,
+            embedding_cache=embedding_cache,
+            with_payload=parse_fields(fields),
+            search_params=build_search_params(**tuning),
+            score_threshold=score_threshold,
+            payload_filter=payload_filter,
+            timings=timings,
+            resilience=resilience,
+        )
+    except (RuntimeError, ValueError) as e:
+        raise click.ClickException(str(e))
+    if resilience.retried:
+        timings.count("retries", resilience.retried)
+    if cache_stats:
+        print_cache_stats(embedding_cache)
+
+    with timings.stage("format"):
+        if fmt == "ndjson":
+            for rank, result in enumerate(results, start=1):
+                print_ndjson(rank, result["id"], result["score"], result["payload"], result["collection"])
+        elif not results:
+            click.echo("Žádné výsledky.")
+        else:
+            print_results(results)
+
+
+def stream_results(query, top, collection, qdrant_url, channel_slug, model, cache_kind, cache_path,
+                   fields, offset, page_size, fmt, tuning, score_threshold, timings, payload_filter, timeout,
+                   deadline=None, retries=2, cache_stats=False):
+    """Page through vector results with iter_search() and print each as it arrives."""
+    openai_api_key = os.environ.get("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise click.ClickException("OPENAI_API_KEY environment variable is required")
+
+    with timings.stage("setup"):
+        from openai import OpenAI
+        from qdrant_client import QdrantClient
+
+        from kb.cache import make_embedding_cache
+        from kb.resilience import Resilience
+        from kb.searcher import build_search_params, iter_search, parse_fields
+
+        embedding_cache = make_embedding_cache(cache_kind, cache_path)
+        resilience = Resilience(deadline=deadline, retries=retries)
+        hits = iter_search(
+            query=query,
+            qdrant_client=QdrantClient(url=qdrant_url, timeout=timeout),
+            openai_client=OpenAI(api_key=openai_api_key, timeout=timeout),
+            collection=collection,
+            top_k=top,
+            channel_slug=channel_slug,
+            model=model,
+            embedding_cache=embedding_cache,
+            with_payload=parse_fields(fields),
+            offset=offset,
+            page_size=page_size,
+            search_params=build_search_params(**tuning),
+            score_threshold=score_threshold,
+            payload_filter=payload_filter,
+            resilience=resilience,
+        )
+    rank = offset
+    try:
+        # Embedding, Qdrant pages and printing interleave, so they share one stage
+        with timings.stage("stream"):
+            for rank, hit in enumerate(hits, start=offset + 1):
+                if fmt == "ndjson":
+                    print_ndjson(rank, hit.id, hit.score, hit.payload)
+                else:
+                    print_result(rank, hit.score, hit.payload)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    timings.count("hits", rank - offset)
+    if resilience.retried:
+        timings.count("retries", resilience.retried)
+    if rank == offset and fmt == "text":
+        click.echo("Žádné výsledky.")
+    if cache_stats:
+        print_cache_stats(embedding_cache)
+
+
+def parse_point_id(value: str) -> int | str:
+    """Point ids are unsigned integers or UUID strings."""
+    return int(value) if value.isdigit() else value
+
+
+@cli.command()
+@click.argument("point_ids", nargs=-1)
+@click.option("--video-id", default=None, help="Use the chunk of this video given by --chunk-index as the example")
+@click.option("--chunk-index", type=int, default=None, help="Chunk of --video-id to use as the example")
+@click.option("--negative", "negative_ids", multiple=True, help="Point id to steer away from; repeatable")
+@click.option("--top", default=5, show_default=True, help="Number of results to return")
+@click.option("--collection", default=os.environ.get("KB_SEARCH_COLLECTION", "kb"), show_default=True, help="Qdrant collection name (env: KB_SEARCH_COLLECTION)")
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
+@click.option("--channel", "channels", multiple=True, help="Filter by channel slug (e.g. @SteveMagness); repeat to match any of several")
+@click.option("--strategy", type=click.Choice(["average_vector", "best_score"]), default=None, help="How Qdrant combines several examples (default: average_vector)")
+@click.option("--fields", default=RUN_FIELDS, show_default=True, help='Payload fields to fetch: "a,b", "-a,-b" (exclude), "all" or "none"')
+@click.option("--format", "fmt", type=click.Choice(["text", "ndjson"]), default="text", show_default=True, help="Output format")
+@click.option("--timeout", default=DEFAULT_TIMEOUT, show_default=True, help="Qdrant client timeout in seconds")
+def similar(point_ids, video_id, chunk_index, negative_ids, top, collection, qdrant_url, channels, strategy, fields,
+            fmt, timeout):
+    """Find chunks similar to existing points, without calling OpenAI.
+
+    Give example POINT_IDS (as printed by `run --format ndjson`) and/or
+    --video-id with --chunk-index; their stored vectors are reused.
+    """
+    if (video_id is None) != (chunk_index is None):
+        raise click.UsageError("--video-id and --chunk-index must be given together")
+    if not point_ids and video_id is None:
+        raise click.UsageError("Give at least one POINT_ID or --video-id with --chunk-index")
+
+    from qdrant_client import QdrantClient
+
+    from kb.filters import PayloadFilter
+    from kb.searcher import find_point_id, parse_fields, search_by_point
+
+    channel_slugs = [c.removeprefix("@") for c in channels]
+    qdrant_client = QdrantClient(url=qdrant_url, timeout=timeout)
+    try:
+        positive = [parse_point_id(p) for p in point_ids]
+        if video_id is not None:
+            positive.append(find_point_id(qdrant_client, collection, video_id, chunk_index))
+        results = search_by_point(
+            qdrant_client=qdrant_client,
+            collection=collection,
+            positive=positive,
+            top_k=top,
+            negative=[parse_point_id(n) for n in negative_ids],
+            channel_slug=channel_slugs[0] if len(channel_slugs) == 1 else None,
+            with_payload=parse_fields(fields),
+            payload_filter=PayloadFilter(channels=tuple(channel_slugs)) if len(channel_slugs) > 1 else None,
+            strategy=strategy,
+        )
+    except (RuntimeError, ValueError) as e:
+        raise click.ClickException(str(e))
+
+    if fmt == "ndjson":
+        for rank, result in enumerate(results, start=1):
+            print_ndjson(rank, result["id"], result["score"], result["payload"])
+    elif not results:
+        click.echo("Žádné výsledky.")
+    else:
+        click.echo(f"Podobné jako: {', '.join(str(p) for p in positive)}\n")
+        print_results(results)
+
+
+SHELL_HELP = """\
+  <dotaz>              hledat
+  :n, :next            další stránka výsledků posledního dotazu
+  :top N               počet výsledků na stránku
+  :channel [@slug]     filtr kanálu (bez argumentu zrušit)
+  :collection NAME     přepnout kolekci
+  :help                tato nápověda
+  :q, Ctrl-D           konec"""
+
+
+@cli.command()
+@click.option("--top", default=5, show_default=True, help="Results per page")
 @click.option("--collection", default=os.environ.get("KB_SEARCH_COLLECTION", "kb"), show_default=True, help="Qdrant collection name (env: KB_SEARCH_COLLECTION)")
 @click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
 @click.option("--channel", default=None, help="Filter by channel slug (e.g. @SteveMagness)")
 @click.option("--model", default="text-embedding-3-small", show_default=True, help="OpenAI embedding model")
-def run(query, top, collection, qdrant_url, channel, model):
-    """Search the knowledge base for QUERY."""
+@click.option("--cache", "cache_kind", type=click.Choice(["disk", "memory", "off"]), default="disk", show_default=True, help="Query-embedding cache (off bypasses it)")
+@click.option("--cache-path", default=DEFAULT_CACHE_PATH, show_default=True, help="SQLite file for the disk cache")
+@click.option("--fields", default=RUN_FIELDS, show_default=True, help='Payload fields to fetch: "a,b", "-a,-b" (exclude), "all" or "none"')
+@click.option("--timeout", default=DEFAULT_TIMEOUT, show_default=True, help="Client timeout in seconds for each OpenAI / Qdrant request")
+def shell(top, collection, qdrant_url, channel, model, cache_kind, cache_path, fields, timeout):
+    """Interactive search session with warm clients.
+
+    Clients and their keep-alive connections are set up once; the next page
+    of results is fetched in the background while the current one is read.
+    The prompt shows how long the last query took. Type :help for commands.
+    """
+    openai_api_key = os.environ.get("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise click.ClickException("OPENAI_API_KEY environment variable is required")
+
+    try:
+        import readline  # noqa: F401  (line editing and history for input())
+    except ImportError:
+        pass
+    from openai import OpenAI
+    from qdrant_client import QdrantClient
+
+    from kb.cache import make_embedding_cache
+    from kb.searcher import parse_fields
+    from kb.shell import ShellSession
+
+    session = ShellSession(
+        qdrant_client=QdrantClient(url=qdrant_url, timeout=timeout),
+        openai_client=OpenAI(api_key=openai_api_key, timeout=timeout),
+        collection=collection,
+        top=top,
+        channel_slug=channel.removeprefix("@") if channel else None,
+        model=model,
+        embedding_cache=make_embedding_cache(cache_kind, cache_path),
+        with_payload=parse_fields(fields),
+    )
+    click.echo("kb-search shell — :help pro nápovědu, :q nebo Ctrl-D pro konec\n")
+    last_ms = None
+    try:
+        while True:
+            prompt = session.collection
+            if session.channel_slug:
+                prompt += f" @{session.channel_slug}"
+            if last_ms is not None:
+                prompt += f" [{last_ms:.0f} ms]"
+            try:
+                line = input(f"{prompt}> ").strip()
+            except EOFError:
+                click.echo()
+                break
+            if not line:
+                continue
+            command, _, arg = line.partition(" ")
+            arg = arg.strip()
+            start = time.perf_counter()
+            try:
+                if command in (":q", ":quit", ":exit"):
+                    break
+                elif command in (":h", ":help"):
+                    click.echo(SHELL_HELP)
+                elif command == ":top":
+                    session.set_top(int(arg))
+                elif command == ":channel":
+                    session.set_channel(arg.removeprefix("@") or None)
+                elif command == ":collection":
+                    if not arg:
+                        raise ValueError(":collection needs a name")
+                    session.set_collection(arg)
+                elif command in (":n", ":next"):
+                    results, prefetched = session.next_page()
+                    last_ms = (time.perf_counter() - start) * 1000
+                    if not results:
+                        click.echo("Žádné další výsledky.")
+                    else:
+                        click.echo("(načteno předem)\n" if prefetched else "")
+                        print_results(results, start=session.shown - len(results) + 1)
+                elif command.startswith(":"):
+                    click.echo(f"Neznámý příkaz {command}; :help vypíše příkazy")
+                else:
+                    results = session.search(line)
+                    last_ms = (time.perf_counter() - start) * 1000
+                    click.echo(f'Hledám: "{line}"\n')
+                    if results:
+                        print_results(results)
+                    else:
+                        click.echo("Žádné výsledky.")
+            except (RuntimeError, ValueError) as e:
+                click.echo(f"Chyba: {e}", err=True)
+    finally:
+        session.close()
+
+
+@cli.command()
+@click.argument("queries_file", type=click.File("r"), default="-")
+@click.option("--top", default=5, show_default=True, help="Default number of results per query")
+@click.option("--collection", default=os.environ.get("KB_SEARCH_COLLECTION", "kb"), show_default=True, help="Qdrant collection name (env: KB_SEARCH_COLLECTION)")
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
+@click.option("--channel", default=None, help="Default channel slug filter")
+@click.option("--model", default="text-embedding-3-small", show_default=True, help="OpenAI embedding model")
+@click.option("--batch-size", default=64, show_default=True, help="Queries per embedding / Qdrant batch request")
+@click.option("--fields", default="all", show_default=True, help='Payload fields to fetch: "a,b", "-a,-b" (exclude), "all" or "none"')
+@click.option("--format", "fmt", type=click.Choice(["text", "jsonl"]), default="jsonl", show_default=True, help="Output format")
+@click.option("--cache", "cache_kind", type=click.Choice(["disk", "memory", "off"]), default="disk", show_default=True, help="Query-embedding cache (off bypasses it)")
+@click.option("--cache-path", default=DEFAULT_CACHE_PATH, show_default=True, help="SQLite file for the disk cache")
+def batch(queries_file, top, collection, qdrant_url, channel, model, batch_size, fields, fmt, cache_kind, cache_path):
+    """Search for every query in QUERIES_FILE (plain lines or JSONL; default stdin)."""
     openai_api_key = os.environ.get("OPENAI_API_KEY")
     if not openai_api_key:
         raise click.ClickException("OPENAI_API_KEY environment variable is required")
 
-    # Normalize channel slug
+    from openai import OpenAI
+    from qdrant_client import QdrantClient
+
+    from kb.cache import make_embedding_cache
+    from kb.searcher import parse_fields, search_many
+
     channel_slug = channel.removeprefix("@") if channel else None
 
-    qdrant_client = QdrantClient(url=qdrant_url, timeout=30)
-    openai_client = OpenAI(api_key=openai_api_key, timeout=30)
+    qdrant_client = QdrantClient(url=qdrant_url, timeout=DEFAULT_TIMEOUT)
+    openai_client = OpenAI(api_key=openai_api_key, timeout=DEFAULT_TIMEOUT)
 
-    click.echo(f'Hledám: "{query}"\n')
+    # Queries already handed to search_many, awaiting their results (in order)
+    pending = deque()
+
+    def track(items):
+        for spec in items:
+            pending.append(spec)
+            yield spec
 
     try:
-        results = search(
-            query=query,
+        results_iter = search_many(
+            track(read_queries(queries_file)),
             qdrant_client=qdrant_client,
             openai_client=openai_client,
             collection=collection,
             top_k=top,
             channel_slug=channel_slug,
             model=model,
+            embedding_cache=make_embedding_cache(cache_kind, cache_path),
+            batch_size=batch_size,
+            with_payload=parse_fields(fields),
         )
-    except Exception as e:
+        for results in results_iter:
+            query = pending.popleft()["query"]
+            if fmt == "jsonl":
+                click.echo(json.dumps({"query": query, "results": results}, ensure_ascii=False))
+            else:
+                click.echo(f'Hledám: "{query}"\n')
+                if results:
+                    print_results(results)
+                else:
+                    click.echo("Žádné výsledky.\n")
+    except (RuntimeError, ValueError, KeyError) as e:
         raise click.ClickException(str(e))
 
-    if not results:
-        click.echo("Žádné výsledky.")
-        return
 
-    for i, result in enumerate(results, start=1):
-        score = result["score"]
-        payload = result["payload"]
-        title = payload.get("title", "?")
-        source = payload.get("transcript_source", "?")
-        text = payload.get("text", "")
-        url = payload.get("timestamp_url", "")
-
-        # Truncate text for display
-        snippet = text[:SNIPPET_LENGTH].strip()
-        if len(text) > SNIPPET_LENGTH:
-            snippet += "..."
-
-        click.echo(f"#{i} [{score:.2f}] \"{title}\"  ({source})")
-        click.echo(f"   {snippet}")
-        click.echo(f"   {url}")
-        click.echo()
+@cli.command("eval-presets")
+@click.argument("queries_file", type=click.File("r"), default="-")
+@click.option("--top", default=10, show_default=True, help="k for recall@k")
+@click.option("--collection", default=os.environ.get("KB_SEARCH_COLLECTION", "kb"), show_default=True, help="Qdrant collection name (env: KB_SEARCH_COLLECTION)")
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
+@click.option("--channel", default=None, help="Filter by channel slug")
+@click.option("--model", default="text-embedding-3-small", show_default=True, help="OpenAI embedding model")
+@click.option("--cache", "cache_kind", type=click.Choice(["disk", "memory", "off"]), default="disk", show_default=True, help="Query-embedding cache (off bypasses it)")
+@click.option("--cache-path", default=DEFAULT_CACHE_PATH, show_default=True, help="SQLite file for the disk cache")
+@click.option("--json", "as_json", is_flag=True, help="Print the results as JSON")
+def eval_presets(queries_file, top, collection, qdrant_url, channel, model, cache_kind, cache_path, as_json):
+    """Compare recall@k and latency of each --preset against exact search on QUERIES_FILE."""
+    openai_api_key = os.environ.get("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise click.ClickException("OPENAI_API_KEY environment variable is required")
+
+    from openai import OpenAI
+    from qdrant_client import QdrantClient
+
+    from kb.cache import make_embedding_cache
+    from kb.evaluation import evaluate_presets
+    from kb.searcher import PRESETS, build_search_params, embed_queries
+
+    try:
+        queries = [spec["query"] for spec in read_queries(queries_file)]
+    except (ValueError, KeyError) as e:
+        raise click.ClickException(f"Invalid query file: {e}")
+    if not queries:
+        raise click.ClickException("No queries to evaluate")
+
+    presets = {"default": None, **{name: build_search_params(name) for name in PRESETS}}
+    try:
+        vectors = embed_queries(queries, OpenAI(api_key=openai_api_key, timeout=DEFAULT_TIMEOUT), model,
+                                make_embedding_cache(cache_kind, cache_path))
+        rows = evaluate_presets(QdrantClient(url=qdrant_url, timeout=DEFAULT_TIMEOUT), collection, vectors, top, presets,
+                                channel.removeprefix("@") if channel else None)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    if as_json:
+        click.echo(json.dumps(rows, indent=2))
+        return
+    click.echo(f"{len(queries)} dotaz(ů), recall@{top} proti přesnému hledání:\n")
+    click.echo(f"{'preset':<10} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in rows:
+        click.echo(f"{row['preset']:<10} {row['recall']:>7.3f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f}")
 
 
 @cli.command()
+@click.argument("path", type=click.Path(file_okay=False))
+@click.option("--collection", default=os.environ.get("KB_SEARCH_COLLECTION", "kb"), show_default=True, help="Qdrant collection name (env: KB_SEARCH_COLLECTION)")
 @click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
-@click.option("--openai-api-key", default=lambda: os.environ.get("OPENAI_API_KEY", ""), help="OpenAI API key (env: OPENAI_API_KEY)")
-def check(qdrant_url, openai_api_key):
-    """Check connectivity to OpenAI and Qdrant."""
-    failures = 0
+@click.option("--batch-size", default=256, show_default=True, help="Points per scroll request")
+def export(path, collection, qdrant_url, batch_size):
+    """Export a collection to an offline snapshot at PATH (for `run --offline`)."""
+    from qdrant_client import QdrantClient
 
-    # 1. OPENAI_API_KEY is set and non-empty
-    if openai_api_key:
-        click.echo("OK  OPENAI_API_KEY is set")
-    else:
-        click.echo("FAIL  OPENAI_API_KEY is not set")
-        failures += 1
+    from kb.offline import export_snapshot
 
-    # 2. OpenAI API key is valid
     try:
-        OpenAI(api_key=openai_api_key).models.list()
-        click.echo("OK  OpenAI API key is valid")
-    except Exception as e:
-        click.echo(f"FAIL  OpenAI API key is invalid: {e}")
-        failures += 1
+        count = export_snapshot(QdrantClient(url=qdrant_url, timeout=DEFAULT_TIMEOUT), collection, path, batch_size)
+    except (RuntimeError, ValueError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Exported {count} point(s) from {collection} to {path}")
+
+
+@cli.command("lexical-index")
+@click.option("--collection", default=os.environ.get("KB_SEARCH_COLLECTION", "kb"), show_default=True, help="Qdrant collection name (env: KB_SEARCH_COLLECTION)")
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
+@click.option("--path", default=None, help="BM25 index file (default: ~/.config/knowledge-vault/lexical/<collection>.sqlite)")
+@click.option("--batch-size", default=256, show_default=True, help="Points per scroll request")
+def lexical_index_cmd(collection, qdrant_url, path, batch_size):
+    """Build or incrementally refresh the local BM25 index for `run --mode lexical|hybrid`."""
+    from qdrant_client import QdrantClient
 
-    # 3. Qdrant is reachable
+    from kb.lexical import LexicalIndex, default_index_path
+
+    index = LexicalIndex(path or default_index_path(collection))
     try:
-        QdrantClient(url=qdrant_url).get_collections()
-        click.echo("OK  Qdrant is reachable")
-    except Exception as e:
-        click.echo(f"FAIL  Qdrant is not reachable: {e}")
-        failures += 1
+        counts = index.refresh(QdrantClient(url=qdrant_url, timeout=DEFAULT_TIMEOUT), collection, batch_size)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(
+        f"Indexed {collection}: {counts['added']} added, {counts['updated']} updated, "
+        f"{counts['unchanged']} unchanged, {counts['removed']} removed"
+    )
 
-    click.echo()
-    if failures == 0:
-        click.echo("All checks passed.")
+
+@cli.command("backfill-short")
+@click.option("--collection", default=os.environ.get("KB_SEARCH_COLLECTION", "kb"), show_default=True, help="Qdrant collection name (env: KB_SEARCH_COLLECTION)")
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
+@click.option("--dim", default=256, show_default=True, help="Dimensions to keep from each embedding")
+@click.option("--batch-size", default=256, show_default=True, help="Points per scroll/upsert request")
+def backfill_short(collection, qdrant_url, dim, batch_size):
+    """Write truncated Matryoshka vectors to <collection>_short for `run --two-stage`."""
+    from qdrant_client import QdrantClient
+
+    from kb.matryoshka import backfill_short_vectors, short_collection_name
+
+    try:
+        count = backfill_short_vectors(QdrantClient(url=qdrant_url, timeout=DEFAULT_TIMEOUT), collection, dim, batch_size)
+    except (RuntimeError, ValueError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Backfilled {count} point(s) from {collection} to {short_collection_name(collection)} ({dim} dims)")
+
+
+@cli.command("ensure-indexes")
+@click.option("--collection", default=os.environ.get("KB_SEARCH_COLLECTION", "kb"), show_default=True, help="Qdrant collection name (env: KB_SEARCH_COLLECTION)")
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
+@click.option("--convert-dates", is_flag=True, help='First rewrite string upload_date payloads ("20240101") as integers')
+@click.option("--batch-size", default=256, show_default=True, help="Points per scroll request for --convert-dates")
+def ensure_indexes_cmd(collection, qdrant_url, convert_dates, batch_size):
+    """Create the payload indexes used by run's channel, date and source filters."""
+    from qdrant_client import QdrantClient
+
+    from kb.filters import convert_upload_dates, ensure_indexes
+
+    qdrant_client = QdrantClient(url=qdrant_url, timeout=DEFAULT_TIMEOUT)
+    try:
+        if convert_dates:
+            converted = convert_upload_dates(qdrant_client, collection, batch_size)
+            click.echo(f"Converted upload_date of {converted} point(s) to integers")
+        created = ensure_indexes(qdrant_client, collection)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if created:
+        click.echo(f"Created payload index(es) on {', '.join(created)} in {collection}")
     else:
-        click.echo(f"{failures} check(s) failed.")
+        click.echo(f"All filter indexes already exist in {collection}")
+
+
+@cli.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on")
+@click.option("--port", default=8765, show_default=True, help="Port to listen on")
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
+@click.option("--cache", "cache_kind", type=click.Choice(["disk", "memory", "off"]), default="disk", show_default=True, help="Query-embedding cache (off bypasses it)")
+@click.option("--cache-path", default=DEFAULT_CACHE_PATH, show_default=True, help="SQLite file for the disk cache")
+@click.option("--result-ttl", default=300, show_default=True, help="Seconds a cached result list stays valid")
+@click.option("--semantic-threshold", type=float, default=None, help="Reuse the results of an earlier query whose embedding has at least this cosine similarity (e.g. 0.95); off by default")
+@click.option("--semantic-cache-path", default=DEFAULT_SEMANTIC_CACHE_PATH, show_default=True, help="File the semantic cache is loaded from and saved to on shutdown")
+@click.option("--semantic-max-entries", default=1000, show_default=True, help="Most queries kept in the semantic cache (least recently used are evicted)")
+@click.option("--batch-window-ms", default=5.0, show_default=True, help="Coalesce concurrent query embeddings arriving within this window into one request (0 disables)")
+@click.option("--max-batch", default=64, show_default=True, help="Most queries per coalesced embedding request")
+@click.option("--timeout", default=DEFAULT_TIMEOUT, show_default=True, help="Client timeout in seconds for each OpenAI / Qdrant request")
+@click.option("--deadline", type=float, default=None, help="Time budget in seconds for each search, split across embedding and Qdrant")
+@click.option("--retries", default=2, show_default=True, help="Retries with jittered backoff on timeouts, 429s and 5xx")
+@click.option("--hedge-percentile", type=float, default=None, help="Send a duplicate Qdrant search when the first is slower than this latency percentile (e.g. 95)")
+def serve(host, port, qdrant_url, cache_kind, cache_path, result_ttl, semantic_threshold, semantic_cache_path,
+          semantic_max_entries, batch_window_ms, max_batch, timeout, deadline, retries, hedge_percentile):
+    """Run a search daemon that keeps clients and caches warm.
+
+    JSON API: POST /search, GET /health, GET /stats.
+    """
+    openai_api_key = os.environ.get("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise click.ClickException("OPENAI_API_KEY environment variable is required")
+
+    from openai import OpenAI
+    from qdrant_client import QdrantClient
+
+    from kb.batching import EmbeddingBatcher
+    from kb.cache import make_embedding_cache, make_result_cache
+    from kb.resilience import Hedger, Resilience
+    from kb.semantic_cache import SemanticCache
+    from kb.server import SearchService, make_server
+
+    if deadline is not None:
+        timeout = min(timeout, deadline)
+    openai_client = OpenAI(api_key=openai_api_key, timeout=timeout)
+    if batch_window_ms > 0:
+        openai_client = EmbeddingBatcher(openai_client, window=batch_window_ms / 1000, max_batch=max_batch)
+    service = SearchService(
+        qdrant_client=QdrantClient(url=qdrant_url, timeout=timeout),
+        openai_client=openai_client,
+        qdrant_url=qdrant_url,
+        embedding_cache=make_embedding_cache(cache_kind, cache_path),
+        result_cache=make_result_cache(cache_kind, cache_path, result_ttl),
+        resilience=Resilience(
+            deadline=deadline,
+            retries=retries,
+            hedge=Hedger(hedge_percentile) if hedge_percentile is not None else None,
+        ),
+        semantic_cache=SemanticCache.load(
+            semantic_cache_path, threshold=semantic_threshold, max_entries=semantic_max_entries, max_age=result_ttl,
+        ) if semantic_threshold is not None else None,
+    )
+    server = make_server(service, host, port)
+    click.echo(f"kb-search daemon listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if service.semantic_cache is not None:
+            service.semantic_cache.save()
+
+
+@cli.command()
+@click.option("--qdrant-url", default="http://localhost:6333", show_default=True, help="Qdrant URL")
+@click.option("--openai-api-key", default=lambda: os.environ.get("OPENAI_API_KEY", ""), help="OpenAI API key (env: OPENAI_API_KEY)")
+@click.option("--indexes", is_flag=True, help="Fail when --collection lacks the payload indexes filters use")
+@click.option("--collection", default=os.environ.get("KB_SEARCH_COLLECTION", "kb"), show_default=True, help="Collection to report health for (env: KB_SEARCH_COLLECTION)")
+@click.option("--model", default="text-embedding-3-small", show_default=True, help="OpenAI embedding model to probe")
+@click.option("--samples", default=5, show_default=True, help="Embedding / Qdrant calls per latency probe")
+@click.option("--deadline", default=10.0, show_default=True, help="Seconds all probes together may take")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON (for monitoring)")
+def check(qdrant_url, openai_api_key, indexes, collection, model, samples, deadline, as_json):
+    """Diagnose OpenAI, Qdrant and the collection: connectivity, latency, health.
+
+    Probes run concurrently under --deadline.
+    """
+    from openai import OpenAI
+    from qdrant_client import QdrantClient
+
+    from kb.diagnostics import run_checks
+
+    start = time.perf_counter()
+    checks = run_checks(
+        openai_api_key=openai_api_key,
+        make_openai_client=lambda: OpenAI(api_key=openai_api_key, timeout=deadline, max_retries=0),
+        qdrant_client=QdrantClient(url=qdrant_url),
+        collection=collection,
+        model=model,
+        samples=samples,
+        deadline=deadline,
+        require_indexes=indexes,
+    )
+    failures = sum(not c["ok"] for c in checks)
+
+    if as_json:
+        click.echo(json.dumps({
+            "ok": failures == 0,
+            "failures": failures,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+            "qdrant_url": qdrant_url,
+            "collection": collection,
+            "checks": checks,
+        }))
+    else:
+        for c in checks:
+            click.echo(f"{'WARN' if c.get('warning') else 'OK' if c['ok'] else 'FAIL'}  {c['message']}")
+            if "latency" in c:
+                latency = c["latency"]
+                click.echo(f"    latence: p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, "
+                           f"max {latency['max_ms']:.1f} ms ({latency['samples']} volání)")
+            if "health" in c:
+                print_health(c["health"])
+        click.echo()
+        if failures == 0:
+            click.echo("All checks passed.")
+        else:
+            click.echo(f"{failures} check(s) failed.")
+    if failures:
         sys.exit(1)
 
 
+def print_health(health: dict) -> None:
+    """Render collection_health() for `check`."""
+    click.echo(f"    body: {health['points_count']}, indexované vektory: {health['indexed_vectors_count']}, "
+               f"segmenty: {health['segments_count']}, optimizer: {health['optimizer_status']}")
+    quantization = ", ".join(health["quantization"]) if health["quantization"] else "žádná"
+    click.echo(f"    dimenze: {health['vector_size']}, kvantizace: {quantization}")
+    indexes = ", ".join(f"{field} ({kind})" for field, kind in health["payload_indexes"].items()) or "žádné"
+    click.echo(f"    payload indexy: {indexes}")
+    if health["missing_filter_indexes"]:
+        click.echo(f"    chybí indexy pro filtry: {', '.join(health['missing_filter_indexes'])}")
+
+
 @cli.command("setup")
 @click.option("--openai-api-key", prompt="OpenAI API key", hide_input=True)
 @click.option("--qdrant-url", default="http://localhost:6333", prompt="Qdrant URL", show_default=True)
 @click.option("--collection", default="kb", prompt="Default collection name", show_default=True)
 def setup_cmd(openai_api_key, qdrant_url, collection):
     """Interactive setup wizard: validate credentials and write ~/.config/knowledge-vault/.env."""
+    import openai
+    from qdrant_client import QdrantClient
+
     # 1. Validate OpenAI key
     try:
         openai.OpenAI(api_key=openai_api_key).models.list()
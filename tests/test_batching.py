@@ -0,0 +1,175 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from kb.batching import AsyncEmbeddingBatcher, EmbeddingBatcher
+from kb.searcher import aembed_query, embed_query, search
+from kb.server import SearchService
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+def vector(text):
+    return [float(len(text)), float(sum(map(ord, text)))]
+
+
+def embed(model, input):
+    inputs = [input] if isinstance(input, str) else input
+    return SimpleNamespace(data=[SimpleNamespace(embedding=vector(text)) for text in inputs])
+
+
+def make_openai_mock():
+    mock = MagicMock()
+    mock.embeddings.create.side_effect = embed
+    return mock
+
+
+def run_concurrently(batcher, queries):
+    # All callers start together so they land in the same window
+    barrier = threading.Barrier(len(queries))
+
+    def call(query):
+        barrier.wait()
+        return embed_query(query, batcher)
+
+    with ThreadPoolExecutor(len(queries)) as pool:
+        return list(pool.map(call, queries))
+
+
+# ── threads ───────────────────────────────────────────────────────────────────
+
+class TestEmbeddingBatcher:
+    def test_coalesces_concurrent_callers(self):
+        openai_client = make_openai_mock()
+        batcher = EmbeddingBatcher(openai_client, window=0.2)
+        queries = [f"query {i}" for i in range(8)]
+        assert run_concurrently(batcher, queries) == [vector(q) for q in queries]
+        assert openai_client.embeddings.create.call_count == 1
+        assert sorted(openai_client.embeddings.create.call_args.kwargs["input"]) == sorted(queries)
+        assert batcher.stats() == {"requests": 8, "inputs": 8, "calls": 1}
+
+    def test_deduplicates_within_window(self):
+        openai_client = make_openai_mock()
+        batcher = EmbeddingBatcher(openai_client, window=0.2)
+        results = run_concurrently(batcher, ["same", "same", "same", "other"])
+        assert results == [vector("same")] * 3 + [vector("other")]
+        assert sorted(openai_client.embeddings.create.call_args.kwargs["input"]) == ["other", "same"]
+
+    def test_max_batch_splits_requests(self):
+        openai_client = make_openai_mock()
+        batcher = EmbeddingBatcher(openai_client, window=0.2, max_batch=3)
+        queries = [f"query {i}" for i in range(7)]
+        assert run_concurrently(batcher, queries) == [vector(q) for q in queries]
+        sizes = [len(c.kwargs["input"]) for c in openai_client.embeddings.create.call_args_list]
+        assert sorted(sizes) == [1, 3, 3]
+
+    def test_list_input_larger_than_max_batch(self):
+        openai_client = make_openai_mock()
+        batcher = EmbeddingBatcher(openai_client, window=0.01, max_batch=2)
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+        response = batcher.embeddings.create(model="m", input=texts)
+        assert [item.embedding for item in response.data] == [vector(t) for t in texts]
+        assert openai_client.embeddings.create.call_count == 3
+
+    def test_error_reaches_every_caller(self):
+        openai_client = MagicMock()
+        openai_client.embeddings.create.side_effect = Exception("rate limited")
+        batcher = EmbeddingBatcher(openai_client, window=0.2)
+        barrier = threading.Barrier(3)
+
+        def call(query):
+            barrier.wait()
+            with pytest.raises(RuntimeError, match="rate limited"):
+                embed_query(query, batcher)
+
+        with ThreadPoolExecutor(3) as pool:
+            list(pool.map(call, ["a", "b", "c"]))
+        assert openai_client.embeddings.create.call_count == 1
+
+    def test_short_response_fails_unanswered_callers(self):
+        openai_client = MagicMock()
+        openai_client.embeddings.create.return_value = SimpleNamespace(data=[SimpleNamespace(embedding=[1.0])])
+        batcher = EmbeddingBatcher(openai_client, window=0.0)
+        with pytest.raises(RuntimeError, match="1 vector"):
+            batcher.embeddings.create(model="m", input=["a", "b"], timeout=1)
+
+    def test_leader_request_gets_caller_timeout(self):
+        openai_client = make_openai_mock()
+        openai_client.embeddings.create.side_effect = lambda model, input, timeout=None: embed(model, input)
+        batcher = EmbeddingBatcher(openai_client, window=0.0)
+        batcher.embeddings.create(model="m", input="q", timeout=5)
+        assert 0 < openai_client.embeddings.create.call_args.kwargs["timeout"] <= 5
+
+    def test_drop_in_for_search(self):
+        qdrant = MagicMock()
+        qdrant.search.return_value = []
+        batcher = EmbeddingBatcher(make_openai_mock(), window=0.0)
+        assert search("q", qdrant, batcher, "kb", top_k=3) == []
+        assert qdrant.search.call_args.kwargs["query_vector"] == vector("q")
+
+    def test_service_stats(self):
+        batcher = EmbeddingBatcher(make_openai_mock(), window=0.0)
+        service = SearchService(MagicMock(), batcher, "http://localhost:6333")
+        embed_query("q", batcher)
+        assert service.stats()["embedding_batcher"] == {"requests": 1, "inputs": 1, "calls": 1}
+
+
+# ── asyncio ───────────────────────────────────────────────────────────────────
+
+class TestAsyncEmbeddingBatcher:
+    def make_client(self):
+        client = MagicMock()
+        client.embeddings.create = AsyncMock(side_effect=embed)
+        return client
+
+    def test_coalesces_and_deduplicates(self):
+        openai_client = self.make_client()
+        batcher = AsyncEmbeddingBatcher(openai_client, window=0.05)
+        queries = ["a", "bb", "a", "ccc"]
+
+        async def main():
+            return await asyncio.gather(*(aembed_query(q, batcher) for q in queries))
+
+        assert asyncio.run(main()) == [vector(q) for q in queries]
+        assert openai_client.embeddings.create.await_count == 1
+        assert openai_client.embeddings.create.call_args.kwargs["input"] == ["a", "bb", "ccc"]
+        assert batcher.stats() == {"requests": 4, "inputs": 3, "calls": 1}
+
+    def test_max_batch(self):
+        openai_client = self.make_client()
+        batcher = AsyncEmbeddingBatcher(openai_client, window=0.05, max_batch=2)
+
+        async def main():
+            return await asyncio.gather(*(aembed_query(str(i), batcher) for i in range(5)))
+
+        assert asyncio.run(main()) == [vector(str(i)) for i in range(5)]
+        assert openai_client.embeddings.create.await_count == 3
+
+    def test_error(self):
+        openai_client = MagicMock()
+        openai_client.embeddings.create = AsyncMock(side_effect=Exception("boom"))
+        batcher = AsyncEmbeddingBatcher(openai_client, window=0.01)
+
+        async def main():
+            return await asyncio.gather(aembed_query("a", batcher), aembed_query("b", batcher),
+                                        return_exceptions=True)
+
+        errors = asyncio.run(main())
+        assert all(isinstance(e, RuntimeError) and "boom" in str(e) for e in errors)
+
+    def test_short_response(self):
+        openai_client = MagicMock()
+        openai_client.embeddings.create = AsyncMock(return_value=SimpleNamespace(data=[SimpleNamespace(embedding=[1.0])]))
+        batcher = AsyncEmbeddingBatcher(openai_client, window=0.01)
+
+        async def main():
+            return await asyncio.wait_for(asyncio.gather(aembed_query("a", batcher), aembed_query("b", batcher),
+                                                         return_exceptions=True), 2)
+
+        first, second = asyncio.run(main())
+        assert first == [1.0]
+        assert isinstance(second, RuntimeError) and "1 vector" in str(second)
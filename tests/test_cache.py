@@ -0,0 +1,218 @@
+import time
+
+import pytest
+
+from kb.cache import (
+    DiskCache,
+    EmbeddingCache,
+    MemoryCache,
+    TieredCache,
+    decode_vector,
+    encode_vector,
+    make_embedding_cache,
+    normalize_query,
+)
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+VECTOR = [0.25, -0.5, 1.0, 0.125]
+
+
+# ── encoding / normalization ──────────────────────────────────────────────────
+
+class TestEncoding:
+    def test_vector_roundtrip(self):
+        assert decode_vector(encode_vector(VECTOR)) == pytest.approx(VECTOR)
+
+    def test_blob_is_float32(self):
+        assert len(encode_vector(VECTOR)) == 4 * len(VECTOR)
+
+    def test_normalize_collapses_whitespace(self):
+        assert normalize_query("  jak   funguje\tdopamin ") == "jak funguje dopamin"
+
+    def test_normalize_unicode_nfc(self):
+        assert normalize_query("trénink") == normalize_query("trénink")
+
+
+# ── MemoryCache ───────────────────────────────────────────────────────────────
+
+class TestMemoryCache:
+    def test_get_missing_returns_none(self):
+        assert MemoryCache().get("nope") is None
+
+    def test_put_then_get(self):
+        cache = MemoryCache()
+        cache.put("k", b"v")
+        assert cache.get("k") == b"v"
+
+    def test_evicts_least_recently_used(self):
+        cache = MemoryCache(max_entries=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.get("a")
+        cache.put("c", b"3")
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1"
+
+    def test_expires_old_entries(self, monkeypatch):
+        cache = MemoryCache(max_age=10)
+        cache.put("k", b"v")
+        real_time = time.time()
+        monkeypatch.setattr("kb.cache.time.time", lambda: real_time + 11)
+        assert cache.get("k") is None
+
+
+# ── DiskCache ─────────────────────────────────────────────────────────────────
+
+class TestDiskCache:
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        DiskCache(path).put("k", b"v")
+        assert DiskCache(path).get("k") == b"v"
+
+    def test_evicts_beyond_max_entries(self, tmp_path):
+        cache = DiskCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.put("c", b"3")
+        assert len(cache) == 2
+        assert cache.get("a") is None
+
+    def test_expires_old_entries(self, tmp_path, monkeypatch):
+        cache = DiskCache(str(tmp_path / "cache.sqlite"), max_age=10)
+        cache.put("k", b"v")
+        real_time = time.time()
+        monkeypatch.setattr("kb.cache.time.time", lambda: real_time + 11)
+        assert cache.get("k") is None
+
+    def test_recent_hit_does_not_write(self, tmp_path):
+        cache = DiskCache(str(tmp_path / "cache.sqlite"), touch_interval=60)
+        cache.put("k", b"v")
+        changes = cache._conn.total_changes
+        assert cache.get("k") == b"v"
+        assert cache._conn.total_changes == changes
+
+    def test_stale_access_time_is_refreshed(self, tmp_path):
+        cache = DiskCache(str(tmp_path / "cache.sqlite"), max_entries=2, touch_interval=0)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.get("a")
+        cache.put("c", b"3")
+        assert cache.get("a") == b"1"
+        assert cache.get("b") is None
+
+    def test_clear(self, tmp_path):
+        cache = DiskCache(str(tmp_path / "cache.sqlite"))
+        cache.put("k", b"v")
+        cache.clear()
+        assert len(cache) == 0
+
+
+# ── TieredCache ───────────────────────────────────────────────────────────────
+
+class TestTieredCache:
+    def test_hit_in_slow_tier_backfills_fast_tier(self):
+        fast, slow = MemoryCache(), MemoryCache()
+        slow.put("k", b"v")
+        assert TieredCache(fast, slow).get("k") == b"v"
+        assert fast.get("k") == b"v"
+
+
+# ── EmbeddingCache ────────────────────────────────────────────────────────────
+
+class TestEmbeddingCache:
+    def test_counts_hits_and_misses(self):
+        cache = EmbeddingCache(MemoryCache())
+        assert cache.get("m", "q") is None
+        cache.put("m", "q", VECTOR)
+        assert cache.get("m", "q") == pytest.approx(VECTOR)
+        assert cache.stats() == {"hits": 1, "misses": 1}
+
+    def test_key_includes_model(self):
+        cache = EmbeddingCache(MemoryCache())
+        cache.put("model-a", "q", VECTOR)
+        assert cache.get("model-b", "q") is None
+
+    def test_key_uses_normalized_query(self):
+        cache = EmbeddingCache(MemoryCache())
+        cache.put("m", "jak funguje  dopamin", VECTOR)
+        assert cache.get("m", " jak funguje dopamin") is not None
+
+    def test_make_off_returns_none(self):
+        assert make_embedding_cache("off") is None
+
+    def test_make_disk_uses_path(self, tmp_path):
+        path = tmp_path / "cache.sqlite"
+        make_embedding_cache("disk", str(path)).put("m", "q", VECTOR)
+        assert path.exists()
+
+
+# ── ResultCache ───────────────────────────────────────────────────────────────
+
+RESULTS = [{"id": 1, "score": 0.9, "payload": {"title": "T"}}]
+
+
+def make_qdrant(points_count=10):
+    from unittest.mock import MagicMock
+    qdrant = MagicMock()
+    qdrant.get_collection.return_value.points_count = points_count
+    return qdrant
+
+
+class TestResultCache:
+    def make(self, tmp_path, **kwargs):
+        from kb.cache import ResultCache
+        return ResultCache(MemoryCache(), version_dir=str(tmp_path / "versions"), **kwargs)
+
+    def test_hit_for_same_version(self, tmp_path):
+        cache = self.make(tmp_path)
+        cache.put("k", "v1", RESULTS)
+        assert cache.get("k", "v1") == RESULTS
+        assert cache.stats() == {"hits": 1, "misses": 0}
+
+    def test_miss_after_version_change(self, tmp_path):
+        cache = self.make(tmp_path)
+        cache.put("k", "v1", RESULTS)
+        assert cache.get("k", "v2") is None
+
+    def test_key_depends_on_inputs(self):
+        from kb.cache import ResultCache
+        base = ResultCache.key("m", "q", "kb", None, 5, True)
+        assert base == ResultCache.key("m", " q ", "kb", None, 5, True)
+        assert base != ResultCache.key("m", "q", "kb", "chan", 5, True)
+        assert base != ResultCache.key("m", "q", "kb", None, 6, True)
+        assert base != ResultCache.key("m", "q", "other", None, 5, True)
+
+    def test_version_from_point_count(self, tmp_path):
+        assert self.make(tmp_path).collection_version(make_qdrant(42), "kb") == "points:42"
+
+    def test_version_check_is_throttled(self, tmp_path):
+        cache = self.make(tmp_path, version_check_interval=60)
+        qdrant = make_qdrant()
+        cache.collection_version(qdrant, "kb")
+        cache.collection_version(qdrant, "kb")
+        qdrant.get_collection.assert_called_once()
+
+    def test_version_rechecked_after_interval(self, tmp_path):
+        cache = self.make(tmp_path, version_check_interval=0)
+        qdrant = make_qdrant()
+        cache.collection_version(qdrant, "kb")
+        qdrant.get_collection.return_value.points_count = 11
+        assert cache.collection_version(qdrant, "kb") == "points:11"
+
+    def test_marker_file_takes_precedence(self, tmp_path):
+        cache = self.make(tmp_path)
+        (tmp_path / "versions").mkdir()
+        (tmp_path / "versions" / "kb").write_text("2024-06-01T12:00\n")
+        qdrant = make_qdrant()
+        assert cache.collection_version(qdrant, "kb") == "marker:2024-06-01T12:00"
+        qdrant.get_collection.assert_not_called()
+
+    def test_ttl_via_store(self, tmp_path, monkeypatch):
+        from kb.cache import make_result_cache
+        cache = make_result_cache("memory", ttl=10)
+        cache.put("k", "v", RESULTS)
+        real_time = time.time()
+        monkeypatch.setattr("kb.cache.time.time", lambda: real_time + 11)
+        assert cache.get("k", "v") is None
@@ -1,7 +1,25 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
 import pytest
 from unittest.mock import MagicMock, patch
 from click.testing import CliRunner
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance,
+    PayloadIndexInfo,
+    PointStruct,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+)
 
+from kb.diagnostics import measure
+from kb.filters import FILTER_INDEXES
 from search import cli
 
 
@@ -16,24 +34,24 @@ def invoke_check(*args, env=None, **kwargs):
 
 class TestCheckOpenAIKey:
     def test_key_set_prints_ok(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": "sk-test"})
         assert "OK  OPENAI_API_KEY is set" in result.output
 
     def test_key_missing_prints_fail(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.side_effect = Exception("auth error")
             mock_qdrant.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": ""})
         assert "FAIL  OPENAI_API_KEY is not set" in result.output
 
     def test_key_missing_increments_failures(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.side_effect = Exception("auth error")
             mock_qdrant.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": ""})
@@ -44,24 +62,24 @@ class TestCheckOpenAIKey:
 
 class TestCheckOpenAIValidity:
     def test_valid_key_prints_ok(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": "sk-valid"})
         assert "OK  OpenAI API key is valid" in result.output
 
     def test_invalid_key_prints_fail(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.side_effect = Exception("Invalid API key")
             mock_qdrant.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": "sk-bad"})
         assert "FAIL  OpenAI API key is invalid" in result.output
 
     def test_invalid_key_includes_error_message(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.side_effect = Exception("Invalid API key")
             mock_qdrant.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": "sk-bad"})
@@ -72,32 +90,32 @@ class TestCheckOpenAIValidity:
 
 class TestCheckQdrant:
     def test_reachable_prints_ok(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": "sk-valid"})
         assert "OK  Qdrant is reachable" in result.output
 
     def test_unreachable_prints_fail(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant.return_value.get_collections.side_effect = Exception("Connection refused")
             result = invoke_check(env={"OPENAI_API_KEY": "sk-valid"})
         assert "FAIL  Qdrant is not reachable" in result.output
 
     def test_unreachable_includes_error_message(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant.return_value.get_collections.side_effect = Exception("Connection refused")
             result = invoke_check(env={"OPENAI_API_KEY": "sk-valid"})
         assert "Connection refused" in result.output
 
     def test_custom_qdrant_url_is_used(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant_cls:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant_cls.return_value.get_collections.return_value = MagicMock()
             result = invoke_check("--qdrant-url", "http://myhost:9999",
@@ -105,8 +123,8 @@ class TestCheckQdrant:
         mock_qdrant_cls.assert_called_once_with(url="http://myhost:9999")
 
     def test_default_qdrant_url_is_localhost(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant_cls:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant_cls.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": "sk-valid"})
@@ -117,33 +135,157 @@ class TestCheckQdrant:
 
 class TestCheckSummary:
     def test_all_pass_prints_all_checks_passed(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": "sk-valid"})
         assert "All checks passed." in result.output
 
     def test_one_failure_prints_correct_count(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant.return_value.get_collections.side_effect = Exception("down")
             result = invoke_check(env={"OPENAI_API_KEY": "sk-valid"})
         assert "1 check(s) failed." in result.output
 
     def test_multiple_failures_prints_correct_count(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.side_effect = Exception("bad key")
             mock_qdrant.return_value.get_collections.side_effect = Exception("down")
             result = invoke_check(env={"OPENAI_API_KEY": ""})
         assert "3 check(s) failed." in result.output
 
     def test_exit_code_zero_on_all_pass(self):
-        with patch("search.OpenAI") as mock_openai, \
-             patch("search.QdrantClient") as mock_qdrant:
+        with patch("openai.OpenAI") as mock_openai, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant:
             mock_openai.return_value.models.list.return_value = MagicMock()
             mock_qdrant.return_value.get_collections.return_value = MagicMock()
             result = invoke_check(env={"OPENAI_API_KEY": "sk-valid"})
         assert result.exit_code == 0
+
+
+# ── latency probes ────────────────────────────────────────────────────────────
+
+def make_collection_client(quantized=False, indexes=None):
+    client = QdrantClient(":memory:")
+    client.create_collection("kb", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    client.upsert("kb", points=[PointStruct(id=i, vector=[0.1 * i, 0.2, 0.3, 0.4]) for i in range(3)])
+    info = client.get_collection("kb")
+    # Local mode keeps neither quantization nor payload indexes
+    update = {"payload_schema": {field: PayloadIndexInfo(data_type=kind, points=3)
+                                 for field, kind in (indexes or {}).items()}}
+    if quantized:
+        update["config"] = info.config.model_copy(update={"quantization_config": ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8)
+        )})
+    client.get_collection = MagicMock(return_value=info.model_copy(update=update))
+    return client
+
+
+def invoke_diagnostics(*args, qdrant_client=None, models_effect=None):
+    with patch("openai.OpenAI") as mock_openai, \
+         patch("qdrant_client.QdrantClient", return_value=qdrant_client or make_collection_client()):
+        mock_openai.return_value.models.list.side_effect = models_effect
+        result = invoke_check(*args, env={"OPENAI_API_KEY": "sk-valid", "KB_SEARCH_COLLECTION": "kb"})
+    return result, mock_openai
+
+
+class TestCheckDiagnostics:
+    def test_reports_latency_percentiles(self):
+        result, mock_openai = invoke_diagnostics("--samples", "3")
+        assert result.exit_code == 0, result.output
+        assert result.output.count("latence: p50") == 2
+        assert "(3 volání)" in result.output
+        assert mock_openai.return_value.embeddings.create.call_count == 3
+
+    def test_reports_collection_health(self):
+        client = make_collection_client(quantized=True, indexes={"channel_slug": FILTER_INDEXES["channel_slug"]})
+        result, _ = invoke_diagnostics("--collection", "kb", qdrant_client=client)
+        assert "OK  kb is green" in result.output
+        assert "body: 3" in result.output
+        assert "segmenty: 1" in result.output
+        assert "kvantizace: scalar" in result.output
+        assert "payload indexy: channel_slug (keyword)" in result.output
+        assert "chybí indexy pro filtry: source_type, transcript_source, upload_date" in result.output
+
+    def test_missing_collection_warns(self):
+        result, _ = invoke_diagnostics("--collection", "nope", qdrant_client=QdrantClient(":memory:"))
+        assert result.exit_code == 0, result.output
+        assert "WARN  Failed to read collection nope" in result.output
+        assert "All checks passed." in result.output
+
+    def test_missing_collection_fails_with_indexes(self):
+        result, _ = invoke_diagnostics("--collection", "nope", "--indexes", qdrant_client=QdrantClient(":memory:"))
+        assert result.exit_code == 1
+        assert "FAIL  Failed to read collection nope" in result.output
+
+    def test_json_report(self):
+        result, _ = invoke_diagnostics("--json", "--samples", "2", qdrant_client=make_collection_client(quantized=True))
+        report = json.loads(result.output)
+        assert report["ok"] is True and report["failures"] == 0
+        checks = {c["name"]: c for c in report["checks"]}
+        assert list(checks) == ["openai_key", "openai", "qdrant", "collection"]
+        assert checks["qdrant"]["latency"]["samples"] == 2
+        health = checks["collection"]["health"]
+        assert health["points_count"] == 3 and health["vector_size"] == 4
+        assert health["optimizer_status"] == "ok"
+        assert health["quantization"]["scalar"]["type"] == "int8"
+
+    def test_json_failure_exits_non_zero(self):
+        result, _ = invoke_diagnostics("--json", models_effect=Exception("bad key"))
+        assert result.exit_code == 1
+        report = json.loads(result.output)
+        assert report["failures"] == 1
+        assert "bad key" in report["checks"][1]["message"]
+
+    def test_probes_run_concurrently_under_deadline(self):
+        client = make_collection_client()
+        client.get_collections = MagicMock(side_effect=lambda: time.sleep(0.3))
+        start = time.perf_counter()
+        result, mock_openai = invoke_diagnostics("--samples", "1", "--deadline", "0.5", qdrant_client=client,
+                                                 models_effect=lambda **kwargs: time.sleep(0.3))
+        elapsed = time.perf_counter() - start
+        assert result.exit_code == 0, result.output
+        # Run one after another the two probes would take 0.6s
+        assert elapsed < 0.55
+
+    def test_stuck_probe_times_out(self):
+        client = make_collection_client()
+        client.get_collections = MagicMock(side_effect=lambda: time.sleep(2))
+        start = time.perf_counter()
+        result, _ = invoke_diagnostics("--deadline", "0.2", qdrant_client=client)
+        assert time.perf_counter() - start < 1.5
+        assert result.exit_code == 1
+        assert "FAIL  qdrant probe timed out after 0.2s" in result.output
+
+    def test_samples_stop_at_deadline(self):
+        timeouts = []
+
+        def call(timeout):
+            timeouts.append(timeout)
+            time.sleep(0.1)
+
+        latency = measure(call, samples=20, expires_at=time.monotonic() + 0.25)
+        assert latency["samples"] == len(timeouts) == 3
+        # Each call only gets what is left of the shared deadline
+        assert timeouts == sorted(timeouts, reverse=True) and timeouts[0] <= 0.25
+
+    def test_stuck_probes_do_not_delay_exit(self):
+        script = (
+            "import time\n"
+            "from unittest.mock import MagicMock\n"
+            "from kb.diagnostics import run_checks\n"
+            "qdrant = MagicMock()\n"
+            "qdrant.get_collections.side_effect = lambda: time.sleep(3)\n"
+            "qdrant.get_collection.side_effect = lambda name: time.sleep(3)\n"
+            "checks = run_checks('sk', MagicMock, qdrant, 'kb', samples=3, deadline=0.5)\n"
+            "print(sum(not c['ok'] for c in checks))\n"
+        )
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              capture_output=True, text=True, check=True, timeout=30)
+        assert time.perf_counter() - start < 2.5
+        assert proc.stdout.strip() == "2"
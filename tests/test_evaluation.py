@@ -0,0 +1,91 @@
+import json
+import random
+
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, SearchParams, VectorParams
+
+from kb.evaluation import evaluate_presets, percentile
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+DIM = 8
+
+
+def make_collection(points=200):
+    rng = random.Random(7)
+    client = QdrantClient(":memory:")
+    client.create_collection("kb", vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    client.upsert("kb", points=[
+        PointStruct(id=i, vector=[rng.uniform(-1, 1) for _ in range(DIM)],
+                    payload={"channel_slug": "a" if i % 2 else "b"})
+        for i in range(points)
+    ])
+    return client
+
+
+def query_vectors(n=5):
+    rng = random.Random(3)
+    return [[rng.uniform(-1, 1) for _ in range(DIM)] for _ in range(n)]
+
+
+# ── evaluate_presets ──────────────────────────────────────────────────────────
+
+class TestEvaluatePresets:
+    def test_exact_preset_has_full_recall(self):
+        rows = evaluate_presets(make_collection(), "kb", query_vectors(), 10,
+                                {"exact": SearchParams(exact=True), "default": None})
+        assert [r["preset"] for r in rows] == ["exact", "default"]
+        assert rows[0]["recall"] == pytest.approx(1.0)
+        assert 0.0 <= rows[1]["recall"] <= 1.0
+        assert rows[0]["p95_ms"] >= rows[0]["p50_ms"] >= 0
+
+    def test_channel_filter(self):
+        rows = evaluate_presets(make_collection(), "kb", query_vectors(), 5, {"default": None}, channel_slug="a")
+        assert rows[0]["recall"] == pytest.approx(1.0)
+
+    def test_qdrant_failure_raises_runtime_error(self):
+        qdrant = MagicMock()
+        qdrant.search.side_effect = Exception("down")
+        with pytest.raises(RuntimeError, match="Failed to search Qdrant"):
+            evaluate_presets(qdrant, "kb", query_vectors(1), 5, {"default": None})
+
+    def test_percentile(self):
+        assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+        assert percentile([1.0, 2.0], 0.99) == 2.0
+
+
+# ── eval-presets command ──────────────────────────────────────────────────────
+
+class TestEvalPresetsCommand:
+    def invoke(self, *args, input="q1\nq2\n"):
+        client = make_collection()
+        vectors = query_vectors(2)
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient", return_value=client):
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(
+                data=[MagicMock(embedding=v) for v in vectors]
+            )
+            return CliRunner().invoke(cli, ["eval-presets", "--cache", "off", *args], input=input,
+                                      env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+
+    def test_table(self):
+        result = self.invoke("--top", "5")
+        assert result.exit_code == 0, result.output
+        assert "recall@5" in result.output
+        for name in ("default", "fast", "balanced", "accurate"):
+            assert name in result.output
+
+    def test_json(self):
+        result = self.invoke("--json")
+        rows = json.loads(result.output)
+        assert [r["preset"] for r in rows] == ["default", "fast", "balanced", "accurate"]
+
+    def test_empty_query_file(self):
+        result = self.invoke(input="")
+        assert result.exit_code != 0
+        assert "No queries" in result.output
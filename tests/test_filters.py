@@ -0,0 +1,175 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PayloadSchemaType, PointStruct, VectorParams
+
+from kb.filters import PayloadFilter, convert_upload_dates, ensure_indexes, missing_indexes, parse_date
+from kb.searcher import build_filter, search
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+POINTS = [
+    # id, channel, upload_date, source_type, transcript_source
+    (1, "alpha", 20230105, "youtube", "caption"),
+    (2, "beta", 20230610, "youtube", "whisper"),
+    (3, "gamma", 20240101, "podcast", "whisper"),
+    (4, "alpha", 20240315, "podcast", "caption"),
+]
+
+
+def make_collection(date_as_string=False):
+    client = QdrantClient(":memory:")
+    client.create_collection("kb", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("kb", points=[
+        PointStruct(id=i, vector=[1.0, i / 10], payload={
+            "channel_slug": channel,
+            "upload_date": str(day) if date_as_string else day,
+            "source_type": source,
+            "transcript_source": transcript,
+        })
+        for i, channel, day, source, transcript in POINTS
+    ])
+    return client
+
+
+def make_openai_mock():
+    mock = MagicMock()
+    mock.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[1.0, 0.0])])
+    return mock
+
+
+def ids(payload_filter, channel_slug=None, client=None):
+    results = search("q", client or make_collection(), make_openai_mock(), "kb", top_k=10,
+                     channel_slug=channel_slug, payload_filter=payload_filter)
+    return sorted(r["id"] for r in results)
+
+
+def schema_entry(kind):
+    return MagicMock(data_type=kind)
+
+
+# ── parse_date ────────────────────────────────────────────────────────────────
+
+class TestParseDate:
+    def test_formats(self):
+        assert parse_date("2024-03-15") == 20240315
+        assert parse_date("20240315") == 20240315
+
+    @pytest.mark.parametrize("value", ["2024-13-01", "2024-3-1", "yesterday"])
+    def test_invalid(self, value):
+        with pytest.raises(ValueError, match="Invalid date"):
+            parse_date(value)
+
+
+# ── filtering ─────────────────────────────────────────────────────────────────
+
+class TestPayloadFilter:
+    def test_no_conditions_builds_no_filter(self):
+        assert build_filter(None, PayloadFilter()) is None
+
+    def test_several_channels(self):
+        assert ids(PayloadFilter(channels=("alpha", "gamma"))) == [1, 3, 4]
+
+    def test_date_range_inclusive(self):
+        assert ids(PayloadFilter(date_from=20230610, date_to=20240101)) == [2, 3]
+
+    def test_open_date_range(self):
+        assert ids(PayloadFilter(date_from=20240101)) == [3, 4]
+
+    def test_source_and_transcript(self):
+        assert ids(PayloadFilter(source_types=("podcast",), transcript_sources=("caption",))) == [4]
+
+    def test_combined_with_channel_slug(self):
+        assert ids(PayloadFilter(source_types=("youtube", "podcast")), channel_slug="alpha") == [1, 4]
+
+    def test_dict_round_trip(self):
+        payload_filter = PayloadFilter(channels=("a", "b"), date_to=20240101)
+        assert PayloadFilter.from_dict(payload_filter.as_dict()) == payload_filter
+
+
+# ── indexes ───────────────────────────────────────────────────────────────────
+
+class TestEnsureIndexes:
+    def test_creates_only_missing_indexes(self):
+        qdrant = MagicMock()
+        qdrant.get_collection.return_value.payload_schema = {
+            "channel_slug": schema_entry(PayloadSchemaType.KEYWORD),
+            "upload_date": schema_entry(PayloadSchemaType.KEYWORD),  # wrong type
+        }
+        assert ensure_indexes(qdrant, "kb") == ["source_type", "transcript_source", "upload_date"]
+        created = {c.kwargs["field_name"]: c.kwargs["field_schema"] for c in qdrant.create_payload_index.call_args_list}
+        assert created["upload_date"] == PayloadSchemaType.INTEGER
+        assert created["source_type"] == PayloadSchemaType.KEYWORD
+
+    def test_nothing_missing(self):
+        from kb.filters import FILTER_INDEXES
+        qdrant = MagicMock()
+        qdrant.get_collection.return_value.payload_schema = {f: schema_entry(k) for f, k in FILTER_INDEXES.items()}
+        assert missing_indexes(qdrant, "kb") == {}
+        assert ensure_indexes(qdrant, "kb") == []
+        qdrant.create_payload_index.assert_not_called()
+
+    def test_failure_raises_runtime_error(self):
+        qdrant = MagicMock()
+        qdrant.get_collection.side_effect = Exception("down")
+        with pytest.raises(RuntimeError, match="Failed to read collection"):
+            ensure_indexes(qdrant, "kb")
+
+
+class TestConvertUploadDates:
+    def test_string_dates_become_integers(self):
+        client = make_collection(date_as_string=True)
+        assert ids(PayloadFilter(date_from=20240101), client=client) == []
+        assert convert_upload_dates(client, "kb", batch_size=3) == 4
+        assert ids(PayloadFilter(date_from=20240101), client=client) == [3, 4]
+        assert convert_upload_dates(client, "kb") == 0
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+class TestCli:
+    def invoke_run(self, *args):
+        client = make_collection()
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient", return_value=client):
+            mock_openai_cls.return_value.embeddings.create.return_value = make_openai_mock().embeddings.create.return_value
+            return CliRunner(mix_stderr=False).invoke(
+                cli, ["run", "q", "--cache", "off", "--format", "ndjson", "--fields", "all", *args],
+                env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": "http://127.0.0.1:9"},
+                catch_exceptions=False,
+            )
+
+    def test_run_with_filters(self):
+        import json
+        result = self.invoke_run("--channel", "@alpha", "--channel", "beta", "--date-from", "2023-06-01",
+                                 "--transcript-source", "whisper")
+        assert result.exit_code == 0, result.output
+        assert [json.loads(l)["id"] for l in result.stdout.splitlines()] == [2]
+
+    def test_invalid_date(self):
+        result = self.invoke_run("--date-to", "2024-02-30")
+        assert result.exit_code != 0
+        assert "Invalid date" in result.stderr
+
+    def test_filters_need_vector_mode(self):
+        result = self.invoke_run("--source-type", "youtube", "--mode", "lexical")
+        assert result.exit_code != 0
+        assert "--mode vector" in result.stderr
+
+    def test_ensure_indexes_command(self):
+        with patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+            mock_qdrant_cls.return_value.get_collection.return_value.payload_schema = {}
+            result = CliRunner().invoke(cli, ["ensure-indexes", "--collection", "kb"], catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert "Created payload index(es) on channel_slug, source_type, transcript_source, upload_date in kb" in result.output
+
+    def test_check_reports_missing_indexes(self):
+        with patch("openai.OpenAI"), patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+            mock_qdrant_cls.return_value.get_collection.return_value.payload_schema = {}
+            result = CliRunner().invoke(cli, ["check", "--indexes", "--collection", "kb"],
+                                        env={"OPENAI_API_KEY": "sk-test"})
+        assert result.exit_code == 1
+        assert "FAIL  kb lacks payload indexes on channel_slug" in result.output
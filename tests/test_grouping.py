@@ -0,0 +1,204 @@
+import json
+import random
+
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from kb.grouping import expand_context, search_grouped, with_context_fields
+from kb.resilience import Resilience
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+DIM = 8
+VIDEOS = ["v0", "v1", "v2", "v3"]
+CHUNKS = 6
+
+
+def make_collection():
+    rng = random.Random(7)
+    client = QdrantClient(":memory:")
+    client.create_collection("kb", vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    client.upsert("kb", points=[
+        PointStruct(id=v * CHUNKS + c, vector=[rng.gauss(0, 1) for _ in range(DIM)], payload={
+            "title": f"Video {video}",
+            "video_id": video,
+            "chunk_index": c,
+            "text": f"{video}-{c}",
+            "timestamp_url": f"https://youtube.com/watch?v={video}&t={c * 30}s",
+        })
+        for v, video in enumerate(VIDEOS)
+        for c in range(CHUNKS)
+    ])
+    return client
+
+
+def make_openai_mock(vector):
+    mock = MagicMock()
+    mock.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=vector)])
+    return mock
+
+
+def query_vector(client, point_id):
+    return client.retrieve("kb", [point_id], with_vectors=True)[0].vector
+
+
+def flaky(error, fn):
+    # Raises error on the first call, then delegates to fn
+    calls = []
+
+    def call(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise error
+        return fn(**kwargs)
+
+    return call
+
+
+def invoke_run(client, *args):
+    vector = query_vector(client, 8)
+    with patch("openai.OpenAI") as mock_openai_cls, \
+         patch("qdrant_client.QdrantClient", return_value=client):
+        mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=vector)])
+        return CliRunner().invoke(cli, ["run", "q", "--collection", "kb", "--cache", "off", *args],
+                                  env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": "http://127.0.0.1:9"},
+                                  catch_exceptions=False)
+
+
+# ── grouped search ────────────────────────────────────────────────────────────
+
+class TestSearchGrouped:
+    def test_one_result_per_video(self):
+        client = make_collection()
+        results = search_grouped("q", client, make_openai_mock(query_vector(client, 8)), "kb", top_k=3)
+        assert len(results) == 3
+        assert len({r["group"] for r in results}) == 3
+        assert results[0]["id"] == 8 and results[0]["group"] == "v1"
+        assert all(r["payload"]["video_id"] == r["group"] and r["more"] == [] for r in results)
+
+    def test_group_size_returns_more_hits(self):
+        client = make_collection()
+        results = search_grouped("q", client, make_openai_mock(query_vector(client, 8)), "kb", top_k=2,
+                                 group_size=3)
+        for result in results:
+            assert len(result["more"]) == 2
+            assert all(hit["payload"]["video_id"] == result["group"] for hit in result["more"])
+            assert all(hit["score"] <= result["score"] for hit in result["more"])
+
+    def test_resilience_retries_with_deadline_timeout(self):
+        client = make_collection()
+        search_groups = client.search_groups
+        client.search_groups = MagicMock(side_effect=flaky(TimeoutError("slow"), search_groups))
+        resilience = Resilience(deadline=5, sleep=lambda seconds: None)
+        results = search_grouped("q", client, make_openai_mock(query_vector(client, 8)), "kb", top_k=3,
+                                 resilience=resilience)
+        assert len(results) == 3
+        assert resilience.retried == 1
+        assert 1 <= client.search_groups.call_args.kwargs["timeout"] <= 5
+
+    def test_error_is_runtime_error(self):
+        qdrant = MagicMock()
+        qdrant.search_groups.side_effect = Exception("boom")
+        with pytest.raises(RuntimeError, match="Failed to search Qdrant"):
+            search_grouped("q", qdrant, make_openai_mock([0.1] * DIM), "kb", top_k=3)
+
+
+# ── context ───────────────────────────────────────────────────────────────────
+
+class TestExpandContext:
+    def test_stitches_neighbours(self):
+        client = make_collection()
+        results = [
+            {"id": 8, "score": 0.9, "payload": {"video_id": "v1", "chunk_index": 2}},
+            {"id": 0, "score": 0.8, "payload": {"video_id": "v0", "chunk_index": 0}},
+            {"id": 99, "score": 0.7, "payload": {"title": "no chunk info"}},
+        ]
+        expanded = expand_context(client, "kb", results, window=1)
+        assert expanded[0]["context"] == "v1-1 v1-2 v1-3"
+        assert expanded[1]["context"] == "v0-0 v0-1"
+        assert "context" not in expanded[2]
+
+    def test_fetches_all_neighbours_in_one_scroll(self):
+        client = make_collection()
+        results = [
+            {"id": 8, "score": 0.9, "payload": {"video_id": "v1", "chunk_index": 2}},
+            {"id": 20, "score": 0.8, "payload": {"video_id": "v3", "chunk_index": 2}},
+        ]
+        with patch.object(client, "scroll", wraps=client.scroll) as scroll:
+            expanded = expand_context(client, "kb", results, window=2)
+        assert scroll.call_count == 1
+        assert expanded[1]["context"] == "v3-0 v3-1 v3-2 v3-3 v3-4"
+
+    def test_zero_window_is_noop(self):
+        results = [{"id": 1, "score": 0.5, "payload": {"video_id": "v0", "chunk_index": 1}}]
+        assert expand_context(MagicMock(), "kb", results, window=0) == results
+
+
+class TestWithContextFields:
+    @pytest.mark.parametrize("spec, expected", [
+        (None, None),
+        ("all", "all"),
+        ("none", "video_id,chunk_index"),
+        ("title,text", "title,text,video_id,chunk_index"),
+        ("title,video_id", "title,video_id,chunk_index"),
+        ("-text,-video_id", "-text"),
+    ])
+    def test_specs(self, spec, expected):
+        assert with_context_fields(spec) == expected
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+class TestCli:
+    def test_group_by_text(self):
+        result = invoke_run(make_collection(), "--group-by", "video_id", "--group-size", "2", "--top", "2")
+        assert result.exit_code == 0, result.output
+        assert "#1 [" in result.output and "#2 [" in result.output and "#3 [" not in result.output
+        assert result.output.count("   + [") == 2
+
+    def test_context_ndjson(self):
+        result = invoke_run(make_collection(), "--context", "1", "--top", "1", "--format", "ndjson",
+                            "--fields", "title,text")
+        assert result.exit_code == 0, result.output
+        record = json.loads(result.output)
+        assert record["id"] == 8
+        assert record["context"] == "v1-1 v1-2 v1-3"
+
+    def test_group_by_with_context(self):
+        result = invoke_run(make_collection(), "--group-by", "video_id", "--context", "1", "--top", "1")
+        assert result.exit_code == 0, result.output
+        assert "v1-1 v1-2 v1-3" in result.output
+
+    def test_group_by_honours_deadline_and_retries(self):
+        client = make_collection()
+        client.search_groups = MagicMock(side_effect=flaky(TimeoutError("slow"), client.search_groups))
+        result = invoke_run(client, "--group-by", "video_id", "--deadline", "5")
+        assert result.exit_code == 0, result.output
+        assert client.search_groups.call_count == 2
+        assert "timeout" in client.search_groups.call_args.kwargs
+
+    def test_group_by_without_retries_fails(self):
+        client = make_collection()
+        client.search_groups = MagicMock(side_effect=flaky(TimeoutError("slow"), client.search_groups))
+        with patch("openai.OpenAI"), patch("qdrant_client.QdrantClient", return_value=client):
+            result = CliRunner().invoke(cli, ["run", "q", "--collection", "kb", "--cache", "off", "--group-by",
+                                              "video_id", "--retries", "0"],
+                                        env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": "http://127.0.0.1:9"})
+        assert result.exit_code == 1
+        assert "slow" in result.output
+
+    @pytest.mark.parametrize("args", [
+        ["--group-by", "video_id", "--two-stage"],
+        ["--group-by", "video_id", "--mode", "lexical"],
+        ["--group-by", "video_id", "--offset", "5"],
+        ["--context", "1", "--collection", "a", "--collection", "b"],
+    ])
+    def test_rejects_unsupported_combinations(self, args):
+        result = CliRunner().invoke(cli, ["run", "q", *args])
+        assert result.exit_code != 0
+        assert "--group-by" in result.output or "--context" in result.output
@@ -0,0 +1,180 @@
+import json
+
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from kb.lexical import LexicalIndex, reciprocal_rank_fusion, tokenize
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+DOCS = {
+    1: {"title": "Dopamin a motivace", "text": "Jak funguje dopamin v mozku", "channel_slug": "huberman"},
+    2: {"title": "Tréninková periodizace", "text": "Periodizace tréninku pro běžce", "channel_slug": "magness"},
+    3: {"title": "Spánek", "text": "Spánek, dopamin a regenerace po tréninku", "channel_slug": "huberman"},
+    4: {"title": "Produkt XR-200", "text": "Recenze produktu XR-200 a srovnání", "channel_slug": "magness"},
+}
+
+
+def make_collection(docs=DOCS):
+    client = QdrantClient(":memory:")
+    client.create_collection("kb", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    client.upsert("kb", points=[
+        PointStruct(id=i, vector=[1.0, 0.0, 0.0, float(i)], payload=payload) for i, payload in docs.items()
+    ])
+    return client
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LexicalIndex(str(tmp_path / "kb.sqlite"))
+    index.refresh(make_collection(), "kb", batch_size=2)
+    return index
+
+
+# ── tokenize ──────────────────────────────────────────────────────────────────
+
+class TestTokenize:
+    def test_folds_case_and_diacritics(self):
+        assert tokenize("Tréninková PERIODIZACE") == ["treninkova", "periodizace"]
+
+    def test_splits_on_punctuation(self):
+        assert tokenize("XR-200, spánek!") == ["xr", "200", "spanek"]
+
+
+# ── refresh ───────────────────────────────────────────────────────────────────
+
+class TestRefresh:
+    def test_initial_build_adds_all(self, tmp_path):
+        index = LexicalIndex(str(tmp_path / "kb.sqlite"))
+        counts = index.refresh(make_collection(), "kb", batch_size=3)
+        assert counts["added"] == 4
+        assert len(index) == 4
+
+    def test_second_refresh_is_incremental(self, index):
+        counts = index.refresh(make_collection(), "kb")
+        assert counts == {"added": 0, "updated": 0, "unchanged": 4, "removed": 0}
+
+    def test_changed_and_deleted_documents(self, index):
+        docs = {k: v for k, v in DOCS.items() if k != 4}
+        docs[1] = {**DOCS[1], "text": "Serotonin místo dopaminu"}
+        counts = index.refresh(make_collection(docs), "kb")
+        assert counts == {"added": 0, "updated": 1, "unchanged": 2, "removed": 1}
+        assert index.search("XR-200", top_k=5) == []
+        assert [r["id"] for r in index.search("serotonin", top_k=5)] == [1]
+
+    def test_scroll_failure_raises_runtime_error(self, tmp_path):
+        qdrant = MagicMock()
+        qdrant.scroll.side_effect = Exception("down")
+        with pytest.raises(RuntimeError, match="Failed to scroll Qdrant"):
+            LexicalIndex(str(tmp_path / "kb.sqlite")).refresh(qdrant, "kb")
+
+
+# ── search ────────────────────────────────────────────────────────────────────
+
+class TestLexicalSearch:
+    def test_ranks_matching_documents(self, index):
+        results = index.search("dopamin", top_k=5)
+        assert {r["id"] for r in results} == {1, 3}
+        assert results[0]["score"] >= results[1]["score"]
+
+    def test_exact_product_code(self, index):
+        assert index.search("XR-200", top_k=5)[0]["id"] == 4
+
+    def test_diacritics_insensitive(self, index):
+        assert index.search("spanek", top_k=5)[0]["id"] == 3
+
+    def test_channel_filter(self, index):
+        results = index.search("dopamin", top_k=5, channel_slug="huberman")
+        assert all(r["payload"]["channel_slug"] == "huberman" for r in results)
+        assert index.search("periodizace", top_k=5, channel_slug="huberman") == []
+
+    def test_quoted_phrase_must_match(self, index):
+        assert [r["id"] for r in index.search('"funguje dopamin"', top_k=5)] == [1]
+
+    def test_payload_projection(self, index):
+        assert list(index.search("dopamin", top_k=1, with_payload=["title"])[0]["payload"]) == ["title"]
+
+    def test_no_match_returns_empty(self, index):
+        assert index.search("kvantová fyzika", top_k=5) == []
+
+
+# ── fusion ────────────────────────────────────────────────────────────────────
+
+class TestReciprocalRankFusion:
+    def test_documents_in_both_lists_rank_first(self):
+        vector = [{"id": "a", "score": 0.9, "payload": {}}, {"id": "b", "score": 0.8, "payload": {}}]
+        lexical = [{"id": "b", "score": 12.0, "payload": {}}, {"id": "c", "score": 3.0, "payload": {}}]
+        fused = reciprocal_rank_fusion([vector, lexical], top_k=3)
+        assert [r["id"] for r in fused] == ["b", "a", "c"]
+        assert fused[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+
+    def test_truncates_to_top_k(self):
+        results = [{"id": i, "score": 1.0, "payload": {}} for i in range(10)]
+        assert len(reciprocal_rank_fusion([results], top_k=3)) == 3
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+class TestLexicalCli:
+    def build(self, runner, path):
+        with patch("qdrant_client.QdrantClient", return_value=make_collection()):
+            return runner.invoke(cli, ["lexical-index", "--path", path], catch_exceptions=False)
+
+    def test_build_reports_counts(self, tmp_path):
+        result = self.build(CliRunner(), str(tmp_path / "kb.sqlite"))
+        assert "4 added, 0 updated, 0 unchanged, 0 removed" in result.output
+
+    def test_lexical_mode_skips_openai(self, tmp_path):
+        path = str(tmp_path / "kb.sqlite")
+        runner = CliRunner()
+        self.build(runner, path)
+        with patch("openai.OpenAI") as mock_openai_cls:
+            result = runner.invoke(cli, ["run", "XR-200", "--mode", "lexical", "--lexical-index", path],
+                                   env={"OPENAI_API_KEY": ""}, catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert '"Produkt XR-200"' in result.output
+        mock_openai_cls.assert_not_called()
+
+    def test_missing_index_errors(self, tmp_path):
+        result = CliRunner().invoke(cli, ["run", "q", "--mode", "lexical", "--lexical-index", str(tmp_path / "x.sqlite")])
+        assert result.exit_code != 0
+        assert "lexical-index" in result.output
+
+    def test_hybrid_fuses_vector_and_lexical(self, tmp_path):
+        path = str(tmp_path / "kb.sqlite")
+        runner = CliRunner()
+        self.build(runner, path)
+        hit = MagicMock(id=2, score=0.9, payload=DOCS[2])
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.1] * 4)])
+            mock_qdrant_cls.return_value.search.return_value = [hit]
+            result = runner.invoke(cli, ["run", "XR-200", "--mode", "hybrid", "--lexical-index", path,
+                                         "--cache", "off", "--top", "2"],
+                                   env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert '"Produkt XR-200"' in result.output
+        assert '"Tréninková periodizace"' in result.output
+        assert mock_qdrant_cls.return_value.search.call_args.kwargs["limit"] == 20
+
+    def test_offset_skips_top_ranks(self, tmp_path):
+        path = str(tmp_path / "kb.sqlite")
+        runner = CliRunner()
+        self.build(runner, path)
+        pages = []
+        for offset in ("0", "1"):
+            result = runner.invoke(cli, ["run", "dopamin", "--mode", "lexical", "--lexical-index", path, "--top", "1",
+                                         "--offset", offset, "--format", "ndjson"],
+                                   env={"OPENAI_API_KEY": ""}, catch_exceptions=False)
+            assert result.exit_code == 0, result.output
+            pages.append([json.loads(line) for line in result.output.splitlines()])
+        full = runner.invoke(cli, ["run", "dopamin", "--mode", "lexical", "--lexical-index", path, "--top", "2",
+                                   "--format", "ndjson"], env={"OPENAI_API_KEY": ""}, catch_exceptions=False)
+        ranking = [json.loads(line)["id"] for line in full.output.splitlines()]
+        assert [r["id"] for r in pages[0] + pages[1]] == ranking
+        assert pages[1][0]["rank"] == 2
@@ -0,0 +1,252 @@
+import math
+import random
+
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, HasIdCondition, PointStruct, SearchParams, VectorParams
+
+from kb.filters import FILTER_INDEXES
+from kb.matryoshka import backfill_short_vectors, shorten, two_stage_search
+from kb.resilience import Resilience
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+DIM = 64
+SHORT_DIM = 16
+CHANNELS = ["alpha", "beta"]
+
+
+def matryoshka_vector(rng):
+    # Energy concentrated in the leading dimensions, as in Matryoshka embeddings
+    return [rng.gauss(0, 1) / math.sqrt(1 + i / 4) for i in range(DIM)]
+
+
+def make_collection(points=200):
+    rng = random.Random(5)
+    client = QdrantClient(":memory:")
+    client.create_collection("kb", vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    client.upsert("kb", points=[
+        PointStruct(id=i, vector=matryoshka_vector(rng),
+                    payload={"title": f"Video {i}", "text": f"chunk {i}", "channel_slug": CHANNELS[i % 2]})
+        for i in range(points)
+    ])
+    return client
+
+
+def make_openai_mock(vector):
+    mock = MagicMock()
+    mock.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=vector)])
+    return mock
+
+
+# ── shorten ───────────────────────────────────────────────────────────────────
+
+class TestShorten:
+    def test_truncates_and_normalizes(self):
+        short = shorten([3.0, 4.0, 12.0], 2)
+        assert short == pytest.approx([0.6, 0.8])
+
+    def test_zero_vector(self):
+        assert shorten([0.0, 0.0, 1.0], 2) == [0.0, 0.0]
+
+
+# ── backfill ──────────────────────────────────────────────────────────────────
+
+class TestBackfill:
+    def test_writes_short_sidecar(self):
+        client = make_collection(130)
+        assert backfill_short_vectors(client, "kb", SHORT_DIM, batch_size=50) == 130
+        info = client.get_collection("kb_short")
+        assert info.config.params.vectors.size == SHORT_DIM
+        assert info.points_count == 130
+        record = client.retrieve("kb_short", [7], with_payload=True, with_vectors=True)[0]
+        assert record.payload == {"channel_slug": "beta"}
+        assert math.sqrt(sum(x * x for x in record.vector)) == pytest.approx(1.0, abs=1e-5)
+
+    def test_rerun_is_idempotent(self):
+        client = make_collection(40)
+        backfill_short_vectors(client, "kb", SHORT_DIM)
+        backfill_short_vectors(client, "kb", SHORT_DIM)
+        assert client.get_collection("kb_short").points_count == 40
+
+    def test_prunes_points_deleted_from_main_collection(self):
+        client = make_collection(40)
+        backfill_short_vectors(client, "kb", SHORT_DIM, batch_size=15)
+        client.delete("kb", points_selector=[3, 17, 38])
+        assert backfill_short_vectors(client, "kb", SHORT_DIM, batch_size=15) == 37
+        assert client.get_collection("kb_short").points_count == 37
+        assert client.retrieve("kb_short", [3, 17, 38]) == []
+
+    def test_indexes_sidecar_payload(self):
+        client = make_collection(10)
+        client.create_payload_index = MagicMock()
+        backfill_short_vectors(client, "kb", SHORT_DIM)
+        indexed = {(c.args[0], c.kwargs["field_name"]) for c in client.create_payload_index.call_args_list}
+        assert indexed == {("kb_short", field) for field in FILTER_INDEXES}
+
+    def test_dimension_mismatch(self):
+        client = make_collection(10)
+        backfill_short_vectors(client, "kb", SHORT_DIM)
+        with pytest.raises(ValueError, match="16-dim"):
+            backfill_short_vectors(client, "kb", 8)
+
+
+# ── two-stage search ──────────────────────────────────────────────────────────
+
+class TestTwoStageSearch:
+    @pytest.fixture
+    def client(self):
+        client = make_collection()
+        backfill_short_vectors(client, "kb", SHORT_DIM)
+        return client
+
+    def test_retains_recall_of_exact_full_search(self, client):
+        rng = random.Random(11)
+        overlap = []
+        for _ in range(10):
+            vector = matryoshka_vector(rng)
+            exact = client.search("kb", vector, limit=10, search_params=SearchParams(exact=True))
+            results = two_stage_search("q", client, make_openai_mock(vector), "kb", top_k=10,
+                                       short_dim=SHORT_DIM, coarse_factor=4)
+            overlap.append(len({h.id for h in exact} & {r["id"] for r in results}) / 10)
+        assert sum(overlap) / len(overlap) >= 0.9
+
+    def test_scores_are_full_vector_cosine(self, client):
+        vector = matryoshka_vector(random.Random(2))
+        # A coarse stage covering the whole collection must reproduce exact search
+        results = two_stage_search("q", client, make_openai_mock(vector), "kb", top_k=3, short_dim=SHORT_DIM,
+                                   coarse_factor=100)
+        exact = client.search("kb", vector, limit=3, search_params=SearchParams(exact=True))
+        assert [r["id"] for r in results] == [h.id for h in exact]
+        assert [r["score"] for r in results] == pytest.approx([h.score for h in exact], abs=1e-4)
+        assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+    def test_channel_filter_and_payload_projection(self, client):
+        vector = matryoshka_vector(random.Random(3))
+        results = two_stage_search("q", client, make_openai_mock(vector), "kb", top_k=5, channel_slug="alpha",
+                                   with_payload=["title", "channel_slug"], short_dim=SHORT_DIM)
+        assert len(results) == 5
+        assert all(r["payload"]["channel_slug"] == "alpha" for r in results)
+        assert set(results[0]["payload"]) == {"title", "channel_slug"}
+
+    def test_score_threshold_applies_to_rescored_scores(self, client):
+        vector = matryoshka_vector(random.Random(6))
+        full = two_stage_search("q", client, make_openai_mock(vector), "kb", top_k=10, short_dim=SHORT_DIM)
+        threshold = full[4]["score"]
+        results = two_stage_search("q", client, make_openai_mock(vector), "kb", top_k=10, short_dim=SHORT_DIM,
+                                   score_threshold=threshold)
+        assert [r["id"] for r in results] == [r["id"] for r in full[:5]]
+
+    def test_search_params_reach_coarse_search(self, client):
+        client.search = MagicMock(side_effect=client.search)
+        params = SearchParams(hnsw_ef=256)
+        two_stage_search("q", client, make_openai_mock([0.1] * DIM), "kb", top_k=3, short_dim=SHORT_DIM,
+                         search_params=params)
+        assert client.search.call_args_list[0].kwargs["search_params"] == params
+
+    def test_rescore_is_exact_search_over_candidates(self, client):
+        client.search = MagicMock(side_effect=client.search)
+        client.retrieve = MagicMock(side_effect=client.retrieve)
+        two_stage_search("q", client, make_openai_mock(matryoshka_vector(random.Random(8))), "kb", top_k=3,
+                         short_dim=SHORT_DIM, coarse_factor=4)
+        _, rescore = client.search.call_args_list
+        assert rescore.kwargs["collection_name"] == "kb"
+        assert rescore.kwargs["limit"] == 3
+        assert rescore.kwargs["search_params"] == SearchParams(exact=True)
+        assert rescore.kwargs["with_vectors"] is False
+        [condition] = rescore.kwargs["query_filter"].must
+        assert isinstance(condition, HasIdCondition) and len(condition.has_id) == 12
+        client.retrieve.assert_not_called()
+
+    def test_resilience_covers_both_searches(self, client):
+        search = client.search
+        failed = []
+
+        def flaky_search(**kwargs):
+            # Each stage times out once before answering
+            if kwargs["collection_name"] not in failed:
+                failed.append(kwargs["collection_name"])
+                raise TimeoutError("slow")
+            return search(**kwargs)
+
+        client.search = MagicMock(side_effect=flaky_search)
+        resilience = Resilience(deadline=5, sleep=lambda seconds: None)
+        results = two_stage_search("q", client, make_openai_mock(matryoshka_vector(random.Random(9))), "kb",
+                                   top_k=3, short_dim=SHORT_DIM, resilience=resilience)
+        assert len(results) == 3
+        assert failed == ["kb_short", "kb"]
+        assert resilience.retried == 2
+        assert all(1 <= c.kwargs["timeout"] <= 5 for c in client.search.call_args_list)
+
+    def test_missing_sidecar_raises_runtime_error(self):
+        with pytest.raises(RuntimeError, match="Failed to search Qdrant"):
+            two_stage_search("q", make_collection(5), make_openai_mock([0.1] * DIM), "kb", top_k=3)
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+class TestCli:
+    def test_backfill_command(self):
+        client = make_collection(20)
+        with patch("qdrant_client.QdrantClient", return_value=client):
+            result = CliRunner().invoke(cli, ["backfill-short", "--collection", "kb", "--dim", str(SHORT_DIM)],
+                                        catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert "Backfilled 20 point(s) from kb to kb_short (16 dims)" in result.output
+
+    def test_run_two_stage(self):
+        client = make_collection()
+        backfill_short_vectors(client, "kb", SHORT_DIM)
+        vector = matryoshka_vector(random.Random(4))
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient", return_value=client):
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=vector)])
+            result = CliRunner().invoke(cli, ["run", "q", "--collection", "kb", "--two-stage", "--short-dim",
+                                              str(SHORT_DIM), "--cache", "off", "--top", "2"],
+                                        env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": "http://127.0.0.1:9"},
+                                        catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert "#1 [" in result.output and "#2 [" in result.output
+        assert "#3 [" not in result.output
+
+    def test_run_two_stage_passes_search_options(self):
+        client = make_collection()
+        backfill_short_vectors(client, "kb", SHORT_DIM)
+        client.search = MagicMock(side_effect=client.search)
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient", return_value=client):
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(
+                data=[MagicMock(embedding=matryoshka_vector(random.Random(4)))]
+            )
+            result = CliRunner().invoke(cli, ["run", "q", "--collection", "kb", "--two-stage", "--short-dim",
+                                              str(SHORT_DIM), "--cache", "off", "--hnsw-ef", "64",
+                                              "--score-threshold", "0.99"],
+                                        env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": "http://127.0.0.1:9"},
+                                        catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert client.search.call_args_list[0].kwargs["search_params"].hnsw_ef == 64
+        assert "Žádné výsledky." in result.output
+
+    def test_run_two_stage_without_retries_fails(self):
+        client = make_collection()
+        backfill_short_vectors(client, "kb", SHORT_DIM)
+        client.search = MagicMock(side_effect=TimeoutError("slow"))
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient", return_value=client):
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(
+                data=[MagicMock(embedding=matryoshka_vector(random.Random(4)))]
+            )
+            result = CliRunner().invoke(cli, ["run", "q", "--collection", "kb", "--two-stage", "--short-dim",
+                                              str(SHORT_DIM), "--cache", "off", "--retries", "0"],
+                                        env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": "http://127.0.0.1:9"})
+        assert result.exit_code == 1
+        assert client.search.call_count == 1
+
+    def test_two_stage_rejects_offset(self):
+        result = CliRunner().invoke(cli, ["run", "q", "--two-stage", "--offset", "5"])
+        assert result.exit_code != 0
+        assert "--two-stage" in result.output
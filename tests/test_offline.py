@@ -0,0 +1,172 @@
+import json
+import random
+
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from kb.offline import OfflineIndex, export_snapshot
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+DIM = 16
+CHANNELS = ["alpha", "beta", "gamma"]
+
+
+def random_vector(rng):
+    return [rng.uniform(-1, 1) for _ in range(DIM)]
+
+
+def make_collection(points=300, distance=Distance.COSINE, name="kb"):
+    rng = random.Random(42)
+    client = QdrantClient(":memory:")
+    client.create_collection(name, vectors_config=VectorParams(size=DIM, distance=distance))
+    client.upsert(name, points=[
+        PointStruct(
+            id=i,
+            vector=random_vector(rng),
+            payload={"title": f"Video {i}", "text": f"chunk {i}", "channel_slug": CHANNELS[i % 3]},
+        )
+        for i in range(points)
+    ])
+    return client
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    client = make_collection()
+    path = str(tmp_path / "snap")
+    export_snapshot(client, "kb", path, batch_size=64)
+    return client, OfflineIndex(path)
+
+
+# ── export ────────────────────────────────────────────────────────────────────
+
+class TestExport:
+    def test_returns_point_count(self, tmp_path):
+        assert export_snapshot(make_collection(points=130), "kb", str(tmp_path / "s"), batch_size=50) == 130
+
+    def test_snapshot_files_written(self, tmp_path):
+        export_snapshot(make_collection(points=10), "kb", str(tmp_path / "s"))
+        names = {p.name for p in (tmp_path / "s").iterdir()}
+        assert names == {"meta.json", "vectors.f32", "payloads.bin", "offsets.u64", "channels.i32", "ids.json"}
+
+    def test_unsupported_distance_raises(self, tmp_path):
+        client = make_collection(points=5, distance=Distance.EUCLID)
+        with pytest.raises(ValueError, match="Unsupported distance"):
+            export_snapshot(client, "kb", str(tmp_path / "s"))
+
+    def test_missing_collection_raises_runtime_error(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            export_snapshot(QdrantClient(":memory:"), "missing", str(tmp_path / "s"))
+
+    def test_empty_collection(self, tmp_path):
+        path = str(tmp_path / "s")
+        export_snapshot(make_collection(points=0), "kb", path)
+        assert OfflineIndex(path).search([0.1] * DIM, top_k=5) == []
+
+
+# ── OfflineIndex.search ───────────────────────────────────────────────────────
+
+class TestOfflineSearch:
+    def test_matches_qdrant_exact_ordering(self, snapshot):
+        client, index = snapshot
+        rng = random.Random(7)
+        for _ in range(10):
+            query = random_vector(rng)
+            expected = client.search("kb", query_vector=query, limit=10)
+            results = index.search(query, top_k=10)
+            assert [r["payload"]["title"] for r in results] == [h.payload["title"] for h in expected]
+            assert [r["score"] for r in results] == pytest.approx([h.score for h in expected], abs=1e-5)
+
+    def test_channel_filter_matches_qdrant(self, snapshot):
+        from kb.searcher import build_filter
+        client, index = snapshot
+        query = random_vector(random.Random(3))
+        expected = client.search("kb", query_vector=query, limit=5, query_filter=build_filter("beta"))
+        results = index.search(query, top_k=5, channel_slug="beta")
+        assert [r["payload"]["title"] for r in results] == [h.payload["title"] for h in expected]
+        assert all(r["payload"]["channel_slug"] == "beta" for r in results)
+
+    def test_unknown_channel_returns_empty(self, snapshot):
+        _, index = snapshot
+        assert index.search([0.1] * DIM, top_k=5, channel_slug="nope") == []
+
+    def test_top_k_larger_than_collection(self, snapshot):
+        _, index = snapshot
+        assert len(index.search([0.1] * DIM, top_k=1000)) == 300
+
+    def test_payload_projection(self, snapshot):
+        _, index = snapshot
+        results = index.search([0.1] * DIM, top_k=1, with_payload=["title"])
+        assert list(results[0]["payload"]) == ["title"]
+
+    def test_dot_distance(self, tmp_path):
+        client = make_collection(points=50, distance=Distance.DOT)
+        path = str(tmp_path / "dot")
+        export_snapshot(client, "kb", path)
+        query = random_vector(random.Random(5))
+        expected = client.search("kb", query_vector=query, limit=5)
+        results = OfflineIndex(path).search(query, top_k=5)
+        assert [r["score"] for r in results] == pytest.approx([h.score for h in expected], abs=1e-4)
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+class TestOfflineCli:
+    def test_export_then_run_offline(self, tmp_path):
+        client = make_collection(points=20)
+        path = str(tmp_path / "snap")
+        runner = CliRunner()
+        with patch("qdrant_client.QdrantClient", return_value=client):
+            result = runner.invoke(cli, ["export", path], catch_exceptions=False)
+        assert "Exported 20 point(s)" in result.output
+
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(
+                data=[MagicMock(embedding=[0.1] * DIM)]
+            )
+            result = runner.invoke(cli, ["run", "q", "--offline", path, "--cache", "off", "--top", "3"],
+                                   env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert result.output.count('"Video ') == 3
+        mock_qdrant_cls.assert_not_called()
+
+    def test_embedding_is_retried_under_deadline(self, tmp_path):
+        path = str(tmp_path / "snap")
+        export_snapshot(make_collection(points=20), "kb", path)
+        with patch("openai.OpenAI") as mock_openai_cls:
+            create = mock_openai_cls.return_value.embeddings.create
+            create.side_effect = [TimeoutError("slow"), MagicMock(data=[MagicMock(embedding=[0.1] * DIM)])]
+            result = CliRunner().invoke(cli, ["run", "q", "--offline", path, "--cache", "off", "--top", "3",
+                                              "--deadline", "5"],
+                                        env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert result.output.count('"Video ') == 3
+        assert create.call_count == 2
+        assert 0 < create.call_args.kwargs["timeout"] <= 5
+
+    def test_offset_skips_top_ranks(self, tmp_path):
+        path = str(tmp_path / "snap")
+        export_snapshot(make_collection(points=20), "kb", path)
+        runner = CliRunner()
+
+        def run_offline(*args):
+            with patch("openai.OpenAI") as mock_openai_cls:
+                mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(
+                    data=[MagicMock(embedding=[0.1] * DIM)]
+                )
+                result = runner.invoke(cli, ["run", "q", "--offline", path, "--cache", "off", "--format", "ndjson", *args],
+                                       env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+            assert result.exit_code == 0, result.output
+            return [json.loads(line) for line in result.output.splitlines()]
+
+        full = run_offline("--top", "5")
+        page = run_offline("--top", "3", "--offset", "2")
+        assert [r["id"] for r in page] == [r["id"] for r in full[2:5]]
+        assert [r["rank"] for r in page] == [3, 4, 5]
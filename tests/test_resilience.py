@@ -0,0 +1,347 @@
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+from unittest.mock import MagicMock
+
+from kb.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    Hedger,
+    Resilience,
+    is_retryable,
+)
+from kb.searcher import search
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HIT = SimpleNamespace(id=1, score=0.9, payload={"title": "Video"})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeOpenAI:
+    """Embeddings client failing with errors[i] on the i-th call (None: succeed) after delay seconds."""
+
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = []
+        self.embeddings = SimpleNamespace(create=self.create)
+
+    def create(self, model, input, **options):
+        self.calls.append(options)
+        time.sleep(self.delay)
+        error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[0.1, 0.2])])
+
+
+class FakeQdrant:
+    """Qdrant client whose search sleeps delays[i] on the i-th call and fails with errors[i]."""
+
+    def __init__(self, delays=(), errors=()):
+        self.delays = list(delays)
+        self.errors = list(errors)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def search(self, **kwargs):
+        with self._lock:
+            self.calls.append(kwargs)
+            delay = self.delays.pop(0) if self.delays else 0.0
+            error = self.errors.pop(0) if self.errors else None
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return [HIT]
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    return openai.RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+
+
+def bad_request_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    return openai.BadRequestError("bad input", response=httpx.Response(400, request=request), body=None)
+
+
+def no_sleep_resilience(**kwargs):
+    sleeps = []
+    resilience = Resilience(sleep=sleeps.append, rng=random.Random(0), **kwargs)
+    return resilience, sleeps
+
+
+# ── retries ───────────────────────────────────────────────────────────────────
+
+class TestRetries:
+    def test_retryable_classification(self):
+        assert is_retryable(rate_limit_error())
+        assert is_retryable(TimeoutError())
+        assert is_retryable(ConnectionError())
+        assert not is_retryable(bad_request_error())
+        assert not is_retryable(ValueError())
+
+    def test_retries_transient_openai_errors(self):
+        resilience, sleeps = no_sleep_resilience(retries=2)
+        openai_client = FakeOpenAI(errors=[rate_limit_error(), rate_limit_error()])
+        results = search("q", FakeQdrant(), openai_client, "kb", 3, resilience=resilience)
+        assert [r["id"] for r in results] == [1]
+        assert len(openai_client.calls) == 3
+        assert len(sleeps) == 2 and resilience.retried == 2
+
+    def test_gives_up_after_retries(self):
+        resilience, _ = no_sleep_resilience(retries=1)
+        openai_client = FakeOpenAI(errors=[rate_limit_error()] * 3)
+        with pytest.raises(RuntimeError, match="Failed to get embedding: rate limited"):
+            search("q", FakeQdrant(), openai_client, "kb", 3, resilience=resilience)
+        assert len(openai_client.calls) == 2
+
+    def test_client_errors_are_not_retried(self):
+        resilience, sleeps = no_sleep_resilience(retries=3)
+        openai_client = FakeOpenAI(errors=[bad_request_error()])
+        with pytest.raises(RuntimeError, match="bad input"):
+            search("q", FakeQdrant(), openai_client, "kb", 3, resilience=resilience)
+        assert len(openai_client.calls) == 1 and sleeps == []
+
+    def test_retries_qdrant(self):
+        resilience, _ = no_sleep_resilience(retries=2)
+        qdrant = FakeQdrant(errors=[ConnectionError("reset"), None])
+        assert search("q", qdrant, FakeOpenAI(), "kb", 3, resilience=resilience)[0]["id"] == 1
+        assert len(qdrant.calls) == 2
+
+    def test_backoff_is_jittered_and_capped(self):
+        resilience = Resilience(backoff_base=0.1, backoff_max=0.5, rng=random.Random(1))
+        delays = [resilience.backoff(attempt) for attempt in range(8)]
+        assert all(0 <= d <= min(0.5, 0.1 * 2 ** i) for i, d in enumerate(delays))
+        assert len(set(delays)) == len(delays)
+
+    def test_no_resilience_means_single_attempt(self):
+        openai_client = FakeOpenAI(errors=[rate_limit_error()])
+        with pytest.raises(RuntimeError):
+            search("q", FakeQdrant(), openai_client, "kb", 3)
+        assert openai_client.calls == [{}]
+
+
+# ── deadlines ─────────────────────────────────────────────────────────────────
+
+class TestDeadline:
+    def test_requests_get_budget_timeouts(self):
+        qdrant = FakeQdrant()
+        openai_client = FakeOpenAI()
+        search("q", qdrant, openai_client, "kb", 3, resilience=Resilience(deadline=5.0))
+        assert 0 < openai_client.calls[0]["timeout"] <= 2.0
+        assert qdrant.calls[0]["timeout"] == 5
+
+    def test_slow_stage_exceeds_deadline(self):
+        qdrant = FakeQdrant(delays=[1.0])
+        start = time.perf_counter()
+        with pytest.raises(RuntimeError, match="Failed to search Qdrant: no response within"):
+            search("q", qdrant, FakeOpenAI(), "kb", 3, resilience=Resilience(deadline=0.2, retries=0))
+        assert time.perf_counter() - start < 0.8
+
+    def test_embedding_share_of_deadline(self):
+        openai_client = FakeOpenAI(delay=0.5)
+        with pytest.raises(RuntimeError, match="Failed to get embedding"):
+            search("q", FakeQdrant(), openai_client, "kb", 3, resilience=Resilience(deadline=0.5, retries=0))
+
+    def test_no_retry_past_deadline(self):
+        clock = FakeClock()
+        resilience = Resilience(deadline=0.05, retries=5, backoff_base=1.0, clock=clock, sleep=clock.sleep,
+                                rng=random.Random(0))
+        budget = resilience.start()
+
+        def fail(timeout):
+            raise ConnectionError("down")
+
+        # The first backoff (seeded: ~0.84s) does not fit into the 50ms budget
+        with pytest.raises(ConnectionError):
+            budget.call("qdrant", fail)
+        assert resilience.retried == 0
+        assert clock.now == 0
+
+    def test_abandoned_attempt_does_not_delay_exit(self):
+        script = (
+            "import time\n"
+            "from kb.resilience import DeadlineExceeded, Resilience\n"
+            "try:\n"
+            "    Resilience(deadline=0.5, retries=0).start().call('qdrant', lambda timeout: time.sleep(3))\n"
+            "except DeadlineExceeded:\n"
+            "    pass\n"
+        )
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, check=True, timeout=30)
+        assert time.perf_counter() - start < 2.5
+
+    def test_expired_budget(self):
+        clock = FakeClock()
+        budget = Resilience(deadline=1.0, clock=clock).start()
+        clock.now = 2.0
+        with pytest.raises(DeadlineExceeded):
+            budget.attempt_timeout(0.5)
+
+
+# ── hedging ───────────────────────────────────────────────────────────────────
+
+class TestHedging:
+    def test_hedge_delay_tracks_percentile(self):
+        hedger = Hedger(percentile=90, min_samples=10, initial_delay=0.5)
+        assert hedger.delay() == 0.5
+        for ms in range(1, 101):
+            hedger.record(ms / 1000)
+        assert hedger.delay() == pytest.approx(0.091)
+
+    def test_duplicate_wins_over_slow_first_request(self):
+        # First request stalls, the hedge answers quickly
+        qdrant = FakeQdrant(delays=[2.0, 0.01])
+        resilience = Resilience(hedge=Hedger(initial_delay=0.05))
+        start = time.perf_counter()
+        results = search("q", qdrant, FakeOpenAI(), "kb", 3, resilience=resilience)
+        assert time.perf_counter() - start < 1.0
+        assert results[0]["id"] == 1
+        assert len(qdrant.calls) == 2
+        assert resilience.stats()["hedges"] == 1
+
+    def test_fast_request_is_not_hedged(self):
+        qdrant = FakeQdrant(delays=[0.0])
+        resilience = Resilience(hedge=Hedger(initial_delay=0.5))
+        search("q", qdrant, FakeOpenAI(), "kb", 3, resilience=resilience)
+        assert len(qdrant.calls) == 1
+        assert resilience.stats()["hedges"] == 0
+
+    def test_hedge_survives_failed_first_request(self):
+        qdrant = FakeQdrant(delays=[0.2, 0.3], errors=[ValueError("replica broken"), None])
+        resilience = Resilience(hedge=Hedger(initial_delay=0.05), retries=0)
+        assert search("q", qdrant, FakeOpenAI(), "kb", 3, resilience=resilience)[0]["id"] == 1
+
+
+# ── circuit breaker ───────────────────────────────────────────────────────────
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_recovers(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("qdrant", failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError, match="qdrant circuit open"):
+            breaker.before_call()
+        clock.now = 10
+        assert breaker.state == "half_open"
+        breaker.before_call()
+        # Only one trial call while half-open
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_trial_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.now = 5
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+    def test_search_fails_fast_when_open(self):
+        resilience, _ = no_sleep_resilience(retries=0, failure_threshold=2)
+        qdrant = FakeQdrant(errors=[ConnectionError("down")] * 2)
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                search("q", qdrant, FakeOpenAI(), "kb", 3, resilience=resilience)
+        with pytest.raises(RuntimeError, match="qdrant circuit open"):
+            search("q", qdrant, FakeOpenAI(), "kb", 3, resilience=resilience)
+        assert len(qdrant.calls) == 2
+        assert resilience.stats()["breakers"]["qdrant"] == "open"
+
+    def test_client_errors_do_not_trip(self):
+        resilience, _ = no_sleep_resilience(retries=0, failure_threshold=1)
+        qdrant = MagicMock()
+        qdrant.search.side_effect = ValueError("bad filter")
+        with pytest.raises(RuntimeError):
+            search("q", qdrant, FakeOpenAI(), "kb", 3, resilience=resilience)
+        assert resilience.breakers["qdrant"].state == "closed"
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+# Runs `search.py run` in a fresh interpreter with only the OpenAI client faked
+RUN_WITH_FAKE_OPENAI = """
+import sys
+from unittest.mock import MagicMock, patch
+
+sys.argv = ["search.py", *sys.argv[1:]]
+with patch("openai.OpenAI") as openai_cls:
+    openai_cls.return_value.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.1] * 8)])
+    import search
+    search.cli()
+"""
+
+
+@pytest.fixture
+def stalled_qdrant():
+    """URL of a Qdrant stand-in that accepts requests and never answers them."""
+    release = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def stall(self):
+            release.wait(30)
+
+        do_GET = do_POST = do_PUT = stall
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True).start()
+    host, port = server.server_address
+    yield f"http://{host}:{port}"
+    release.set()
+    server.shutdown()
+    server.server_close()
+
+
+class TestDeadlineCli:
+    @pytest.mark.parametrize("cache", ["disk", "off"])
+    def test_process_exits_within_deadline(self, stalled_qdrant, tmp_path, cache):
+        # With the result cache on, the first stalled call is the collection-version check
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", RUN_WITH_FAKE_OPENAI, "run", "q", "--no-daemon", "--qdrant-url", stalled_qdrant,
+             "--cache", cache, "--cache-path", str(tmp_path / "cache.sqlite"), "--deadline", "0.5", "--timeout", "30"],
+            cwd=REPO_ROOT,
+            env={**os.environ, "OPENAI_API_KEY": "sk-test", "HOME": str(tmp_path)},
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        elapsed = time.perf_counter() - start
+        assert proc.returncode == 1, proc.stderr
+        assert "no response within" in proc.stderr or "deadline" in proc.stderr
+        # Interpreter start-up and imports included; the stalled request itself must not be waited for
+        assert elapsed < 4, f"run took {elapsed:.1f}s"
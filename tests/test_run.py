@@ -0,0 +1,400 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+FAKE_EMBEDDING = [0.1] * 8
+
+# Nothing listens on the discard port, so run falls back to in-process search
+NO_DAEMON_URL = "http://127.0.0.1:9"
+
+SAMPLE_PAYLOAD = {
+    "title": "Test Video",
+    "transcript_source": "caption",
+    "text": "Athletes who perform under pressure consistently focus on process.",
+    "timestamp_url": "https://youtube.com/watch?v=abc123&t=0s",
+}
+
+
+def make_hit(score=0.87, payload=None, id=1):
+    hit = MagicMock()
+    hit.id = id
+    hit.score = score
+    hit.payload = payload if payload is not None else SAMPLE_PAYLOAD
+    return hit
+
+
+def invoke_run(*args, hits=None):
+    runner = CliRunner(mix_stderr=False)
+    with patch("openai.OpenAI") as mock_openai_cls, \
+         patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+        mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(
+            data=[MagicMock(embedding=FAKE_EMBEDDING)]
+        )
+        mock_qdrant_cls.return_value.search.return_value = hits if hits is not None else [make_hit()]
+        mock_qdrant_cls.return_value.get_collection.return_value.points_count = 100
+        result = runner.invoke(cli, ["run", *args], env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": NO_DAEMON_URL}, catch_exceptions=False)
+    return result, mock_openai_cls.return_value, mock_qdrant_cls.return_value
+
+
+# ── tests ─────────────────────────────────────────────────────────────────────
+
+class TestRun:
+    def test_prints_results(self):
+        result, _, _ = invoke_run("query", "--cache", "off")
+        assert result.exit_code == 0, result.output
+        assert '#1 [0.87] "Test Video"  (caption)' in result.output
+
+    def test_no_results_message(self):
+        result, _, _ = invoke_run("query", "--cache", "off", hits=[])
+        assert "Žádné výsledky." in result.output
+
+
+class TestRunCache:
+    def test_disk_cache_skips_second_embedding(self, tmp_path):
+        cache_path = str(tmp_path / "cache.sqlite")
+        invoke_run("query", "--cache-path", cache_path)
+        _, openai_client, _ = invoke_run("query", "--cache-path", cache_path)
+        openai_client.embeddings.create.assert_not_called()
+
+    def test_cache_off_always_embeds(self, tmp_path):
+        invoke_run("query", "--cache", "off")
+        _, openai_client, _ = invoke_run("query", "--cache", "off")
+        openai_client.embeddings.create.assert_called_once()
+
+    def test_clear_cache_forces_embedding(self, tmp_path):
+        options = ("--cache-path", str(tmp_path / "cache.sqlite"),
+                   "--semantic-cache-path", str(tmp_path / "semantic.npz"))
+        invoke_run("query", *options)
+        _, openai_client, _ = invoke_run("query", *options, "--clear-cache")
+        openai_client.embeddings.create.assert_called_once()
+
+    def test_clear_cache_applies_to_streamed_search(self, tmp_path):
+        options = ("--cache-path", str(tmp_path / "cache.sqlite"),
+                   "--semantic-cache-path", str(tmp_path / "semantic.npz"))
+        invoke_run("query", *options)
+        _, openai_client, _ = invoke_run("query", *options, "--offset", "1", "--clear-cache")
+        openai_client.embeddings.create.assert_called_once()
+
+    def test_cache_stats_reported(self, tmp_path):
+        cache_path = str(tmp_path / "cache.sqlite")
+        result, _, _ = invoke_run("query", "--cache-path", cache_path, "--cache-stats")
+        assert "cache: 0 hit(s), 1 miss(es)" in result.stderr
+
+
+# ── batch ─────────────────────────────────────────────────────────────────────
+
+def invoke_batch(*args, input=""):
+    runner = CliRunner(mix_stderr=False)
+    with patch("openai.OpenAI") as mock_openai_cls, \
+         patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+        mock_openai_cls.return_value.embeddings.create.side_effect = lambda model, input: MagicMock(
+            data=[MagicMock(embedding=FAKE_EMBEDDING) for _ in input]
+        )
+        mock_qdrant_cls.return_value.search_batch.side_effect = lambda collection_name, requests: [
+            [make_hit()] for _ in requests
+        ]
+        result = runner.invoke(cli, ["batch", "--cache", "off", *args], input=input,
+                               env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+    return result, mock_qdrant_cls.return_value
+
+
+class TestBatch:
+    def test_plain_lines_emit_jsonl_in_order(self):
+        import json
+        result, _ = invoke_batch(input="first\n\nsecond\n")
+        assert result.exit_code == 0, result.output
+        lines = [json.loads(l) for l in result.output.splitlines()]
+        assert [l["query"] for l in lines] == ["first", "second"]
+        assert lines[0]["results"][0]["payload"]["title"] == "Test Video"
+
+    def test_jsonl_input_overrides(self):
+        result, qdrant = invoke_batch(input='{"query": "q", "channel": "@chan", "top_k": 3}\n')
+        request = qdrant.search_batch.call_args.kwargs["requests"][0]
+        assert request.limit == 3
+        assert request.filter.must[0].match.value == "chan"
+
+    def test_text_format(self):
+        result, _ = invoke_batch("--format", "text", input="first\n")
+        assert 'Hledám: "first"' in result.output
+        assert '#1 [0.87] "Test Video"' in result.output
+
+
+class TestRunResultCache:
+    def test_second_run_served_from_result_cache(self, tmp_path):
+        cache_path = str(tmp_path / "cache.sqlite")
+        first, _, _ = invoke_run("query", "--cache-path", cache_path)
+        second, openai_client, qdrant = invoke_run("query", "--cache-path", cache_path)
+        assert "(výsledky z cache)" not in first.output
+        assert "(výsledky z cache)" in second.output
+        assert '#1 [0.87] "Test Video"' in second.output
+        openai_client.embeddings.create.assert_not_called()
+        qdrant.search.assert_not_called()
+
+    def test_different_top_is_a_miss(self, tmp_path):
+        cache_path = str(tmp_path / "cache.sqlite")
+        invoke_run("query", "--cache-path", cache_path)
+        _, _, qdrant = invoke_run("query", "--cache-path", cache_path, "--top", "3")
+        qdrant.search.assert_called_once()
+
+
+class TestRunSemanticCache:
+    def test_paraphrase_served_from_semantic_cache(self, tmp_path):
+        # Every query embeds to FAKE_EMBEDDING, so any paraphrase is a perfect match
+        semantic_path = str(tmp_path / "semantic.npz")
+        options = ("--cache", "off", "--semantic-threshold", "0.95", "--semantic-cache-path", semantic_path)
+        first, _, _ = invoke_run("jak funguje dopamin", *options)
+        second, openai_client, qdrant = invoke_run("jak dopamin funguje", *options, "--cache-stats")
+        assert "z cache" not in first.output
+        assert '(výsledky z cache pro podobný dotaz "jak funguje dopamin")' in second.stdout
+        assert '#1 [0.87] "Test Video"' in second.stdout
+        openai_client.embeddings.create.assert_called_once()
+        qdrant.search.assert_not_called()
+        assert "semantic cache: 1 hit(s), 1 miss(es), 0 stale, hit rate 50.0%, 1 entries" in second.stderr
+
+    def test_hits_and_collection_version_persist_across_runs(self, tmp_path):
+        semantic_path = str(tmp_path / "semantic.npz")
+        options = ("--cache", "off", "--semantic-threshold", "0.95", "--semantic-cache-path", semantic_path)
+        invoke_run("jak funguje dopamin", *options)
+        for query in ("jak dopamin funguje", "dopamin jak funguje"):
+            result, _, qdrant = invoke_run(query, *options, "--cache-stats")
+            assert "z cache pro podobný dotaz" in result.stdout
+            # The point count read by the first run is still fresh
+            qdrant.get_collection.assert_not_called()
+        assert "semantic cache: 2 hit(s), 1 miss(es)" in result.stderr
+
+    def test_off_by_default(self, tmp_path):
+        invoke_run("query", "--cache", "off")
+        _, _, qdrant = invoke_run("query", "--cache", "off")
+        qdrant.search.assert_called_once()
+
+    def test_clear_cache_removes_semantic_cache(self, tmp_path):
+        semantic_path = tmp_path / "semantic.npz"
+        options = ("--cache-path", str(tmp_path / "cache.sqlite"), "--semantic-threshold", "0.95",
+                   "--semantic-cache-path", str(semantic_path))
+        invoke_run("query", *options)
+        assert semantic_path.exists()
+        _, _, qdrant = invoke_run("other query", *options, "--clear-cache")
+        qdrant.search.assert_called_once()
+
+
+class TestRunFields:
+    def test_fetches_only_rendered_fields_by_default(self):
+        _, _, qdrant = invoke_run("query", "--cache", "off")
+        assert qdrant.search.call_args.kwargs["with_payload"] == [
+            "title", "transcript_source", "text", "timestamp_url",
+        ]
+
+    def test_fields_all(self):
+        _, _, qdrant = invoke_run("query", "--cache", "off", "--fields", "all")
+        assert qdrant.search.call_args.kwargs["with_payload"] is True
+
+
+# ── streaming ─────────────────────────────────────────────────────────────────
+
+def _raise_or_return(value):
+    if isinstance(value, Exception):
+        raise value
+    return value
+
+
+def invoke_stream(*args, total=250, search_effect=None):
+    runner = CliRunner(mix_stderr=False)
+    with patch("openai.OpenAI") as mock_openai_cls, \
+         patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+        mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(
+            data=[MagicMock(embedding=FAKE_EMBEDDING)]
+        )
+        mock_qdrant_cls.return_value.search.side_effect = search_effect or (lambda limit, offset=None, **kw: [
+            make_hit(id=i) for i in range((offset or 0), min((offset or 0) + limit, total))
+        ])
+        mock_qdrant_cls.return_value.get_collection.return_value.points_count = total
+        result = runner.invoke(cli, ["run", "query", "--cache", "off", *args],
+                               env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": NO_DAEMON_URL},
+                               catch_exceptions=False)
+    return result, mock_qdrant_cls.return_value
+
+
+class TestRunStreaming:
+    def test_ndjson_format(self):
+        import json
+        result, _ = invoke_stream("--format", "ndjson", "--top", "3")
+        lines = [json.loads(l) for l in result.output.splitlines()]
+        assert [l["rank"] for l in lines] == [1, 2, 3]
+        assert lines[0]["payload"]["title"] == "Test Video"
+        assert "Hledám" not in result.output
+
+    def test_large_top_streams_pages(self):
+        import json
+        result, qdrant = invoke_stream("--format", "ndjson", "--top", "250", "--page-size", "100")
+        assert len(result.output.splitlines()) == 250
+        assert [c.kwargs["limit"] for c in qdrant.search.call_args_list] == [100, 100, 50]
+
+    def test_offset_numbers_ranks_from_offset(self):
+        result, qdrant = invoke_stream("--offset", "20", "--top", "2")
+        assert "#21 [0.87]" in result.output
+        assert "#22 [0.87]" in result.output
+        assert qdrant.search.call_args.kwargs["offset"] == 20
+
+    def test_offset_past_end(self):
+        result, _ = invoke_stream("--offset", "300", "--top", "5")
+        assert "Žádné výsledky." in result.output
+
+    def test_cache_stats(self):
+        result, _ = invoke_stream("--offset", "5", "--top", "2", "--cache", "memory", "--cache-stats")
+        assert "cache: 0 hit(s), 1 miss(es)" in result.stderr
+
+    def test_transient_error_is_retried(self):
+        pages = [TimeoutError("slow"), [make_hit(id=5), make_hit(id=6)]]
+        result, qdrant = invoke_stream("--offset", "5", "--top", "2", "--retries", "1",
+                                       search_effect=lambda **kw: _raise_or_return(pages.pop(0)))
+        assert result.exit_code == 0, result.output
+        assert "#6 [0.87]" in result.output and "#7 [0.87]" in result.output
+        assert qdrant.search.call_count == 2
+
+    def test_semantic_cache_searches_in_one_go(self, tmp_path):
+        result, qdrant = invoke_stream("--offset", "1", "--top", "2", "--semantic-threshold", "0.9",
+                                       "--semantic-cache-path", str(tmp_path / "semantic.npz"))
+        assert result.exit_code == 0, result.output
+        assert "#2 [0.87]" in result.output and "#3 [0.87]" in result.output
+        kwargs = qdrant.search.call_args.kwargs
+        assert kwargs["limit"] == 3 and "offset" not in kwargs
+        assert (tmp_path / "semantic.npz").exists()
+
+
+# ── search params ─────────────────────────────────────────────────────────────
+
+class TestRunSearchParams:
+    def test_defaults_send_no_params(self):
+        _, _, qdrant = invoke_run("query", "--cache", "off")
+        assert qdrant.search.call_args.kwargs["search_params"] is None
+        assert qdrant.search.call_args.kwargs["score_threshold"] is None
+
+    def test_preset_with_override(self):
+        _, _, qdrant = invoke_run("query", "--cache", "off", "--preset", "accurate", "--hnsw-ef", "256",
+                                  "--score-threshold", "0.3")
+        kwargs = qdrant.search.call_args.kwargs
+        assert kwargs["search_params"].hnsw_ef == 256
+        assert kwargs["search_params"].quantization.oversampling == 2.0
+        assert kwargs["score_threshold"] == 0.3
+
+    def test_exact_flag_when_streaming(self):
+        result, qdrant = invoke_stream("--exact", "--offset", "5", "--top", "2")
+        assert result.exit_code == 0, result.output
+        assert qdrant.search.call_args.kwargs["search_params"].exact is True
+
+
+# ── timings ───────────────────────────────────────────────────────────────────
+
+class TestRunTimings:
+    def test_text_breakdown_on_stderr(self):
+        result, _, _ = invoke_run("query", "--cache", "off", "--timings", "text")
+        assert result.exit_code == 0, result.output
+        assert "časy:" in result.stderr
+        for stage in ("setup", "embed", "qdrant", "format", "celkem"):
+            assert stage in result.stderr
+        assert "časy:" not in result.stdout
+
+    def test_json_breakdown(self):
+        import json
+        result, _, _ = invoke_run("query", "--cache", "off", "--timings", "json", "--format", "ndjson")
+        report = json.loads(result.stderr.splitlines()[-1])
+        assert {"setup", "embed", "filter", "qdrant", "format"} <= set(report["stages_ms"])
+        assert report["counters"]["hits"] == 1
+        assert len(result.stdout.splitlines()) == 1
+
+    def test_streaming(self):
+        import json
+        result, _ = invoke_stream("--offset", "5", "--top", "3", "--timings", "json")
+        report = json.loads(result.stderr.splitlines()[-1])
+        assert "stream" in report["stages_ms"]
+        assert report["counters"]["hits"] == 3
+
+
+# ── multiple collections ──────────────────────────────────────────────────────
+
+class TestRunMultipleCollections:
+    def test_repeated_collection_merges_results(self):
+        import json
+        hits = {"youtube": [make_hit(score=0.9, id=1)], "podcasts": [make_hit(score=0.95, id=7)]}
+        runner = CliRunner(mix_stderr=False)
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(
+                data=[MagicMock(embedding=FAKE_EMBEDDING)]
+            )
+            mock_qdrant_cls.return_value.search.side_effect = lambda collection_name, **kw: hits[collection_name]
+            result = runner.invoke(cli, ["run", "q", "--cache", "off", "--format", "ndjson",
+                                         "--collection", "youtube", "--collection", "podcasts"],
+                                   env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": NO_DAEMON_URL},
+                                   catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        lines = [json.loads(l) for l in result.stdout.splitlines()]
+        assert [(l["collection"], l["id"]) for l in lines] == [("podcasts", 7), ("youtube", 1)]
+        mock_openai_cls.return_value.embeddings.create.assert_called_once()
+
+    def test_text_output_shows_collection(self):
+        result, _, _ = invoke_run("q", "--cache", "off", "--collection", "a", "--collection", "b")
+        assert '"Test Video"  (caption)  [a]' in result.output
+
+    def test_semantic_cache_is_rejected(self):
+        result, _, _ = invoke_run("q", "--collection", "a", "--collection", "b", "--semantic-threshold", "0.9")
+        assert result.exit_code != 0
+        assert "--semantic-threshold" in result.stderr
+
+    def test_cache_stats(self):
+        result, _, _ = invoke_run("q", "--cache", "memory", "--collection", "a", "--collection", "b", "--cache-stats")
+        assert result.exit_code == 0, result.output
+        assert "cache: 0 hit(s), 1 miss(es)" in result.stderr
+
+    def test_glob_requires_vector_mode(self):
+        result, _, _ = invoke_run("q", "--collection", "kb_*", "--mode", "lexical")
+        assert result.exit_code != 0
+        assert "--mode vector" in result.stderr
+
+
+# ── timeouts, deadline and retries ────────────────────────────────────────────
+
+class TestRunResilience:
+    def invoke(self, *args, search_effect):
+        runner = CliRunner(mix_stderr=False)
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls, \
+             patch("kb.resilience.time.sleep"):
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(
+                data=[MagicMock(embedding=FAKE_EMBEDDING)]
+            )
+            mock_qdrant_cls.return_value.search.side_effect = search_effect
+            result = runner.invoke(cli, ["run", "q", "--cache", "off", *args],
+                                   env={"OPENAI_API_KEY": "sk-test", "KB_SEARCH_DAEMON_URL": NO_DAEMON_URL},
+                                   catch_exceptions=False)
+        return result, mock_openai_cls, mock_qdrant_cls
+
+    def test_transient_error_is_retried(self):
+        result, _, mock_qdrant_cls = self.invoke("--timings", "json",
+                                                 search_effect=[ConnectionError("reset"), [make_hit()]])
+        assert result.exit_code == 0, result.output
+        assert "Test Video" in result.stdout
+        assert mock_qdrant_cls.return_value.search.call_count == 2
+        import json
+        assert json.loads(result.stderr)["counters"]["retries"] == 1
+
+    def test_retries_zero_fails_fast(self):
+        result, _, mock_qdrant_cls = self.invoke("--retries", "0", search_effect=[ConnectionError("reset")])
+        assert result.exit_code != 0
+        assert "Failed to search Qdrant: reset" in result.stderr
+        assert mock_qdrant_cls.return_value.search.call_count == 1
+
+    def test_timeout_and_deadline(self):
+        result, mock_openai_cls, mock_qdrant_cls = self.invoke("--timeout", "5", "--deadline", "2",
+                                                               search_effect=[[make_hit()]])
+        assert result.exit_code == 0, result.output
+        # Clients are built with the deadline, so the transport gives up in time too
+        assert mock_openai_cls.call_args.kwargs["timeout"] == 2
+        assert mock_qdrant_cls.call_args.kwargs["timeout"] == 2
+        assert mock_qdrant_cls.return_value.search.call_args.kwargs["timeout"] == 2
+        assert mock_openai_cls.return_value.embeddings.create.call_args.kwargs["timeout"] <= 0.8
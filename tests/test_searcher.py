@@ -1,7 +1,20 @@
+import asyncio
+import threading
+import time
+
 import pytest
-from unittest.mock import MagicMock, patch, call
+from unittest.mock import AsyncMock, MagicMock, call, patch
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    Distance, FieldCondition, Filter, MatchValue, PayloadSelectorExclude, PointStruct, VectorParams,
+)
 
-from kb.searcher import search
+from kb.cache import EmbeddingCache, MemoryCache, ResultCache
+from kb.searcher import (
+    SearchHit, asearch, asearch_many, build_search_params, iter_search, parse_fields, resolve_collections, search,
+    search_collections, search_many,
+)
+from kb.timings import Timings
 
 
 # ── helpers ───────────────────────────────────────────────────────────────────
@@ -33,10 +46,11 @@ def make_openai_mock(embedding=None):
     return mock
 
 
-def make_qdrant_hit(score=0.87, payload=None):
+def make_qdrant_hit(score=0.87, payload=None, id=1):
     if payload is None:
         payload = SAMPLE_PAYLOAD
     hit = MagicMock()
+    hit.id = id
     hit.score = score
     hit.payload = payload
     return hit
@@ -66,6 +80,7 @@ class TestSearch:
         assert len(results) == 1
         assert "score" in results[0]
         assert "payload" in results[0]
+        assert results[0]["id"] == 1
         assert results[0]["score"] == pytest.approx(0.87)
 
     def test_embeds_query_with_correct_model(self):
@@ -100,7 +115,6 @@ class TestSearch:
         assert call_kwargs.get("query_filter") is None
 
     def test_channel_filter_passed_to_qdrant(self):
-        from qdrant_client.models import Filter, FieldCondition, MatchValue
         qdrant = make_qdrant_mock()
         openai_client = make_openai_mock()
         search("query", qdrant, openai_client, "kb", top_k=5, channel_slug="testchannel")
@@ -111,7 +125,6 @@ class TestSearch:
         assert isinstance(query_filter, Filter)
 
     def test_channel_filter_targets_channel_slug_field(self):
-        from qdrant_client.models import Filter, FieldCondition, MatchValue
         qdrant = make_qdrant_mock()
         openai_client = make_openai_mock()
         search("query", qdrant, openai_client, "kb", top_k=5, channel_slug="testchannel")
@@ -145,3 +158,426 @@ class TestSearch:
         openai_client = make_openai_mock()
         results = search("query", qdrant, openai_client, "kb", top_k=5)
         assert results == []
+
+
+# ── embedding cache ───────────────────────────────────────────────────────────
+
+class TestSearchEmbeddingCache:
+    def test_cache_miss_embeds_and_stores(self):
+        cache = EmbeddingCache(MemoryCache())
+        openai_client = make_openai_mock()
+        search("query", make_qdrant_mock(), openai_client, "kb", top_k=5, embedding_cache=cache)
+        openai_client.embeddings.create.assert_called_once()
+        assert cache.get("text-embedding-3-small", "query") is not None
+
+    def test_cache_hit_skips_embedding_call(self):
+        cache = EmbeddingCache(MemoryCache())
+        cache.put("text-embedding-3-small", "query", FAKE_EMBEDDING)
+        openai_client = make_openai_mock()
+        qdrant = make_qdrant_mock()
+        search("query", qdrant, openai_client, "kb", top_k=5, embedding_cache=cache)
+        openai_client.embeddings.create.assert_not_called()
+        assert qdrant.search.call_args.kwargs["query_vector"] == pytest.approx(FAKE_EMBEDDING)
+
+    def test_embedding_failure_raises_runtime_error(self):
+        openai_client = make_openai_mock()
+        openai_client.embeddings.create.side_effect = Exception("boom")
+        with pytest.raises(RuntimeError, match="Failed to get embedding"):
+            search("query", make_qdrant_mock(), openai_client, "kb", top_k=5)
+
+
+# ── search_many ───────────────────────────────────────────────────────────────
+
+def make_batch_openai_mock():
+    mock = MagicMock()
+    mock.embeddings.create.side_effect = lambda model, input: MagicMock(
+        data=[MagicMock(embedding=[float(i)] * 4) for i, _ in enumerate(input)]
+    )
+    return mock
+
+
+def make_batch_qdrant_mock():
+    mock = MagicMock()
+    mock.search_batch.side_effect = lambda collection_name, requests: [
+        [make_qdrant_hit(score=r.vector[0])] for r in requests
+    ]
+    return mock
+
+
+class TestSearchMany:
+    def test_yields_results_in_input_order(self):
+        results = list(search_many(["a", "b", "c"], make_batch_qdrant_mock(), make_batch_openai_mock(), "kb", top_k=5))
+        assert [r[0]["score"] for r in results] == [0.0, 1.0, 2.0]
+
+    def test_embeds_in_chunks(self):
+        openai_client = make_batch_openai_mock()
+        list(search_many(["a", "b", "c"], make_batch_qdrant_mock(), openai_client, "kb", top_k=5, batch_size=2))
+        inputs = [c.kwargs["input"] for c in openai_client.embeddings.create.call_args_list]
+        assert inputs == [["a", "b"], ["c"]]
+
+    def test_uses_search_batch(self):
+        qdrant = make_batch_qdrant_mock()
+        list(search_many(["a", "b"], qdrant, make_batch_openai_mock(), "kb", top_k=5))
+        qdrant.search_batch.assert_called_once()
+        qdrant.search.assert_not_called()
+        assert qdrant.search_batch.call_args.kwargs["collection_name"] == "kb"
+
+    def test_per_query_overrides(self):
+        qdrant = make_batch_qdrant_mock()
+        specs = [{"query": "a", "top_k": 2, "channel_slug": "chan"}, "b"]
+        list(search_many(specs, qdrant, make_batch_openai_mock(), "kb", top_k=5))
+        requests = qdrant.search_batch.call_args.kwargs["requests"]
+        assert requests[0].limit == 2
+        assert requests[0].filter.must[0].match.value == "chan"
+        assert requests[1].limit == 5
+        assert requests[1].filter is None
+
+    def test_duplicate_queries_embedded_once(self):
+        openai_client = make_batch_openai_mock()
+        results = list(search_many(["a", "a"], make_batch_qdrant_mock(), openai_client, "kb", top_k=5))
+        assert openai_client.embeddings.create.call_args.kwargs["input"] == ["a"]
+        assert len(results) == 2
+
+    def test_qdrant_failure_raises_runtime_error(self):
+        qdrant = MagicMock()
+        qdrant.search_batch.side_effect = Exception("down")
+        with pytest.raises(RuntimeError, match="Failed to search Qdrant"):
+            list(search_many(["a"], qdrant, make_batch_openai_mock(), "kb", top_k=5))
+
+
+# ── asearch ───────────────────────────────────────────────────────────────────
+
+def make_async_openai_mock(embedding=None):
+    mock = MagicMock()
+    mock.embeddings.create = AsyncMock(
+        return_value=MagicMock(data=[MagicMock(embedding=embedding or [1.0, 0.0, 0.0, 0.0])])
+    )
+    return mock
+
+
+def make_memory_qdrant():
+    async def seed():
+        client = AsyncQdrantClient(":memory:")
+        await client.create_collection("kb", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+        await client.upsert("kb", points=[
+            PointStruct(id=1, vector=[1.0, 0.0, 0.0, 0.0], payload={**SAMPLE_PAYLOAD, "channel_slug": "a"}),
+            PointStruct(id=2, vector=[0.9, 0.1, 0.0, 0.0], payload={**SAMPLE_PAYLOAD, "channel_slug": "b"}),
+            PointStruct(id=3, vector=[0.0, 1.0, 0.0, 0.0], payload={**SAMPLE_PAYLOAD, "channel_slug": "a"}),
+        ])
+        return client
+
+    return asyncio.run(seed())
+
+
+class TestAsearch:
+    def test_returns_ranked_results(self):
+        qdrant = make_memory_qdrant()
+        results = asyncio.run(asearch("q", qdrant, make_async_openai_mock(), "kb", top_k=2))
+        assert len(results) == 2
+        assert results[0]["score"] == pytest.approx(1.0)
+        assert results[0]["payload"]["video_id"] == "abc123"
+
+    def test_channel_filter(self):
+        qdrant = make_memory_qdrant()
+        results = asyncio.run(asearch("q", qdrant, make_async_openai_mock(), "kb", top_k=5, channel_slug="b"))
+        assert [r["payload"]["channel_slug"] for r in results] == ["b"]
+
+    def test_embedding_failure_raises_runtime_error(self):
+        openai_client = make_async_openai_mock()
+        openai_client.embeddings.create.side_effect = Exception("boom")
+        with pytest.raises(RuntimeError, match="Failed to get embedding"):
+            asyncio.run(asearch("q", make_memory_qdrant(), openai_client, "kb", top_k=5))
+
+    def test_qdrant_failure_raises_runtime_error(self):
+        with pytest.raises(RuntimeError, match="Failed to search Qdrant"):
+            asyncio.run(asearch("q", make_memory_qdrant(), make_async_openai_mock(), "missing", top_k=5))
+
+
+class TestAsearchMany:
+    def test_results_in_input_order(self):
+        qdrant = make_memory_qdrant()
+        specs = ["q1", {"query": "q2", "channel_slug": "b"}, {"query": "q3", "top_k": 1}]
+        results = asyncio.run(asearch_many(specs, qdrant, make_async_openai_mock(), "kb", top_k=3))
+        assert [len(r) for r in results] == [3, 1, 1]
+        assert results[1][0]["payload"]["channel_slug"] == "b"
+
+    def test_concurrency_is_bounded(self):
+        in_flight = 0
+        peak = 0
+
+        async def slow_embed(model, input):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return MagicMock(data=[MagicMock(embedding=[1.0, 0.0, 0.0, 0.0])])
+
+        openai_client = MagicMock()
+        openai_client.embeddings.create = AsyncMock(side_effect=slow_embed)
+        qdrant = make_memory_qdrant()
+        asyncio.run(asearch_many([f"q{i}" for i in range(10)], qdrant, openai_client, "kb", top_k=1, concurrency=3))
+        assert peak == 3
+
+
+# ── payload projection ────────────────────────────────────────────────────────
+
+class TestParseFields:
+    def test_none_and_all_select_everything(self):
+        assert parse_fields(None) is True
+        assert parse_fields("all") is True
+
+    def test_none_keyword_selects_nothing(self):
+        assert parse_fields("none") is False
+
+    def test_include_list(self):
+        assert parse_fields("title, text") == ["title", "text"]
+
+    def test_exclude_list(self):
+        assert parse_fields("-text,-title") == PayloadSelectorExclude(exclude=["text", "title"])
+
+    def test_mixed_raises(self):
+        with pytest.raises(ValueError):
+            parse_fields("title,-text")
+
+
+class TestSearchPayloadProjection:
+    def test_defaults_to_full_payload_without_vectors(self):
+        qdrant = make_qdrant_mock()
+        search("query", qdrant, make_openai_mock(), "kb", top_k=5)
+        call_kwargs = qdrant.search.call_args.kwargs
+        assert call_kwargs["with_payload"] is True
+        assert call_kwargs["with_vectors"] is False
+
+    def test_selector_passed_to_qdrant(self):
+        qdrant = make_qdrant_mock()
+        search("query", qdrant, make_openai_mock(), "kb", top_k=5, with_payload=["title"])
+        assert qdrant.search.call_args.kwargs["with_payload"] == ["title"]
+
+    def test_memory_qdrant_returns_only_selected_fields(self):
+        qdrant = QdrantClient(":memory:")
+        qdrant.create_collection("kb", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+        qdrant.upsert("kb", points=[PointStruct(id=1, vector=[1.0, 0.0, 0.0, 0.0], payload=SAMPLE_PAYLOAD)])
+        results = search("q", qdrant, make_openai_mock([1.0, 0.0, 0.0, 0.0]), "kb", top_k=1,
+                         with_payload=["title", "text"])
+        assert results[0]["payload"] == {"title": SAMPLE_PAYLOAD["title"], "text": SAMPLE_PAYLOAD["text"]}
+
+    def test_no_payload_returns_empty_dict(self):
+        hit = make_qdrant_hit()
+        hit.payload = None
+        results = search("q", make_qdrant_mock([hit]), make_openai_mock(), "kb", top_k=1, with_payload=False)
+        assert results[0]["payload"] == {}
+
+
+# ── result cache ──────────────────────────────────────────────────────────────
+
+class TestSearchResultCache:
+    def make_cache(self, tmp_path):
+        return ResultCache(MemoryCache(), version_dir=str(tmp_path))
+
+    def test_hit_skips_embedding_and_qdrant(self, tmp_path):
+        cache = self.make_cache(tmp_path)
+        qdrant = make_qdrant_mock()
+        qdrant.get_collection.return_value.points_count = 5
+        search("q", qdrant, make_openai_mock(), "kb", top_k=5, result_cache=cache)
+        openai_client = make_openai_mock()
+        qdrant.search.reset_mock()
+        results = search("q", qdrant, openai_client, "kb", top_k=5, result_cache=cache)
+        openai_client.embeddings.create.assert_not_called()
+        qdrant.search.assert_not_called()
+        assert results[0]["cached"] is True
+        assert results[0]["payload"] == SAMPLE_PAYLOAD
+
+    def test_collection_change_invalidates(self, tmp_path):
+        cache = self.make_cache(tmp_path)
+        cache.version_check_interval = 0
+        qdrant = make_qdrant_mock()
+        qdrant.get_collection.return_value.points_count = 5
+        search("q", qdrant, make_openai_mock(), "kb", top_k=5, result_cache=cache)
+        qdrant.get_collection.return_value.points_count = 6
+        results = search("q", qdrant, make_openai_mock(), "kb", top_k=5, result_cache=cache)
+        assert qdrant.search.call_count == 2
+        assert "cached" not in results[0]
+
+
+# ── iter_search ───────────────────────────────────────────────────────────────
+
+def make_paged_qdrant_mock(total):
+    """Qdrant mock serving `total` ranked hits through offset/limit."""
+    mock = MagicMock()
+
+    def page(collection_name, query_vector, limit, offset, **kwargs):
+        return [make_qdrant_hit(score=1.0 - i / 1000, id=i) for i in range(offset, min(offset + limit, total))]
+
+    mock.search.side_effect = page
+    return mock
+
+
+class TestIterSearch:
+    def test_yields_compact_hits(self):
+        hits = list(iter_search("q", make_paged_qdrant_mock(3), make_openai_mock(), "kb", top_k=3))
+        assert all(isinstance(h, SearchHit) for h in hits)
+        assert not hasattr(hits[0], "__dict__")
+        assert [h.id for h in hits] == [0, 1, 2]
+
+    def test_pages_with_offset_and_limit(self):
+        qdrant = make_paged_qdrant_mock(1000)
+        hits = list(iter_search("q", qdrant, make_openai_mock(), "kb", top_k=250, page_size=100, offset=10))
+        assert len(hits) == 250
+        assert hits[0].id == 10
+        pages = [(c.kwargs["offset"], c.kwargs["limit"]) for c in qdrant.search.call_args_list]
+        assert pages == [(10, 100), (110, 100), (210, 50)]
+
+    def test_stops_when_results_run_out(self):
+        qdrant = make_paged_qdrant_mock(150)
+        hits = list(iter_search("q", qdrant, make_openai_mock(), "kb", top_k=500, page_size=100))
+        assert len(hits) == 150
+        assert qdrant.search.call_count == 2
+
+    def test_is_lazy(self):
+        qdrant = make_paged_qdrant_mock(1000)
+        openai_client = make_openai_mock()
+        hits = iter_search("q", qdrant, openai_client, "kb", top_k=1000, page_size=100)
+        next(hits)
+        assert qdrant.search.call_count == 1
+        openai_client.embeddings.create.assert_called_once()
+
+    def test_qdrant_failure_raises_runtime_error(self):
+        qdrant = MagicMock()
+        qdrant.search.side_effect = Exception("down")
+        with pytest.raises(RuntimeError, match="Failed to search Qdrant"):
+            list(iter_search("q", qdrant, make_openai_mock(), "kb", top_k=5))
+
+
+# ── search params ─────────────────────────────────────────────────────────────
+
+class TestBuildSearchParams:
+    def test_no_options_uses_server_defaults(self):
+        assert build_search_params() is None
+
+    def test_preset(self):
+        params = build_search_params("fast")
+        assert params.hnsw_ef == 32
+        assert params.quantization is None
+
+    def test_oversampling_enables_rescoring(self):
+        params = build_search_params("accurate")
+        assert params.quantization.rescore is True
+        assert params.quantization.oversampling == 2.0
+
+    def test_raw_values_override_preset(self):
+        params = build_search_params("fast", hnsw_ef=64, exact=True)
+        assert params.hnsw_ef == 64
+        assert params.exact is True
+
+    def test_unknown_preset(self):
+        with pytest.raises(ValueError, match="Unknown preset"):
+            build_search_params("turbo")
+
+
+class TestSearchParamsPassthrough:
+    def test_search_passes_params_and_threshold(self):
+        qdrant = make_qdrant_mock()
+        params = build_search_params("balanced")
+        search("q", qdrant, make_openai_mock(), "kb", top_k=5, search_params=params, score_threshold=0.5)
+        kwargs = qdrant.search.call_args.kwargs
+        assert kwargs["search_params"] is params
+        assert kwargs["score_threshold"] == 0.5
+
+    def test_params_are_part_of_result_cache_key(self, tmp_path):
+        cache = ResultCache(MemoryCache(), version_dir=str(tmp_path))
+        qdrant = make_qdrant_mock()
+        qdrant.get_collection.return_value.points_count = 5
+        search("q", qdrant, make_openai_mock(), "kb", top_k=5, result_cache=cache)
+        search("q", qdrant, make_openai_mock(), "kb", top_k=5, result_cache=cache,
+               search_params=build_search_params(exact=True))
+        assert qdrant.search.call_count == 2
+
+
+# ── timings ───────────────────────────────────────────────────────────────────
+
+class TestSearchTimings:
+    def test_records_stages_and_counters(self):
+        timings = Timings()
+        qdrant = make_qdrant_mock([make_qdrant_hit(), make_qdrant_hit(id=2)])
+        search("q", qdrant, make_openai_mock(), "kb", top_k=5, timings=timings)
+        assert list(timings.stages) == ["embed", "filter", "qdrant"]
+        assert timings.counters["hits"] == 2
+        assert timings.counters["payload_bytes"] > 0
+
+    def test_result_cache_hit(self, tmp_path):
+        cache = ResultCache(MemoryCache(), version_dir=str(tmp_path))
+        qdrant = make_qdrant_mock()
+        qdrant.get_collection.return_value.points_count = 5
+        search("q", qdrant, make_openai_mock(), "kb", top_k=5, result_cache=cache)
+        timings = Timings()
+        search("q", qdrant, make_openai_mock(), "kb", top_k=5, result_cache=cache, timings=timings)
+        assert list(timings.stages) == ["result_cache"]
+        assert timings.counters == {"result_cache_hits": 1, "hits": 1}
+
+
+# ── multi-collection fan-out ──────────────────────────────────────────────────
+
+def make_collections_qdrant():
+    client = QdrantClient(":memory:")
+    vectors = {
+        "kb_youtube": [[1.0, 0.0, 0.0], [0.6, 0.8, 0.0]],
+        "kb_podcasts": [[0.9, 0.1, 0.0], [0.0, 1.0, 0.0]],
+        "docs": [[0.8, 0.0, 0.6]],
+    }
+    for name, points in vectors.items():
+        client.create_collection(name, vectors_config=VectorParams(size=3, distance=Distance.COSINE))
+        client.upsert(name, points=[
+            PointStruct(id=i, vector=v, payload={"title": f"{name} {i}"}) for i, v in enumerate(points)
+        ])
+    return client
+
+
+class TestResolveCollections:
+    def test_plain_names_kept_without_listing(self):
+        qdrant = MagicMock()
+        assert resolve_collections(qdrant, ["a", "b", "a"]) == ["a", "b"]
+        qdrant.get_collections.assert_not_called()
+
+    def test_glob(self):
+        assert resolve_collections(make_collections_qdrant(), ["kb_*", "docs"]) == [
+            "kb_podcasts", "kb_youtube", "docs",
+        ]
+
+    def test_glob_without_match(self):
+        with pytest.raises(ValueError, match="No collection matches"):
+            resolve_collections(make_collections_qdrant(), ["nope_*"])
+
+
+class TestSearchCollections:
+    def test_merges_global_top_k_with_source(self):
+        results = search_collections("q", make_collections_qdrant(), make_openai_mock([1.0, 0.0, 0.0]),
+                                     ["kb_youtube", "kb_podcasts", "docs"], top_k=3)
+        assert [(r["collection"], r["id"]) for r in results] == [
+            ("kb_youtube", 0), ("kb_podcasts", 0), ("docs", 0),
+        ]
+        assert results[0]["score"] >= results[1]["score"] >= results[2]["score"]
+
+    def test_embeds_once(self):
+        openai_client = make_openai_mock([1.0, 0.0, 0.0])
+        search_collections("q", make_collections_qdrant(), openai_client, ["kb_youtube", "docs"], top_k=2)
+        openai_client.embeddings.create.assert_called_once()
+
+    def test_collections_searched_concurrently(self):
+        barrier = threading.Barrier(3, timeout=2)
+        qdrant = MagicMock()
+
+        def slow_search(collection_name, **kwargs):
+            barrier.wait()  # only passes if all three searches are in flight at once
+            time.sleep(0.05)
+            return [make_qdrant_hit(id=collection_name)]
+
+        qdrant.search.side_effect = slow_search
+        results = search_collections("q", qdrant, make_openai_mock(), ["a", "b", "c"], top_k=5)
+        assert sorted(r["collection"] for r in results) == ["a", "b", "c"]
+
+    def test_failure_names_collection(self):
+        qdrant = MagicMock()
+        qdrant.search.side_effect = Exception("down")
+        with pytest.raises(RuntimeError, match="collection b"):
+            search_collections("q", qdrant, make_openai_mock(), ["b"], top_k=5)
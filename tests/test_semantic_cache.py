@@ -0,0 +1,302 @@
+import os
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+from kb.searcher import search
+from kb.semantic_cache import SemanticCache
+from kb.server import SearchService
+from kb.timings import Timings
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+KEY = SemanticCache.key("text-embedding-3-small", "kb", None, 5, True)
+RESULTS = [{"id": 1, "score": 0.9, "payload": {"title": "Video"}}]
+
+
+def near(vector, angle):
+    """Vector rotated by angle (radians) from vector within its first two axes."""
+    x, y, *rest = vector
+    return [x * np.cos(angle) - y * np.sin(angle), x * np.sin(angle) + y * np.cos(angle), *rest]
+
+
+BASE = [1.0, 0.0, 0.5, 0.25]
+
+
+def make_cache(**kwargs):
+    return SemanticCache(version_dir="/nonexistent", **kwargs)
+
+
+def make_qdrant(points_count=10):
+    hit = MagicMock()
+    hit.id = 1
+    hit.score = 0.9
+    hit.payload = {"title": "Video"}
+    qdrant = MagicMock()
+    qdrant.search.return_value = [hit]
+    qdrant.get_collection.return_value.points_count = points_count
+    return qdrant
+
+
+def make_openai(vectors):
+    """Embeddings client returning vectors[query] for each query."""
+    client = MagicMock()
+    client.embeddings.create.side_effect = lambda model, input, **kw: MagicMock(data=[MagicMock(embedding=vectors[input])])
+    return client
+
+
+# ── lookup ────────────────────────────────────────────────────────────────────
+
+class TestLookup:
+    def test_near_duplicate_hits(self):
+        cache = make_cache(threshold=0.95)
+        cache.put(BASE, KEY, "v1", "jak funguje dopamin", RESULTS)
+        match = cache.get(near(BASE, 0.1), KEY, "v1")
+        assert match["results"] == RESULTS
+        assert match["query"] == "jak funguje dopamin"
+        assert match["similarity"] == pytest.approx(0.9958, abs=1e-3)
+
+    def test_scale_does_not_matter(self):
+        cache = make_cache()
+        cache.put(BASE, KEY, "v1", "q", RESULTS)
+        assert cache.get([3 * x for x in BASE], KEY, "v1") is not None
+
+    def test_below_threshold_misses(self):
+        cache = make_cache(threshold=0.95)
+        cache.put(BASE, KEY, "v1", "q", RESULTS)
+        assert cache.get(near(BASE, 0.5), KEY, "v1") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_closest_entry_wins(self):
+        cache = make_cache(threshold=0.9)
+        cache.put(near(BASE, 0.3), KEY, "v1", "far", RESULTS)
+        cache.put(near(BASE, 0.05), KEY, "v1", "close", RESULTS)
+        assert cache.get(BASE, KEY, "v1")["query"] == "close"
+
+    def test_other_partition_misses(self):
+        cache = make_cache()
+        cache.put(BASE, KEY, "v1", "q", RESULTS)
+        assert cache.get(BASE, SemanticCache.key("text-embedding-3-small", "kb", "hubermanlab", 5, True), "v1") is None
+        assert cache.get(BASE, SemanticCache.key("text-embedding-3-small", "other", None, 5, True), "v1") is None
+
+    def test_other_dimension_is_ignored(self):
+        cache = make_cache()
+        cache.put(BASE, KEY, "v1", "q", RESULTS)
+        cache.put([1.0, 0.0], KEY, "v1", "short", RESULTS)
+        assert cache.get([1.0, 0.0], KEY, "v1") is None
+        assert len(cache) == 1
+
+    def test_invalid_settings(self):
+        with pytest.raises(ValueError):
+            make_cache(threshold=0)
+        with pytest.raises(ValueError):
+            make_cache(max_entries=0)
+
+
+# ── staleness / eviction ──────────────────────────────────────────────────────
+
+class TestStaleness:
+    def test_version_change_is_stale(self):
+        cache = make_cache()
+        cache.put(BASE, KEY, "v1", "q", RESULTS)
+        assert cache.get(BASE, KEY, "v2") is None
+        assert cache.stats()["stale"] == 1
+        assert len(cache) == 0
+
+    def test_expired_entry_is_stale(self, monkeypatch):
+        cache = make_cache(max_age=10)
+        cache.put(BASE, KEY, "v1", "q", RESULTS)
+        monkeypatch.setattr("kb.semantic_cache.time.time", lambda: 1e12)
+        assert cache.get(BASE, KEY, "v1") is None
+        assert cache.stats()["stale"] == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = make_cache(max_entries=2, threshold=0.99)
+        a, b, c = near(BASE, 0.0), near(BASE, 1.0), near(BASE, 2.0)
+        cache.put(a, KEY, "v1", "a", RESULTS)
+        cache.put(b, KEY, "v1", "b", RESULTS)
+        cache.get(a, KEY, "v1")
+        cache.put(c, KEY, "v1", "c", RESULTS)
+        assert cache.get(b, KEY, "v1") is None
+        assert cache.get(a, KEY, "v1")["query"] == "a"
+        assert cache.stats()["evictions"] == 1 and len(cache) == 2
+
+    def test_version_from_point_count(self):
+        cache = make_cache(version_check_interval=60)
+        qdrant = make_qdrant(points_count=10)
+        assert cache.collection_version(qdrant, "kb") == "points:10"
+        qdrant.get_collection.return_value.points_count = 11
+        # Re-read at most once per version_check_interval
+        assert cache.collection_version(qdrant, "kb") == "points:10"
+        assert qdrant.get_collection.call_count == 1
+
+    def test_stats(self):
+        cache = make_cache()
+        cache.put(BASE, KEY, "v1", "q", RESULTS)
+        cache.get(BASE, KEY, "v1")
+        cache.get(near(BASE, 1.0), KEY, "v1")
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+        assert stats["entries"] == 1
+        assert stats["mean_hit_similarity"] == pytest.approx(1.0)
+        assert stats["max_hit_age_s"] >= 0
+
+    def test_hit_metrics_are_running_totals(self):
+        cache = make_cache()
+        cache.put(BASE, KEY, "v1", "q", RESULTS)
+        similarity = cache.get(near(BASE, 0.1), KEY, "v1")["similarity"]
+        for _ in range(99):
+            cache.get(BASE, KEY, "v1")
+        stats = cache.stats()
+        assert stats["hits"] == 100
+        assert stats["mean_hit_similarity"] == pytest.approx((similarity + 99) / 100, abs=1e-4)
+        assert stats["max_hit_age_s"] >= stats["mean_hit_age_s"] >= 0
+
+
+# ── persistence ───────────────────────────────────────────────────────────────
+
+class TestPersistence:
+    def test_roundtrip(self, tmp_path):
+        path = str(tmp_path / "semantic.npz")
+        cache = make_cache(path=path)
+        cache.put(BASE, KEY, "v1", "jak funguje dopamin", RESULTS)
+        cache.get(BASE, KEY, "v1")
+        cache.save()
+        assert not cache.dirty
+        loaded = SemanticCache.load(path, version_dir="/nonexistent")
+        assert loaded.get(near(BASE, 0.1), KEY, "v1")["query"] == "jak funguje dopamin"
+        # Counters carry over, so hit rates cover all runs
+        assert loaded.stats()["hits"] == 2
+        assert loaded._entries[0]["created_at"] == cache._entries[0]["created_at"]
+
+    def test_hit_is_saved(self, tmp_path):
+        path = str(tmp_path / "semantic.npz")
+        cache = make_cache(path=path, max_entries=2, threshold=0.99)
+        cache.put(near(BASE, 0.0), KEY, "v1", "a", RESULTS)
+        cache.put(near(BASE, 1.0), KEY, "v1", "b", RESULTS)
+        cache.save()
+        cache.get(near(BASE, 0.0), KEY, "v1")
+        assert cache.dirty
+        cache.save()
+        loaded = SemanticCache.load(path, max_entries=2, threshold=0.99, version_dir="/nonexistent")
+        assert loaded.hits == 1
+        # "a" was used last, so "b" is the one evicted
+        loaded.put(near(BASE, 2.0), KEY, "v1", "c", RESULTS)
+        assert loaded.get(near(BASE, 0.0), KEY, "v1")["query"] == "a"
+        assert loaded.get(near(BASE, 1.0), KEY, "v1") is None
+
+    def test_observed_version_is_saved(self, tmp_path):
+        path = str(tmp_path / "semantic.npz")
+        cache = make_cache(path=path, version_check_interval=60)
+        assert cache.collection_version(make_qdrant(points_count=10), "kb") == "points:10"
+        assert cache.dirty
+        cache.save()
+        loaded = SemanticCache.load(path, version_check_interval=60, version_dir="/nonexistent")
+        qdrant = make_qdrant(points_count=11)
+        assert loaded.collection_version(qdrant, "kb") == "points:10"
+        qdrant.get_collection.assert_not_called()
+        expired = SemanticCache.load(path, version_check_interval=0, version_dir="/nonexistent")
+        assert expired.collection_version(qdrant, "kb") == "points:11"
+
+    def test_load_keeps_most_recently_used(self, tmp_path):
+        path = str(tmp_path / "semantic.npz")
+        cache = make_cache(path=path, threshold=0.99)
+        for i, query in enumerate("abc"):
+            cache.put(near(BASE, float(i)), KEY, "v1", query, RESULTS)
+        cache.get(near(BASE, 0.0), KEY, "v1")
+        cache.save()
+        loaded = SemanticCache.load(path, max_entries=2, threshold=0.99, version_dir="/nonexistent")
+        assert loaded.get(near(BASE, 0.0), KEY, "v1")["query"] == "a"
+        assert loaded.get(near(BASE, 2.0), KEY, "v1")["query"] == "c"
+        assert loaded.get(near(BASE, 1.0), KEY, "v1") is None
+
+    def test_missing_or_corrupt_file_starts_empty(self, tmp_path):
+        assert len(SemanticCache.load(str(tmp_path / "missing.npz"))) == 0
+        corrupt = tmp_path / "corrupt.npz"
+        corrupt.write_bytes(b"not a cache")
+        assert len(SemanticCache.load(str(corrupt))) == 0
+
+    def test_overlapping_saves_use_separate_temp_files(self, tmp_path):
+        path = str(tmp_path / "semantic.npz")
+        first, second = make_cache(path=path), make_cache(path=path)
+        first.put(BASE, KEY, "v1", "first", RESULTS)
+        second.put(BASE, KEY, "v1", "second", RESULTS)
+        savez = np.savez
+        calls = []
+
+        def save_second_meanwhile(*args, **kwargs):
+            calls.append(args)
+            # Another run saves while the first one is still writing
+            if len(calls) == 1:
+                second.save()
+            return savez(*args, **kwargs)
+
+        with patch("kb.semantic_cache.np.savez", side_effect=save_second_meanwhile):
+            first.save()
+        assert SemanticCache.load(path, version_dir="/nonexistent").get(BASE, KEY, "v1")["query"] == "first"
+        assert os.listdir(tmp_path) == ["semantic.npz"]
+
+    def test_failed_save_leaves_no_temp_file(self, tmp_path):
+        cache = make_cache(path=str(tmp_path / "semantic.npz"))
+        with patch("kb.semantic_cache.np.savez", side_effect=OSError("disk full")), \
+             pytest.raises(OSError, match="disk full"):
+            cache.save()
+        assert os.listdir(tmp_path) == []
+
+    def test_save_needs_path(self):
+        with pytest.raises(ValueError, match="No path"):
+            make_cache().save()
+
+
+# ── search() ──────────────────────────────────────────────────────────────────
+
+class TestSearchWithSemanticCache:
+    VECTORS = {"jak funguje dopamin": BASE, "jak dopamin funguje": near(BASE, 0.05), "spánek": near(BASE, 1.5)}
+
+    def test_paraphrase_skips_qdrant(self):
+        qdrant = make_qdrant()
+        openai_client = make_openai(self.VECTORS)
+        cache = make_cache()
+        first = search("jak funguje dopamin", qdrant, openai_client, "kb", 5, semantic_cache=cache)
+        timings = Timings()
+        second = search("jak dopamin funguje", qdrant, openai_client, "kb", 5, semantic_cache=cache, timings=timings)
+        assert qdrant.search.call_count == 1
+        assert second == [{**first[0], "cached": True, "cached_query": "jak funguje dopamin"}]
+        assert timings.counters["semantic_cache_hits"] == 1
+
+    def test_unrelated_query_searches(self):
+        qdrant = make_qdrant()
+        cache = make_cache()
+        openai_client = make_openai(self.VECTORS)
+        search("jak funguje dopamin", qdrant, openai_client, "kb", 5, semantic_cache=cache)
+        search("spánek", qdrant, openai_client, "kb", 5, semantic_cache=cache)
+        assert qdrant.search.call_count == 2
+        assert len(cache) == 2
+
+    def test_different_top_k_searches(self):
+        qdrant = make_qdrant()
+        cache = make_cache()
+        openai_client = make_openai(self.VECTORS)
+        search("jak funguje dopamin", qdrant, openai_client, "kb", 5, semantic_cache=cache)
+        search("jak dopamin funguje", qdrant, openai_client, "kb", 10, semantic_cache=cache)
+        assert qdrant.search.call_count == 2
+
+    def test_reindexed_collection_searches(self):
+        qdrant = make_qdrant(points_count=10)
+        cache = make_cache(version_check_interval=0)
+        openai_client = make_openai(self.VECTORS)
+        search("jak funguje dopamin", qdrant, openai_client, "kb", 5, semantic_cache=cache)
+        qdrant.get_collection.return_value.points_count = 12
+        search("jak dopamin funguje", qdrant, openai_client, "kb", 5, semantic_cache=cache)
+        assert qdrant.search.call_count == 2
+        assert cache.stats()["stale"] == 1
+
+    def test_service_reports_stats(self):
+        service = SearchService(make_qdrant(), make_openai(self.VECTORS), "http://localhost:6333",
+                                semantic_cache=make_cache())
+        for query in ("jak funguje dopamin", "jak dopamin funguje"):
+            service.search({"query": query, "collection": "kb", "top_k": 5})
+        assert service.stats()["semantic_cache"]["hits"] == 1
+        assert service.qdrant_client.search.call_count == 1
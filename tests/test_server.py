@@ -0,0 +1,217 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+
+from kb.resilience import DeadlineExceeded, Resilience
+from kb.server import SearchService, make_server, query_daemon
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+QDRANT_URL = "http://localhost:6333"
+
+SAMPLE_PAYLOAD = {
+    "title": "Daemon Video",
+    "transcript_source": "caption",
+    "text": "Served from a warm daemon.",
+    "timestamp_url": "https://youtube.com/watch?v=abc123&t=0s",
+}
+
+
+def make_service():
+    openai_client = MagicMock()
+    openai_client.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.1] * 4)])
+    hit = MagicMock()
+    hit.id = 7
+    hit.score = 0.91
+    hit.payload = SAMPLE_PAYLOAD
+    qdrant_client = MagicMock()
+    qdrant_client.search.return_value = [hit]
+    return SearchService(qdrant_client, openai_client, QDRANT_URL)
+
+
+@pytest.fixture
+def daemon():
+    service = make_service()
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    yield service, f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def search_request(**overrides):
+    return {"query": "q", "collection": "kb", "top_k": 3, "qdrant_url": QDRANT_URL, **overrides}
+
+
+# ── query_daemon ──────────────────────────────────────────────────────────────
+
+class TestQueryDaemon:
+    def test_returns_results(self, daemon):
+        service, url = daemon
+        results = query_daemon(url, search_request())
+        assert results == [{"id": 7, "score": 0.91, "payload": SAMPLE_PAYLOAD}]
+        assert service.qdrant_client.search.call_args.kwargs["limit"] == 3
+
+    def test_unreachable_returns_none(self):
+        assert query_daemon("http://127.0.0.1:9", search_request()) is None
+
+    def test_slow_daemon_raises_deadline_exceeded(self, daemon):
+        service, url = daemon
+        service.qdrant_client.search.side_effect = lambda **kwargs: time.sleep(0.5) or []
+        with pytest.raises(DeadlineExceeded, match="within 0.1s"):
+            query_daemon(url, search_request(), timeout=0.1)
+
+    def test_other_qdrant_returns_none(self, daemon):
+        _, url = daemon
+        assert query_daemon(url, search_request(qdrant_url="http://elsewhere:6333")) is None
+
+    def test_search_failure_raises_runtime_error(self, daemon):
+        service, url = daemon
+        service.qdrant_client.search.side_effect = Exception("qdrant down")
+        with pytest.raises(RuntimeError, match="qdrant down"):
+            query_daemon(url, search_request())
+
+    def test_concurrent_requests(self, daemon):
+        service, url = daemon
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(query_daemon(url, search_request())))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(results) == 8 and all(results)
+        assert service.stats()["requests"] == 8
+
+
+# ── request validation ────────────────────────────────────────────────────────
+
+def post_search(url, body: bytes) -> tuple[int, dict]:
+    request = urllib.request.Request(f"{url}/search", data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+class TestRequestValidation:
+    @pytest.mark.parametrize("body", [
+        b'["query", "collection"]',
+        b"5",
+        b"not json",
+        b'{"query": "q"}',
+        b'{"query": "q", "collection": "kb", "top_k": "x"}',
+        b'{"query": "q", "collection": "kb", "top_k": 0}',
+        b'{"query": "q", "collection": "kb", "score_threshold": "high"}',
+        b'{"query": "q", "collection": "kb", "filter": ["a"]}',
+        b'{"query": 5, "collection": "kb"}',
+    ])
+    def test_invalid_body_is_400(self, daemon, body):
+        service, url = daemon
+        status, response = post_search(url, body)
+        assert status == 400
+        assert response["error"].startswith("Invalid request")
+        service.qdrant_client.search.assert_not_called()
+
+
+# ── stats ─────────────────────────────────────────────────────────────────────
+
+class TestStats:
+    def test_stats_endpoint_reports_counters(self, daemon):
+        _, url = daemon
+        query_daemon(url, search_request())
+        with urllib.request.urlopen(f"{url}/stats") as response:
+            stats = json.loads(response.read())
+        assert stats["requests"] == 1
+        assert stats["errors"] == 0
+        assert stats["p50_ms"] is not None
+
+    def test_errors_counted(self):
+        service = make_service()
+        service.qdrant_client.search.side_effect = Exception("down")
+        with pytest.raises(RuntimeError):
+            service.search(search_request())
+        assert service.stats()["errors"] == 1
+
+
+# ── run via daemon ────────────────────────────────────────────────────────────
+
+class TestRunUsesDaemon:
+    def test_run_uses_daemon_without_building_clients(self, daemon):
+        _, url = daemon
+        runner = CliRunner()
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+            result = runner.invoke(cli, ["run", "q", "--daemon-url", url], env={"OPENAI_API_KEY": ""},
+                                   catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert '#1 [0.91] "Daemon Video"' in result.output
+        mock_openai_cls.assert_not_called()
+        mock_qdrant_cls.assert_not_called()
+
+    def test_no_daemon_flag_searches_in_process(self, daemon):
+        service, url = daemon
+        runner = CliRunner()
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.1])])
+            mock_qdrant_cls.return_value.search.return_value = []
+            runner.invoke(cli, ["run", "q", "--daemon-url", url, "--no-daemon", "--cache", "off"],
+                          env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+        service.qdrant_client.search.assert_not_called()
+        mock_qdrant_cls.return_value.search.assert_called_once()
+
+    def test_slow_daemon_fails_without_local_search(self, daemon):
+        service, url = daemon
+        service.qdrant_client.search.side_effect = lambda **kwargs: time.sleep(0.5) or []
+        with patch("openai.OpenAI") as mock_openai_cls:
+            result = CliRunner().invoke(cli, ["run", "q", "--daemon-url", url, "--deadline", "0.1"],
+                                        env={"OPENAI_API_KEY": "sk-test"})
+        assert result.exit_code == 1
+        assert "Daemon did not answer" in result.output
+        mock_openai_cls.assert_not_called()
+
+    def test_fallback_gets_remaining_deadline(self):
+        with patch("kb.server.query_daemon", side_effect=lambda *args, **kwargs: time.sleep(0.2)), \
+             patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls, \
+             patch("kb.resilience.Resilience", wraps=Resilience) as mock_resilience_cls:
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.1])])
+            mock_qdrant_cls.return_value.search.return_value = []
+            result = CliRunner().invoke(cli, ["run", "q", "--deadline", "5", "--cache", "off"],
+                                        env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        assert mock_resilience_cls.call_args.kwargs["deadline"] <= 4.8
+
+    def test_daemon_attempt_uses_up_deadline(self):
+        with patch("kb.server.query_daemon", side_effect=lambda *args, **kwargs: time.sleep(0.2)), \
+             patch("openai.OpenAI") as mock_openai_cls:
+            result = CliRunner().invoke(cli, ["run", "q", "--deadline", "0.1"], env={"OPENAI_API_KEY": "sk-test"})
+        assert result.exit_code == 1
+        assert "Deadline exceeded" in result.output
+        mock_openai_cls.assert_not_called()
+
+    def test_clear_cache_bypasses_daemon(self, daemon, tmp_path):
+        service, url = daemon
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls:
+            mock_openai_cls.return_value.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.1])])
+            mock_qdrant_cls.return_value.search.return_value = []
+            result = CliRunner().invoke(cli, ["run", "q", "--daemon-url", url, "--clear-cache",
+                                              "--cache-path", str(tmp_path / "cache.sqlite"),
+                                              "--semantic-cache-path", str(tmp_path / "semantic.npz")],
+                                        env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        service.qdrant_client.search.assert_not_called()
+        mock_qdrant_cls.return_value.search.assert_called_once()
@@ -23,8 +23,8 @@ class TestSetupCmd:
         runner = CliRunner()
         env_file = tmp_path / ".env"
 
-        with patch("search.openai.OpenAI") as mock_openai_cls, \
-             patch("search.QdrantClient") as mock_qdrant_cls, \
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls, \
              patch("search.os.path.expanduser", return_value=str(tmp_path)), \
              patch("search.os.makedirs"):
 
@@ -44,8 +44,8 @@ class TestSetupCmd:
     def test_invalid_openai_key_exits_with_1(self, tmp_path):
         runner = CliRunner()
 
-        with patch("search.openai.OpenAI") as mock_openai_cls, \
-             patch("search.QdrantClient") as mock_qdrant_cls, \
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls, \
              patch("search.os.path.expanduser", return_value=str(tmp_path)), \
              patch("search.os.makedirs"):
 
@@ -68,8 +68,8 @@ class TestSetupCmd:
         # Pre-populate with an unrelated key
         env_file.write_text("SOME_OTHER_KEY=keep_me\nOPENAI_API_KEY=old-key\n")
 
-        with patch("search.openai.OpenAI") as mock_openai_cls, \
-             patch("search.QdrantClient") as mock_qdrant_cls, \
+        with patch("openai.OpenAI") as mock_openai_cls, \
+             patch("qdrant_client.QdrantClient") as mock_qdrant_cls, \
              patch("search.os.path.expanduser", return_value=str(tmp_path)), \
              patch("search.os.makedirs"):
 
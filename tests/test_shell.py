@@ -0,0 +1,168 @@
+import random
+import time
+
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from kb.shell import ShellSession
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+DIM = 8
+
+
+def make_collection(name="kb", points=23):
+    rng = random.Random(9)
+    client = QdrantClient(":memory:")
+    client.create_collection(name, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    client.upsert(name, points=[
+        PointStruct(id=i, vector=[rng.gauss(0, 1) for _ in range(DIM)],
+                    payload={"title": f"Video {i}", "channel_slug": "alpha" if i % 2 else "beta",
+                             "text": f"chunk {i}", "timestamp_url": f"https://youtube.com/watch?v={i}"})
+        for i in range(points)
+    ])
+    return client
+
+
+def make_openai_mock():
+    mock = MagicMock()
+    mock.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.3] * DIM)])
+    return mock
+
+
+def make_session(client=None, **kwargs):
+    client = client or make_collection()
+    return ShellSession(client, make_openai_mock(), "kb", **kwargs)
+
+
+def wait_for_prefetch(session):
+    deadline = time.monotonic() + 2
+    while session._prefetch is not None and not session._prefetch.done() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+# ── session ───────────────────────────────────────────────────────────────────
+
+class TestShellSession:
+    def test_pages_follow_full_ranking(self):
+        client = make_collection()
+        session = make_session(client, top=5)
+        pages = [session.search("q")]
+        while True:
+            page, _ = session.next_page()
+            if not page:
+                break
+            pages.append(page)
+        assert [len(p) for p in pages] == [5, 5, 5, 5, 3]
+        ranking = [h.id for h in client.search("kb", [0.3] * DIM, limit=23)]
+        assert [r["id"] for p in pages for r in p] == ranking
+        assert session.shown == 23
+
+    def test_embeds_once_per_query(self):
+        session = make_session(top=5)
+        session.search("q")
+        session.next_page()
+        session.next_page()
+        assert session.openai_client.embeddings.create.call_count == 1
+
+    def test_next_page_is_prefetched(self):
+        client = make_collection()
+        search = MagicMock(side_effect=client.search)
+        client.search = search
+        session = make_session(client, top=5)
+        session.search("q")
+        wait_for_prefetch(session)
+        # The second page was requested in the background, before next_page()
+        assert search.call_count == 2
+        page, prefetched = session.next_page()
+        assert prefetched and len(page) == 5
+        assert search.call_args_list[1].kwargs["offset"] == 5
+
+    def test_next_without_query(self):
+        with pytest.raises(ValueError, match="No previous query"):
+            make_session().next_page()
+
+    def test_changing_channel_resets_paging(self):
+        session = make_session(top=5)
+        session.search("q")
+        session.set_channel("alpha")
+        with pytest.raises(ValueError):
+            session.next_page()
+        results = session.search("q")
+        assert all(r["payload"]["channel_slug"] == "alpha" for r in results)
+
+    def test_set_top_applies_to_next_page(self):
+        session = make_session(top=5)
+        session.search("q")
+        session.next_page()
+        session.set_top(3)
+        wait_for_prefetch(session)
+        # The page prefetched before the change keeps its size
+        assert len(session.next_page()[0]) == 5
+        assert len(session.next_page()[0]) == 3
+        with pytest.raises(ValueError):
+            session.set_top(0)
+
+    def test_search_error_propagates(self):
+        qdrant = MagicMock()
+        qdrant.search.side_effect = Exception("down")
+        session = ShellSession(qdrant, make_openai_mock(), "kb")
+        with pytest.raises(RuntimeError, match="Failed to search Qdrant"):
+            session.search("q")
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+def invoke_shell(lines, client=None, args=()):
+    runner = CliRunner(mix_stderr=False)
+    with patch("openai.OpenAI") as mock_openai_cls, \
+         patch("qdrant_client.QdrantClient", return_value=client or make_collection()):
+        mock_openai_cls.return_value = make_openai_mock()
+        result = runner.invoke(cli, ["shell", "--cache", "off", "--top", "3", *args], input="\n".join(lines) + "\n",
+                               env={"OPENAI_API_KEY": "sk-test"}, catch_exceptions=False)
+    return result, mock_openai_cls
+
+
+class TestShellCommand:
+    def test_search_and_page(self):
+        result, mock_openai_cls = invoke_shell(["dopamin", ":n", ":q"])
+        assert result.exit_code == 0, result.output
+        assert 'Hledám: "dopamin"' in result.stdout
+        assert "#1 [" in result.stdout and "#6 [" in result.stdout and "#7 [" not in result.stdout
+        mock_openai_cls.assert_called_once()
+
+    def test_prompt_shows_timing(self):
+        result, _ = invoke_shell(["dopamin"])
+        assert "kb> " in result.stdout
+        assert " ms]> " in result.stdout
+
+    def test_inline_settings(self):
+        second = make_collection("other")
+        client = make_collection()
+        client.search = MagicMock(side_effect=lambda collection_name, **kw: (
+            client if collection_name == "kb" else second).__class__.search(
+                client if collection_name == "kb" else second, collection_name, **kw))
+        result, _ = invoke_shell([":top 2", ":channel @alpha", "q", ":collection other", "q"], client=client)
+        assert result.exit_code == 0, result.output
+        assert "kb @alpha" in result.stdout and "other @alpha" in result.stdout
+        calls = client.search.call_args_list
+        assert [c.kwargs["collection_name"] for c in calls[:1]] == ["kb"]
+        assert calls[0].kwargs["limit"] == 2
+        assert calls[0].kwargs["query_filter"] is not None
+
+    def test_errors_do_not_end_session(self):
+        result, _ = invoke_shell([":n", ":top x", ":bogus", "q"])
+        assert result.exit_code == 0, result.output
+        assert "Chyba: No previous query" in result.stderr
+        assert "Neznámý příkaz :bogus" in result.stdout
+        assert 'Hledám: "q"' in result.stdout
+
+    def test_requires_api_key(self):
+        result = CliRunner().invoke(cli, ["shell"], env={"OPENAI_API_KEY": ""})
+        assert result.exit_code == 1
+        assert "OPENAI_API_KEY" in result.output
@@ -0,0 +1,131 @@
+import json
+import random
+
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from kb.filters import PayloadFilter
+from kb.searcher import find_point_id, search_by_point
+from search import cli
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+DIM = 8
+CHANNELS = ["alpha", "beta", "gamma"]
+
+
+def make_collection(points=60):
+    rng = random.Random(3)
+    client = QdrantClient(":memory:")
+    client.create_collection("kb", vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    client.upsert("kb", points=[
+        PointStruct(id=i, vector=[rng.gauss(0, 1) for _ in range(DIM)], payload={
+            "title": f"Video {i // 6}",
+            "video_id": f"v{i // 6}",
+            "chunk_index": i % 6,
+            "channel_slug": CHANNELS[i % 3],
+            "text": f"chunk {i}",
+            "timestamp_url": f"https://youtube.com/watch?v=v{i // 6}&t={i % 6 * 30}s",
+        })
+        for i in range(points)
+    ])
+    return client
+
+
+def stored_vector(client, point_id):
+    return client.retrieve("kb", [point_id], with_vectors=True)[0].vector
+
+
+def invoke_similar(client, *args):
+    with patch("openai.OpenAI") as mock_openai_cls, \
+         patch("qdrant_client.QdrantClient", return_value=client):
+        result = CliRunner().invoke(cli, ["similar", "--collection", "kb", *args], env={}, catch_exceptions=False)
+    return result, mock_openai_cls
+
+
+# ── search_by_point ───────────────────────────────────────────────────────────
+
+class TestSearchByPoint:
+    def test_matches_search_with_stored_vector(self):
+        client = make_collection()
+        results = search_by_point(client, "kb", [7], top_k=5)
+        expected = [h.id for h in client.search("kb", stored_vector(client, 7), limit=6) if h.id != 7]
+        assert [r["id"] for r in results] == expected[:5]
+        assert 7 not in [r["id"] for r in results]
+        assert set(results[0]) == {"id", "score", "payload"}
+
+    def test_negative_examples_change_ranking(self):
+        client = make_collection()
+        plain = search_by_point(client, "kb", [7], top_k=5)
+        steered = search_by_point(client, "kb", [7], top_k=5, negative=[plain[0]["id"]])
+        assert plain[0]["id"] not in [r["id"] for r in steered]
+
+    def test_channel_filter(self):
+        client = make_collection()
+        results = search_by_point(client, "kb", [7], top_k=5, channel_slug="alpha")
+        assert results and all(r["payload"]["channel_slug"] == "alpha" for r in results)
+        results = search_by_point(client, "kb", [7], top_k=5, payload_filter=PayloadFilter(channels=("beta", "gamma")))
+        assert all(r["payload"]["channel_slug"] in ("beta", "gamma") for r in results)
+
+    def test_payload_selection(self):
+        results = search_by_point(make_collection(), "kb", [7], top_k=2, with_payload=["title"])
+        assert all(set(r["payload"]) == {"title"} for r in results)
+
+    def test_best_score_strategy(self):
+        qdrant = MagicMock()
+        qdrant.recommend.return_value = []
+        search_by_point(qdrant, "kb", [1, 2], top_k=3, strategy="best_score")
+        assert qdrant.recommend.call_args.kwargs["strategy"].value == "best_score"
+        assert qdrant.recommend.call_args.kwargs["positive"] == [1, 2]
+
+    def test_unknown_point_raises_runtime_error(self):
+        with pytest.raises(RuntimeError, match="Failed to search Qdrant"):
+            search_by_point(make_collection(), "kb", [999], top_k=3)
+
+
+class TestFindPointId:
+    def test_finds_chunk(self):
+        assert find_point_id(make_collection(), "kb", "v2", 3) == 15
+
+    def test_missing_chunk(self):
+        with pytest.raises(ValueError, match="No point with video_id=v2 and chunk_index=9"):
+            find_point_id(make_collection(), "kb", "v2", 9)
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+class TestSimilarCommand:
+    def test_by_point_id_without_openai(self):
+        result, mock_openai_cls = invoke_similar(make_collection(), "7", "--top", "3")
+        assert result.exit_code == 0, result.output
+        assert "Podobné jako: 7" in result.output
+        assert "#3 [" in result.output and "#4 [" not in result.output
+        mock_openai_cls.assert_not_called()
+
+    def test_by_video_and_chunk(self):
+        client = make_collection()
+        result, _ = invoke_similar(client, "--video-id", "v2", "--chunk-index", "3", "--format", "ndjson")
+        assert result.exit_code == 0, result.output
+        ids = [json.loads(line)["id"] for line in result.output.splitlines()]
+        assert ids == [r["id"] for r in search_by_point(client, "kb", [15], top_k=5)]
+
+    def test_channel_and_negative(self):
+        result, _ = invoke_similar(make_collection(), "7", "--channel", "@alpha", "--negative", "9",
+                                   "--format", "ndjson", "--fields", "channel_slug")
+        records = [json.loads(line) for line in result.output.splitlines()]
+        assert records and all(r["payload"] == {"channel_slug": "alpha"} for r in records)
+        assert 9 not in [r["id"] for r in records]
+
+    def test_missing_chunk_is_click_error(self):
+        result, _ = invoke_similar(make_collection(), "--video-id", "nope", "--chunk-index", "0")
+        assert result.exit_code == 1
+        assert "No point with video_id=nope" in result.output
+
+    @pytest.mark.parametrize("args", [[], ["--video-id", "v1"], ["--chunk-index", "2"]])
+    def test_requires_an_example(self, args):
+        result = CliRunner().invoke(cli, ["similar", *args])
+        assert result.exit_code == 2
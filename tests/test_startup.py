@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time allowed for a cold `kb-search <subcommand> --help`.
+STARTUP_BUDGET_MS = float(os.environ.get("KB_SEARCH_STARTUP_BUDGET_MS", "150"))
+
+HEAVY_MODULES = ("openai", "qdrant_client", "pydantic", "httpx", "grpc", "numpy")
+
+SUBCOMMANDS = [[], ["run"], ["similar"], ["shell"], ["batch"], ["eval-presets"], ["export"], ["lexical-index"], ["backfill-short"], ["ensure-indexes"], ["serve"], ["check"], ["setup"]]
+
+
+def import_times(*args) -> list[tuple[str, int, bool]]:
+    """Run search.py in a fresh interpreter with -X importtime; return (module, cumulative µs, top-level)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "search.py", *args, "--help"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        # Nested imports are indented below the module that triggered them
+        times.append((name.strip(), int(cumulative), not name.startswith("  ")))
+    return times
+
+
+# ── tests ─────────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("args", SUBCOMMANDS, ids=lambda a: " ".join(a) or "cli")
+class TestStartup:
+    def test_no_heavy_imports(self, args):
+        heavy = [name for name, _, _ in import_times(*args) if name.split(".")[0] in HEAVY_MODULES]
+        assert heavy == []
+
+    def test_within_budget(self, args):
+        total_ms = sum(us for _, us, top_level in import_times(*args) if top_level) / 1000
+        assert total_ms <= STARTUP_BUDGET_MS, f"imports took {total_ms:.1f} ms"
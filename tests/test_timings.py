@@ -0,0 +1,50 @@
+import pytest
+
+from kb.timings import NULL_TIMINGS, Timings
+
+
+# ── Timings ───────────────────────────────────────────────────────────────────
+
+class TestTimings:
+    def test_stages_accumulate(self):
+        timings = Timings()
+        with timings.stage("embed"):
+            pass
+        with timings.stage("embed"):
+            pass
+        assert list(timings.stages) == ["embed"]
+        assert timings.stages["embed"] >= 0
+
+    def test_stage_recorded_on_exception(self):
+        timings = Timings()
+        with pytest.raises(ValueError):
+            with timings.stage("qdrant"):
+                raise ValueError("boom")
+        assert "qdrant" in timings.stages
+
+    def test_hooks_receive_spans(self):
+        spans = []
+        timings = Timings(hooks=[lambda name, start, seconds: spans.append((name, seconds))])
+        with timings.stage("filter"):
+            pass
+        assert [name for name, _ in spans] == ["filter"]
+        assert spans[0][1] == timings.stages["filter"]
+
+    def test_as_dict(self):
+        timings = Timings()
+        timings.stages = {"embed": 0.010, "qdrant": 0.0025}
+        timings.count("hits", 3)
+        timings.count("hits")
+        assert timings.as_dict() == {
+            "stages_ms": {"embed": 10.0, "qdrant": 2.5},
+            "total_ms": 12.5,
+            "counters": {"hits": 4},
+        }
+
+
+class TestNullTimings:
+    def test_records_nothing(self):
+        with NULL_TIMINGS.stage("embed"):
+            NULL_TIMINGS.count("hits", 5)
+        assert NULL_TIMINGS.enabled is False
+        assert not hasattr(NULL_TIMINGS, "stages")